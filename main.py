@@ -13,22 +13,42 @@ This script orchestrates the daily LeetCode problem delivery:
 """
 
 import sys
+import json
+import logging
 import random
-from typing import Optional, Dict
+import argparse
+from typing import Optional, Dict, List, Sequence, Tuple
 
+from src.backfill import Backfill
 from src.config import config
-from src.utils.logger import logger
+from src.daemon import TutorDaemon
+from src.digest import DigestRun
+from src.replay import parse_latency, record_fixture, replay_fixture
+from src.services.bot import CommandBot
+from src.utils.deadline import Deadline
+from src.utils.http import get_transport
+from src.utils.journal import RunJournal
+from src.utils.logger import logger, log_stage, new_run_id
+from src.utils.profiling import start_profiler
 from src.services.leetcode import LeetCodeService
-from src.services.sheets import SheetsService
+from src.services.sheets import Settings, SheetsService
 from src.services.gemini import GeminiService
 from src.services.telegram import TelegramService
+from src.services.outbox import Outbox, drain_outbox
+from src.services.reviews import get_schedule
 
 
 class LeetCodeDailyTutor:
     """Main application orchestrator."""
 
-    def __init__(self):
-        """Initialize all services."""
+    def __init__(self, spreadsheet=None):
+        """
+        Initialize all services.
+
+        Args:
+            spreadsheet: Spreadsheet backend used instead of connecting to
+                         Google Sheets (replay mode)
+        """
         logger.info("=" * 60)
         logger.info("🚀 LeetCode Daily AI Tutor Starting...")
         logger.info("=" * 60)
@@ -38,119 +58,349 @@ class LeetCodeDailyTutor:
             logger.error("Configuration validation failed")
             sys.exit(1)
 
+        # One deadline bounds the whole run, including service setup
+        self.deadline = Deadline(config.RUN_DEADLINE_SECONDS or None)
+        # HTTP totals when the current run started (the transport is process-wide)
+        self.http_baseline: Dict[str, Dict] = get_transport().stats()
+
         # Initialize services
         try:
-            self.leetcode = LeetCodeService()
-            self.sheets = SheetsService()
-            self.gemini = GeminiService()
-            self.telegram = TelegramService()
+            self.leetcode = LeetCodeService(self.deadline)
+            self.sheets = SheetsService(self.deadline, spreadsheet=spreadsheet)
+            self.gemini = GeminiService(self.deadline)
+            self.telegram = TelegramService(self.deadline)
+            self.outbox = Outbox()
             logger.info("All services initialized successfully")
         except Exception as e:
-            logger.error(f"Service initialization failed: {e}")
+            logger.error("Service initialization failed: %s", e)
             sys.exit(1)
 
-    def select_problem(self) -> Optional[Dict]:
+    def select_problem(
+        self,
+        dataset_max_age: Optional[float] = None,
+        chat_id: Optional[str] = None
+    ) -> Tuple[Optional[Dict], bool]:
         """
-        Select a suitable problem based on criteria.
+        Select a suitable problem based on criteria. In review mode
+        (REVIEW_RATIO > 0) a due review takes the place of a new problem
+        for that share of deliveries.
+
+        Args:
+            dataset_max_age: Reuse an index refreshed less than this many
+                             seconds ago (None = always fetch)
+            chat_id: Chat whose review schedule is consulted
 
         Returns:
-            Selected problem dictionary or None if no suitable problem found
+            Tuple of (selected problem or None if no suitable problem was
+            found, whether it is a review)
         """
-        # Step 1: Fetch all problems
+        if config.REVIEW_RATIO > 0:
+            review = get_schedule(chat_id).next_review()
+            if review:
+                return review, True
+
+        problems = self.select_problems(1, dataset_max_age)
+        return (problems[0] if problems else None), False
+
+    def select_problems(self, count: int, dataset_max_age: Optional[float] = None) -> List[Dict]:
+        """
+        Select distinct suitable problems based on criteria.
+
+        Args:
+            count: Number of problems wanted
+            dataset_max_age: Reuse an index refreshed less than this many
+                             seconds ago (None = always fetch)
+
+        Returns:
+            Up to ``count`` selected problems (empty if none is suitable)
+        """
+        # Step 1: Fetch all problems (refreshes the rating index)
         try:
-            all_problems = self.leetcode.fetch_problem_ratings()
+            self.leetcode.ensure_fresh(dataset_max_age)
         except Exception as e:
-            logger.error(f"Failed to fetch problems: {e}")
-            return None
+            logger.error("Failed to fetch problems: %s", e)
+            return []
 
-        # Step 2: Get target rating from Google Sheets
+        # Step 2: Get target rating, tolerance and filter from Google Sheets
         try:
-            target_rating = self.sheets.get_target_rating()
+            settings = self.sheets.get_settings()
         except Exception as e:
-            logger.error(f"Failed to get target rating: {e}")
-            return None
+            logger.error("Failed to get target rating: %s", e)
+            return []
+        target_rating = settings.target_rating
 
         # Step 3: Get history of sent problems
-        history_ids = self.sheets.get_history_ids()
+        try:
+            history_ids = self.sheets.get_history_ids()
+        except Exception as e:
+            logger.error("Failed to get history, refusing to risk a repeat: %s", e)
+            return []
 
-        # Step 4: Filter problems by rating
-        candidates = self.leetcode.filter_by_rating(all_problems, target_rating)
+        with log_stage("filter"):
+            # Step 4: Filter problems by rating
+            candidates = self.leetcode.candidates_by_rating(
+                target_rating, settings.tolerance, settings.problem_filter
+            )
 
-        # Step 5: Exclude already-sent problems
-        candidates = self.leetcode.exclude_solved(candidates, history_ids)
+            # Step 5: Exclude already-sent problems
+            candidates = self.leetcode.exclude_solved(candidates, history_ids)
 
         # Step 6: Check if we have candidates
         if not candidates:
             logger.error("No suitable problems found!")
             logger.info(
                 "💡 Suggestions:\n"
-                "   - Adjust Target_Rating in Google Sheets\n"
+                "   - Adjust Target_Rating or the problem filter in Google Sheets\n"
                 "   - Clear some entries from History worksheet\n"
-                f"   - Current target: {target_rating}, "
-                f"History count: {len(history_ids)}"
+                "   - Current target: %s, History count: %s",
+                target_rating, len(history_ids)
             )
-            return None
+            return []
 
-        # Step 7: Randomly select one problem
-        problem = random.choice(candidates)
-        logger.info(
-            f"🎲 Selected problem: {problem.get('Title')} "
-            f"(ID: {problem.get('ID')}, Rating: {problem.get('Rating')})"
-        )
+        if len(candidates) < count:
+            logger.warning("Only %s suitable problems for %s requested", len(candidates), count)
+
+        # Step 7: Randomly select distinct problems
+        problems = random.sample(candidates, min(count, len(candidates)))
+        for problem in problems:
+            logger.info(
+                "🎲 Selected problem: %s (ID: %s, Rating: %s)",
+                problem.get('Title'), problem.get('ID'), problem.get('Rating')
+            )
 
-        return problem
+        return problems
 
-    def process_problem(self, problem: Dict) -> bool:
+    def sheet_settings(self) -> Optional[Settings]:
         """
-        Process a selected problem: generate solution and send to Telegram.
+        Settings from Google Sheets, for the optional defaults they provide.
+
+        Returns:
+            Settings, or None if they cannot be read
+        """
+        try:
+            return self.sheets.get_settings()
+        except Exception as e:
+            logger.warning("Failed to read settings, using configured defaults: %s", e)
+            return None
+
+    def process_problem(
+        self,
+        problem: Dict,
+        journal: Optional[RunJournal] = None,
+        languages: Optional[Sequence[str]] = None
+    ) -> bool:
+        """
+        Process a selected problem: generate solution, send to Telegram and
+        record it in history.
+
+        Every completed stage is checkpointed in the run journal, so a re-run
+        reuses the generated solution and only sends the missing chunks.
 
         Args:
             problem: Problem dictionary
+            journal: Today's run journal (a fresh one if not given)
+            languages: Solution languages (defaults to config.SOLUTION_LANGUAGES)
 
         Returns:
             True if processing was successful
         """
+        journal = journal or RunJournal()
+
         # Format problem information
         problem_info = self.leetcode.format_problem_info(problem)
+        if journal.is_review:
+            problem_info['review'] = True
+
+        if config.GEMINI_STREAMING and journal.solution is None:
+            delivered = self._generate_and_stream(problem_info, journal, languages)
+            if delivered is not None:
+                if not delivered:
+                    logger.error("Failed to send message to Telegram (kept in outbox)")
+                    return False
+                self._record_history(problem_info, journal)
+                return True
+            logger.warning("Streaming unavailable, falling back to regular delivery")
 
         # Generate AI solution
-        try:
-            solution = self.gemini.generate_solution(problem_info)
-        except Exception as e:
-            logger.error(f"Solution generation failed: {e}")
-            # Continue with fallback message
-            solution = "⚠️ AI 解法生成失敗，請參考題目連結"
+        if journal.solution is None:
+            with log_stage("generate"):
+                try:
+                    solution = self.gemini.generate_solution(problem_info, languages=languages)
+                except Exception as e:
+                    logger.error("Solution generation failed: %s", e)
+                    # Continue with fallback message
+                    solution = "⚠️ AI 解法生成失敗，請參考題目連結"
+            journal.record_solution(solution)
 
         # Format Telegram message
-        message = self.telegram.format_daily_message(problem_info, solution)
+        if journal.chunks is None:
+            with log_stage("render"):
+                journal.record_chunks(self.telegram.render_for_delivery(problem_info, journal.solution))
+
+        # Queue the chunks not delivered yet and drain them
+        if journal.pending_chunks():
+            with log_stage("send"):
+                if not self._deliver_via_outbox(problem_info, journal):
+                    logger.error("Failed to send message to Telegram (kept in outbox)")
+                    return False
+
+        self._record_history(problem_info, journal)
+        return True
+
+    def _deliver_via_outbox(self, problem_info: Dict, journal: RunJournal) -> bool:
+        """
+        Put the undelivered chunks into the outbox and drain this chat.
 
-        # Send to Telegram
-        if not self.telegram.send_message(message):
-            logger.error("Failed to send message to Telegram")
-            return False
+        Undelivered chunks stay in the outbox, so `python main.py drain`
+        (or the next run) delivers them once Telegram is reachable again.
 
-        # Add to history
-        if not self.sheets.add_to_history(problem_info['id']):
-            logger.warning("Failed to update history (message was sent)")
-            # Don't return False here - message was already sent
+        Args:
+            problem_info: Formatted problem information
+            journal: Today's run journal (chunks already rendered)
 
-        return True
+        Returns:
+            True if every chunk has been delivered
+        """
+        base_key = f"{journal.day}:{journal.chat_id}:{problem_info['id']}"
+        keys = self.outbox.enqueue_chunks(
+            base_key, journal.chat_id, journal.chunks, indexes=journal.pending_chunks()
+        )
+
+        drain_outbox(self.telegram, chat_id=journal.chat_id, outbox=self.outbox)
+
+        statuses = self.outbox.statuses(keys)
+        dead = None
+        for i in journal.pending_chunks():
+            if statuses.get(keys[i]) == Outbox.SENT:
+                journal.mark_chunk_sent(i)
+            elif statuses.get(keys[i]) == Outbox.DEAD:
+                # Never retried on its own; a re-run would fail without saying why
+                if dead is None:
+                    dead = self.outbox.dead(journal.chat_id)
+                logger.error(
+                    "Chunk %s of problem %s was given up on after %s attempts (%s); "
+                    "requeue it with `python main.py drain --retry-dead`",
+                    i + 1, problem_info['id'], config.OUTBOX_MAX_ATTEMPTS, dead.get(keys[i])
+                )
+
+        return not journal.pending_chunks()
+
+    def _generate_and_stream(
+        self,
+        problem_info: Dict,
+        journal: RunJournal,
+        languages: Optional[Sequence[str]] = None
+    ) -> Optional[bool]:
+        """
+        Send the header immediately, stream the solution into it and
+        finalize with the properly split HTML message.
+
+        The first chunk replaces the preview in place; every chunk that
+        edit did not deliver goes through the outbox like a regular run,
+        so streamed deliveries keep the at-least-once guarantee.
+
+        Args:
+            problem_info: Formatted problem information
+            journal: Today's run journal
+            languages: Solution languages
+
+        Returns:
+            True/False for delivery success, or None if the header could
+            not be sent and the caller should use regular delivery
+        """
+        with log_stage("send"):
+            progressive = self.telegram.start_progressive_message(
+                problem_info, chat_id=journal.chat_id
+            )
+        if progressive is None:
+            return None
 
-    def run(self) -> int:
+        with log_stage("generate"):
+            solution = self.gemini.generate_solution(
+                problem_info, on_progress=progressive.update, languages=languages
+            )
+        journal.record_solution(solution)
+
+        with log_stage("render"):
+            journal.record_chunks(self.telegram.render_for_delivery(problem_info, solution))
+
+        with log_stage("send"):
+            if progressive.replace_preview(journal.chunks[0]):
+                journal.mark_chunk_sent(0)
+            else:
+                logger.warning("Could not finalize streamed message, sending it in full")
+            delivered = not journal.pending_chunks() or self._deliver_via_outbox(problem_info, journal)
+        if delivered:
+            logger.info("Streamed message finalized (%s chunks)", len(journal.chunks))
+        return delivered
+
+    def _record_history(self, problem_info: Dict, journal: RunJournal):
+        """Add a delivered problem to the history worksheet and review schedule (once)."""
+        if journal.recorded:
+            return
+
+        with log_stage("record"):
+            # A review is already in history; only its schedule moves on
+            if problem_info.get('review'):
+                recorded = True
+            else:
+                recorded = self.sheets.add_to_history(problem_info['id'])
+
+            if recorded:
+                if config.REVIEW_RATIO > 0:
+                    get_schedule(journal.chat_id).record(journal.problem)
+                journal.mark_recorded()
+            else:
+                logger.warning("Failed to update history (message was sent)")
+                # Don't fail the run here - message was already sent
+
+    def run(
+        self,
+        chat_id: Optional[str] = None,
+        dataset_max_age: Optional[float] = None,
+        languages: Optional[Sequence[str]] = None
+    ) -> int:
         """
         Main execution flow.
 
+        Args:
+            chat_id: Chat to deliver to (defaults to the configured chat)
+            dataset_max_age: Passed to select_problem
+            languages: Solution languages (defaults to the Settings worksheet,
+                       then config.SOLUTION_LANGUAGES)
+
         Returns:
             Exit code (0 for success, 1 for failure)
         """
+        run_id = new_run_id()
+        self.http_baseline = get_transport().stats()
+        self.gemini.usage.start_run()
+        logger.info("Run %s started", run_id)
+
         try:
-            # Select a problem
-            problem = self.select_problem()
-            if not problem:
-                return 1
+            journal = RunJournal(chat_id=chat_id)
+            if journal.complete:
+                logger.info("✅ Today's problem was already delivered, nothing to do")
+                return 0
+
+            if journal.problem:
+                # Resume today's run instead of picking a new problem
+                logger.info("♻️  Resuming today's run: %s", journal.describe())
+                problem = journal.problem
+            else:
+                # Select a problem (or a due review)
+                with log_stage("select"):
+                    problem, review = self.select_problem(dataset_max_age, chat_id)
+                if not problem:
+                    return 1
+                journal.record_selection(problem, review=review)
+
+            if not languages:
+                settings = self.sheet_settings()
+                languages = (settings.languages or None) if settings else None
 
             # Process the problem
-            if not self.process_problem(problem):
+            if not self.process_problem(problem, journal, languages):
                 return 1
 
             logger.info("=" * 60)
@@ -163,14 +413,308 @@ class LeetCodeDailyTutor:
             return 1
 
         except Exception as e:
-            logger.error(f"Unexpected error: {e}", exc_info=True)
+            logger.error("Unexpected error: %s", e, exc_info=True)
             return 1
 
+        finally:
+            self.log_run_report()
+
+    def run_digest(
+        self,
+        count: Optional[int] = None,
+        chat_id: Optional[str] = None,
+        languages: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Deliver several problems in one pipelined run.
+
+        Args:
+            count: Number of problems (defaults to the Settings worksheet,
+                   then config.DIGEST_SIZE)
+            chat_id: Chat to deliver to (defaults to the configured chat)
+            languages: Solution languages (defaults to the Settings worksheet,
+                       then config.SOLUTION_LANGUAGES)
+
+        Returns:
+            Exit code (0 for success, 1 for failure)
+        """
+        run_id = new_run_id()
+        self.http_baseline = get_transport().stats()
+        self.gemini.usage.start_run()
+        logger.info("Digest run %s started", run_id)
+
+        try:
+            settings = self.sheet_settings()
+            if settings:
+                count = count or settings.digest_size
+                languages = languages or settings.languages or None
+
+            if not DigestRun(self, count, chat_id, languages).run():
+                return 1
+
+            logger.info("=" * 60)
+            logger.info("✅ Digest sent successfully!")
+            logger.info("=" * 60)
+            return 0
+
+        except KeyboardInterrupt:
+            logger.info("\n⚠️  Process interrupted by user")
+            return 1
+
+        except Exception as e:
+            logger.error("Unexpected error: %s", e, exc_info=True)
+            return 1
+
+        finally:
+            self.log_run_report()
+
+    def log_run_report(self):
+        """Log the end-of-run report, including Gemini token usage."""
+        usage = self.gemini.usage.summary()
+        run, day = usage['run'], usage['day']
+
+        logger.info("📊 Run report", extra={'gemini_usage': usage})
+        logger.info(
+            "   Gemini this run: %s calls, %s tokens (prompt %s, output %s), ~$%.4f",
+            run['calls'], run['total_tokens'], run['prompt_tokens'],
+            run['candidates_tokens'], run['cost_usd']
+        )
+        logger.info(
+            "   Gemini today: %s calls, %s tokens, ~$%.4f (token budget: %s)",
+            day['calls'], day['total_tokens'], day['cost_usd'],
+            config.GEMINI_DAILY_TOKEN_BUDGET or "unlimited"
+        )
+        for host, stats in get_transport().stats(since=self.http_baseline).items():
+            logger.info(
+                "   HTTP %s: %s requests, %s KiB received (%s KiB decoded), %.2fs",
+                host, stats['requests'], stats['wire_bytes'] // 1024,
+                stats['body_bytes'] // 1024, stats['seconds']
+            )
+        if self.deadline.budget:
+            logger.info(
+                "   Run deadline: %.1fs of %ss budget remaining",
+                max(self.deadline.remaining(), 0), self.deadline.budget
+            )
+
+
+def drain_command(args: argparse.Namespace) -> int:
+    """
+    Deliver every pending outbox message.
+
+    Args:
+        args: Parsed ``drain`` arguments
+
+    Returns:
+        Exit code (0 if everything was delivered)
+    """
+    outbox = Outbox()
+    if args.retry_dead:
+        logger.info("Requeued %s dead message(s)", outbox.revive())
+    else:
+        dead = outbox.dead()
+        if dead:
+            logger.error(
+                "%s message(s) were given up on and are not retried: %s "
+                "(use --retry-dead to requeue them)",
+                len(dead), ", ".join(f"{key} ({error})" for key, error in dead.items())
+            )
+
+    telegram = TelegramService()
+    result = drain_outbox(telegram, outbox=outbox)
+    if not result.sent and not result.failed:
+        logger.info("Outbox is empty")
+    return 0 if result.ok else 1
+
+
+def bot_command() -> int:
+    """
+    Run the command bot in the foreground.
+
+    Returns:
+        Exit code
+    """
+    bot = CommandBot()
+    try:
+        bot.run_forever()
+    except KeyboardInterrupt:
+        bot.stop()
+    return 0
+
+
+def backfill_command(args: argparse.Namespace) -> int:
+    """
+    Pre-generate solutions for a rating band.
+
+    Args:
+        args: Parsed ``backfill`` arguments
+
+    Returns:
+        Exit code (0 once the whole band is done)
+    """
+    run_id = new_run_id()
+    logger.info("Backfill run %s started", run_id)
+
+    # Bulk generation is bounded by the Gemini budget, not by a run deadline
+    deadline = Deadline()
+    backfill = Backfill(
+        LeetCodeService(deadline),
+        GeminiService(deadline),
+        args.min_rating,
+        args.max_rating,
+        languages=args.languages.split(",") if args.languages else None,
+        concurrency=args.concurrency
+    )
+    try:
+        return 0 if backfill.run(limit=args.limit) else 1
+    except KeyboardInterrupt:
+        logger.info("\n⚠️  Backfill interrupted, progress saved")
+        return 1
+
+
+def record_command(args: argparse.Namespace) -> int:
+    """
+    Run the pipeline for real and record a replay fixture.
+
+    Args:
+        args: Parsed ``record`` arguments
+
+    Returns:
+        Exit code of the recorded run
+    """
+    new_run_id()
+    return record_fixture(args.fixture, LeetCodeDailyTutor, seed=args.seed)
+
+
+def replay_command(args: argparse.Namespace) -> int:
+    """
+    Replay a fixture offline against local stand-ins.
+
+    Args:
+        args: Parsed ``replay`` arguments
+
+    Returns:
+        Exit code (0 if every run succeeded)
+    """
+    if args.json:
+        # The logger writes to stdout too; keep it parseable
+        logger.setLevel(logging.CRITICAL)
+
+    try:
+        latency = parse_latency(args.latency)
+        report = replay_fixture(args.fixture, LeetCodeDailyTutor, runs=args.runs, latency=latency)
+    except ValueError as e:
+        if args.json:
+            print(json.dumps({'error': str(e)}, ensure_ascii=False))
+        logger.error("Replay failed: %s", e)
+        return 1
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0 if report['failures'] == 0 else 1
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="LeetCode Daily AI Tutor")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile every stage with cProfile and tracemalloc"
+    )
+    parser.add_argument(
+        "--profile-dir", default=None,
+        help="Directory for the profile reports (default: STATE_DIR/profile/<timestamp>)"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("run", help="Select, generate and deliver today's problem (default)")
+    digest = subparsers.add_parser("digest", help="Deliver several problems in one run")
+    digest.add_argument(
+        "--count", type=int, default=None,
+        help=f"Number of problems (default: DIGEST_SIZE, {config.DIGEST_SIZE})"
+    )
+    backfill = subparsers.add_parser(
+        "backfill", help="Pre-generate solutions for every problem in a rating band"
+    )
+    backfill.add_argument("--min", dest="min_rating", type=int, required=True, help="Lowest rating")
+    backfill.add_argument("--max", dest="max_rating", type=int, required=True, help="Highest rating")
+    backfill.add_argument("--languages", help="Comma-separated languages (default: SOLUTION_LANGUAGES)")
+    backfill.add_argument(
+        "--concurrency", type=int, default=None,
+        help=f"Problems generated at once (default: {config.BACKFILL_CONCURRENCY})"
+    )
+    backfill.add_argument("--limit", type=int, default=None, help="Stop after this many problems")
+    drain = subparsers.add_parser("drain", help="Deliver pending messages from the outbox")
+    drain.add_argument(
+        "--retry-dead", action="store_true",
+        help=f"Also requeue messages given up on after {config.OUTBOX_MAX_ATTEMPTS} attempts"
+    )
+    subparsers.add_parser(
+        "daemon", help="Stay running and deliver to every tenant at its scheduled time"
+    )
+    subparsers.add_parser("bot", help="Answer /next, /harder, /easier and /again commands")
+    record = subparsers.add_parser(
+        "record", help="Run for real and record every outbound interaction to a fixture"
+    )
+    record.add_argument("fixture", help="Fixture file to write (JSON)")
+    record.add_argument("--seed", type=int, default=None, help="Random seed (default: random)")
+    replay = subparsers.add_parser(
+        "replay", help="Replay a fixture offline against local stand-ins and measure it"
+    )
+    replay.add_argument("fixture", help="Fixture file written by record")
+    replay.add_argument("--runs", type=int, default=1, help="End-to-end runs (default: 1)")
+    replay.add_argument(
+        "--latency", default="",
+        help="Injected latency in ms, e.g. gemini=1500,telegram=80,sheets=150,dataset=300"
+    )
+    replay.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def dispatch(args: argparse.Namespace) -> int:
+    """
+    Run the requested command.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Exit code
+    """
+    if args.command == "drain":
+        return drain_command(args)
+
+    if args.command == "bot":
+        return bot_command()
+
+    if args.command == "backfill":
+        return backfill_command(args)
+
+    if args.command == "record":
+        return record_command(args)
+
+    if args.command == "replay":
+        return replay_command(args)
+
+    app = LeetCodeDailyTutor()
+
+    if args.command == "daemon":
+        return TutorDaemon(app).run()
+
+    if args.command == "digest":
+        return app.run_digest(args.count)
+
+    return app.run()
+
 
 def main():
     """Application entry point."""
-    app = LeetCodeDailyTutor()
-    exit_code = app.run()
+    args = parse_args()
+
+    profiler = start_profiler(args.profile_dir) if args.profile else None
+    try:
+        exit_code = dispatch(args)
+    finally:
+        if profiler is not None:
+            profiler.stop()
     sys.exit(exit_code)
 
 
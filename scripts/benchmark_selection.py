@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Selection benchmark.
+Compares per-tenant selection (filter_by_rating + exclude_solved) with the
+vectorized BatchSelector on a synthetic dataset, and checks that every
+vectorized pick is a valid candidate.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import selection
+from src.services.leetcode import LeetCodeService
+from src.services.problem_index import ProblemIndex
+from src.utils.logger import logger
+
+
+def build_dataset(problems: int, tenants: int, history: int, seed: int):
+    """Synthetic problems, tenant targets and per-tenant histories."""
+    rnd = random.Random(seed)
+    dataset = [
+        {'ID': i, 'Rating': round(rnd.uniform(1000, 3000), 2), 'Title': f"Problem {i}", 'TitleSlug': f"p{i}"}
+        for i in range(1, problems + 1)
+    ]
+    targets = [rnd.randrange(1200, 2700, 10) for _ in range(tenants)]
+    histories = [
+        {str(pid) for pid in rnd.sample(range(1, problems + 1), history)}
+        for _ in range(tenants)
+    ]
+    return dataset, targets, histories
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark multi-tenant problem selection")
+    parser.add_argument("--tenants", type=int, default=10000)
+    parser.add_argument("--problems", type=int, default=4000)
+    parser.add_argument("--history", type=int, default=300, help="Sent problems per tenant")
+    parser.add_argument("--tolerance", type=int, default=100)
+    parser.add_argument(
+        "--baseline-sample", type=int, default=1000,
+        help="Tenants timed with per-tenant selection (extrapolated to all)"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not selection.available():
+        print("❌ numpy is not installed (pip install numpy)")
+        sys.exit(1)
+
+    # Per-tenant selection logs every call
+    logger.setLevel(logging.WARNING)
+
+    print(f"\n📐 {args.tenants} tenants x {args.problems} problems, {args.history} sent each")
+    dataset, targets, histories = build_dataset(args.problems, args.tenants, args.history, args.seed)
+
+    # Per-tenant baseline on a sample
+    leetcode = LeetCodeService()
+    sample = min(args.baseline_sample, args.tenants)
+    start = time.perf_counter()
+    baseline = []
+    for target, history in zip(targets[:sample], histories[:sample]):
+        candidates = leetcode.exclude_solved(
+            leetcode.filter_by_rating(dataset, target, args.tolerance), history
+        )
+        baseline.append(random.choice(candidates) if candidates else None)
+    per_tenant = (time.perf_counter() - start) / sample
+    print(f"  Per-tenant:  {per_tenant * 1e3:.3f} ms/tenant, ~{per_tenant * args.tenants:.2f}s for all tenants")
+
+    # Vectorized
+    start = time.perf_counter()
+    selector = selection.BatchSelector(ProblemIndex(dataset))
+    bitmaps = selection.np.stack([selector.history_bitmap(history) for history in histories])
+    prepared = time.perf_counter() - start
+
+    start = time.perf_counter()
+    picks = selector.select(targets, [args.tolerance] * args.tenants, bitmaps)
+    vectorized = time.perf_counter() - start
+    print(f"  Vectorized:  {vectorized:.3f}s for all tenants (+{prepared:.3f}s building index and bitmaps)")
+    print(f"  Speedup:     {per_tenant * args.tenants / vectorized:.1f}x")
+
+    # Every pick must be a candidate; sampled tenants without one must agree with the baseline
+    errors = 0
+    for i, (target, history, pick) in enumerate(zip(targets, histories, picks)):
+        if pick is None:
+            errors += i < sample and baseline[i] is not None
+            continue
+        if abs(pick['Rating'] - target) > args.tolerance or str(pick['ID']) in history:
+            errors += 1
+    print(f"  Invalid picks: {errors}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
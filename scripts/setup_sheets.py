@@ -48,7 +48,7 @@ def main():
             return 1
 
     except Exception as e:
-        logger.error(f"Setup failed: {e}")
+        logger.error("Setup failed: %s", e)
         print()
         print("❌ Setup failed. Please check:")
         print("  • GOOGLE_SHEETS_JSON environment variable is set")
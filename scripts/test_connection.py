@@ -1,81 +1,237 @@
 #!/usr/bin/env python3
 """
 Connection test script.
-Tests all external service connections before running the main application.
+Probes every external dependency (rating dataset, Google OAuth, Google
+Sheets, Gemini, Telegram) in parallel, repeats each check and reports
+p50/p95/max latency per dependency. ``--json`` prints a machine-readable
+report for baselining and comparing environments.
 """
 
-import sys
+import argparse
+import json
+import logging
+import math
 import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from google.auth.transport.requests import Request
+
 from src.config import config
-from src.services.sheets import SheetsService
 from src.services.gemini import GeminiService
+from src.services.sheets import Settings, SheetsService
 from src.services.telegram import TelegramService
+from src.utils.google_auth import get_credentials
+from src.utils.http import get_transport
 from src.utils.logger import logger
 
+# A probe sets up its client once and returns the check to repeat;
+# the check performs one round trip and returns a short detail string
+Check = Callable[[], str]
 
-def test_google_sheets():
-    """Test Google Sheets connection."""
-    print("\n📊 Testing Google Sheets connection...")
-    try:
-        sheets = SheetsService()
-        target_rating = sheets.get_target_rating()
-        history_count = len(sheets.get_history_ids())
-
-        print(f"  ✅ Connected to spreadsheet: {config.SHEET_NAME}")
-        print(f"  ✅ Target Rating: {target_rating}")
-        print(f"  ✅ History entries: {history_count}")
-        return True
-    except Exception as e:
-        print(f"  ❌ Failed: {e}")
-        return False
 
+@dataclass
+class ProbeResult:
+    """Latency samples and failures of one dependency."""
 
-def test_gemini():
-    """Test Gemini API connection."""
-    print("\n🤖 Testing Gemini API connection...")
-    try:
-        gemini = GeminiService()
-        if gemini.test_connection():
-            print(f"  ✅ Connected to Gemini API")
-            print(f"  ✅ Model: {config.GEMINI_MODEL}")
-            return True
-        else:
-            print("  ❌ Connection test failed")
-            return False
-    except Exception as e:
-        print(f"  ❌ Failed: {e}")
-        return False
+    name: str
+    setup: float = 0.0  # Seconds spent creating the client
+    samples: List[float] = field(default_factory=list)  # Seconds per successful check
+    errors: List[str] = field(default_factory=list)
+    detail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        """Whether every attempt succeeded."""
+        return bool(self.samples) and not self.errors
+
+    def summary(self) -> Dict:
+        """Report entry for this dependency (milliseconds)."""
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            'ok': self.ok,
+            'attempts': len(self.samples) + len(self.errors),
+            'failures': len(self.errors),
+            'setup_ms': ms(self.setup),
+            'p50_ms': ms(percentile(self.samples, 50)),
+            'p95_ms': ms(percentile(self.samples, 95)),
+            'max_ms': ms(max(self.samples) if self.samples else None),
+            'detail': self.detail,
+            'errors': sorted(set(self.errors))[:3],
+        }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def probe_dataset() -> Check:
+    """Download the rating dataset."""
+    transport = get_transport()
+
+    def check() -> str:
+        response = transport.get(config.LEETCODE_RATING_URL, timeout=config.HTTP_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return f"{len(response.json())} problems"
+
+    return check
+
+
+def probe_oauth() -> Check:
+    """Exchange the service-account assertion for an access token."""
+    credentials = get_credentials()
+    request = Request()
+
+    def check() -> str:
+        credentials.refresh(request)
+        return f"token valid until {credentials.expiry:%H:%M} UTC"
+
+    return check
+
+
+def probe_sheets() -> Check:
+    """Read the settings range of the spreadsheet."""
+    sheets = SheetsService()
+
+    def check() -> str:
+        values = sheets.spreadsheet.values_get(
+            f"{config.SETTINGS_WORKSHEET}!{Settings.RANGE}"
+        ).get('values', [])
+        rating = values[0][0] if values and values[0] else "empty"
+        return f"{config.SHEET_NAME}, target rating {rating}"
+
+    return check
+
+
+def probe_gemini() -> Check:
+    """Fetch the configured model's metadata (spends no tokens)."""
+    gemini = GeminiService()
+
+    def check() -> str:
+        model = gemini.client.models.get(model=config.GEMINI_MODEL)
+        return model.name or config.GEMINI_MODEL
 
+    return check
 
-def test_telegram():
-    """Test Telegram bot connection."""
-    print("\n📱 Testing Telegram bot connection...")
+
+def probe_telegram() -> Check:
+    """Call getMe on the Bot API."""
+    telegram = TelegramService()
+
+    def check() -> str:
+        response = telegram.http.get(f"{telegram.api_url}/getMe", timeout=config.HTTP_QUICK_TIMEOUT)
+        response.raise_for_status()
+        username = response.json().get('result', {}).get('username', 'unknown')
+        return f"@{username}, chat {config.telegram_chat_id}"
+
+    return check
+
+
+PROBES: Dict[str, Callable[[], Check]] = {
+    'dataset': probe_dataset,
+    'oauth': probe_oauth,
+    'sheets': probe_sheets,
+    'gemini': probe_gemini,
+    'telegram': probe_telegram,
+}
+
+
+def run_probe(name: str, factory: Callable[[], Check], repeat: int) -> ProbeResult:
+    """
+    Set up one dependency's client and time ``repeat`` checks.
+
+    Args:
+        name: Dependency name
+        factory: Probe factory (see PROBES)
+        repeat: Number of checks
+
+    Returns:
+        Probe result
+    """
+    result = ProbeResult(name)
+
+    start = time.perf_counter()
     try:
-        telegram = TelegramService()
-        if telegram.test_connection():
-            print(f"  ✅ Telegram bot is active")
-            print(f"  ✅ Chat ID: {config.telegram_chat_id}")
-            return True
-        else:
-            print("  ❌ Connection test failed")
-            return False
+        check = factory()
     except Exception as e:
-        print(f"  ❌ Failed: {e}")
-        return False
+        result.setup = time.perf_counter() - start
+        result.errors.append(f"setup: {type(e).__name__}: {e}")
+        return result
+    result.setup = time.perf_counter() - start
 
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result.detail = check()
+        except Exception as e:
+            result.errors.append(f"{type(e).__name__}: {e}")
+            continue
+        result.samples.append(time.perf_counter() - start)
 
-def main():
-    """Run all connection tests."""
+    return result
+
+
+def print_report(results: List[ProbeResult], repeat: int, elapsed: float):
+    """Print the human-readable report."""
+    def fmt(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.0f}ms"
+
+    print("\n" + "=" * 60)
+    print(f"📋 Probe Summary ({repeat} checks each, {elapsed:.1f}s total)")
     print("=" * 60)
-    print("🔍 Service Connection Test")
+    print(f"  {'':<10} {'status':<8} {'p50':>8} {'p95':>8} {'max':>8} {'setup':>8}")
+
+    for result in results:
+        summary = result.summary()
+        status = "✅ PASS" if result.ok else f"❌ {summary['failures']}/{summary['attempts']}"
+        print(
+            f"  {result.name:<10} {status:<8} {fmt(summary['p50_ms']):>8} {fmt(summary['p95_ms']):>8} "
+            f"{fmt(summary['max_ms']):>8} {fmt(summary['setup_ms']):>8}  {result.detail}"
+        )
+        for error in summary['errors']:
+            print(f"  {'':<10} ↳ {error}")
+
     print("=" * 60)
 
+
+def main():
+    """Run all connection probes."""
+    parser = argparse.ArgumentParser(description="Probe external service connections")
+    parser.add_argument("--repeat", type=int, default=5, help="Checks per dependency (default: 5)")
+    parser.add_argument(
+        "--skip", default="",
+        help=f"Comma-separated dependencies to skip ({', '.join(PROBES)})"
+    )
+    parser.add_argument("--json", action="store_true", help="Print a JSON report only")
+    args = parser.parse_args()
+
+    if args.json:
+        # Keep stdout parseable; failures are in the report
+        logger.setLevel(logging.CRITICAL)
+    else:
+        print("=" * 60)
+        print("🔍 Service Connection Test")
+        print("=" * 60)
+
     # Validate config first
     if not config.validate():
+        if args.json:
+            print(json.dumps({'ok': False, 'error': "configuration validation failed"}))
+            return 1
         print("\n❌ Configuration validation failed")
         print("Please check your environment variables:")
         print("  • TELEGRAM_BOT_TOKEN")
@@ -84,24 +240,34 @@ def main():
         print("  • GOOGLE_SHEETS_JSON")
         return 1
 
-    # Run tests
-    results = {
-        "Google Sheets": test_google_sheets(),
-        "Gemini API": test_gemini(),
-        "Telegram Bot": test_telegram(),
-    }
+    skipped = {name.strip() for name in args.skip.split(",") if name.strip()}
+    probes = {name: factory for name, factory in PROBES.items() if name not in skipped}
+    repeat = max(1, args.repeat)
 
-    # Summary
-    print("\n" + "=" * 60)
-    print("📋 Test Summary")
-    print("=" * 60)
+    if not args.json:
+        print(f"\n⏱️  Probing {', '.join(probes)} in parallel...")
 
-    all_passed = all(results.values())
-    for service, passed in results.items():
-        status = "✅ PASS" if passed else "❌ FAIL"
-        print(f"  {service}: {status}")
+    # One thread per dependency; each repeats its own checks back to back
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, len(probes)), thread_name_prefix="probe") as executor:
+        futures = [executor.submit(run_probe, name, factory, repeat) for name, factory in probes.items()]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
 
-    print("=" * 60)
+    all_passed = all(result.ok for result in results)
+
+    if args.json:
+        print(json.dumps({
+            'ok': all_passed,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'host': platform.node(),
+            'repeat': repeat,
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'dependencies': {result.name: result.summary() for result in results},
+        }, indent=2, ensure_ascii=False))
+        return 0 if all_passed else 1
+
+    print_report(results, repeat, elapsed)
 
     if all_passed:
         print("\n🎉 All tests passed! You're ready to run the application.")
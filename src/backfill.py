@@ -0,0 +1,245 @@
+"""
+Solution backfill.
+
+Pre-generates solutions for every problem in a rating band into the
+solution cache, with bounded concurrency. Completed problems are
+checkpointed per band and language set, so an interrupted backfill (or one
+stopped by the daily Gemini budget or an open Gemini circuit) resumes where
+it left off. Progress is logged with throughput and an ETA.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
+
+from src.config import config
+from src.services.gemini import GeminiService
+from src.services.leetcode import LeetCodeService
+from src.utils.logger import log_stage, logger
+from src.utils.state import load_json, save_json, state_path
+
+
+def _format_duration(seconds: float) -> str:
+    """Render seconds as e.g. "1h05m" or "4m12s"."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class Backfill:
+    """Resumable bulk generation of solutions for a rating band."""
+
+    def __init__(
+        self,
+        leetcode: LeetCodeService,
+        gemini: GeminiService,
+        min_rating: int,
+        max_rating: int,
+        languages: Optional[Sequence[str]] = None,
+        concurrency: Optional[int] = None
+    ):
+        """
+        Initialize backfill.
+
+        Args:
+            leetcode: Service providing the problem index
+            gemini: Service generating (and caching) solutions
+            min_rating: Lowest rating in the band (inclusive)
+            max_rating: Highest rating in the band (inclusive)
+            languages: Solution languages (defaults to config.SOLUTION_LANGUAGES)
+            concurrency: Problems generated at once (defaults to config.BACKFILL_CONCURRENCY)
+        """
+        self.leetcode = leetcode
+        self.gemini = gemini
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.languages = gemini.resolve_languages(languages)
+        self.concurrency = concurrency or config.BACKFILL_CONCURRENCY
+
+        self.path = state_path(
+            "backfill", f"{min_rating}-{max_rating}_{'+'.join(self.languages)}.json"
+        )
+        checkpoint = load_json(self.path, default=None) or {}
+        self.done = set(checkpoint.get('done', []))
+        self.failed: Dict[str, int] = checkpoint.get('failed', {})
+
+        self._lock = threading.Lock()
+        self._halted: Optional[str] = None  # Why Gemini cannot serve more problems now
+        self._saved_at = 0.0
+        self._completed = 0  # Problems finished (either way) in this session
+        self._started = 0.0
+        self._tokens_at_start = 0
+
+    def _save(self, force: bool = False):
+        """Checkpoint progress, at most every few seconds unless forced."""
+        with self._lock:
+            if not force and time.monotonic() - self._saved_at < config.BACKFILL_CHECKPOINT_INTERVAL:
+                return
+            self._saved_at = time.monotonic()
+            data = {'done': sorted(self.done), 'failed': dict(self.failed)}
+        save_json(self.path, data)
+
+    def band(self) -> List[Dict]:
+        """
+        Problems in the rating band, in ascending rating order.
+
+        Returns:
+            Problem records
+        """
+        if self.leetcode.index is None:
+            self.leetcode.fetch_problem_ratings()
+
+        center = (self.min_rating + self.max_rating) / 2
+        return self.leetcode.candidates_by_rating(center, (self.max_rating - self.min_rating) / 2)
+
+    def run(self, limit: Optional[int] = None) -> bool:
+        """
+        Generate every problem of the band that is not done yet.
+
+        Args:
+            limit: Stop after this many problems (all if None)
+
+        Returns:
+            True if the whole band is done
+        """
+        with log_stage("select"):
+            problems = self.band()
+        todo = [p for p in problems if str(p.get('ID')) not in self.done]
+        logger.info(
+            "📦 Backfill %s-%s (%s): %s problems, %s done, %s to generate",
+            self.min_rating, self.max_rating, "/".join(self.languages),
+            len(problems), len(problems) - len(todo), len(todo)
+        )
+        if limit is not None:
+            todo = todo[:limit]
+        if not todo:
+            return len(self.done) >= len(problems)
+
+        self._started = time.monotonic()
+        self._tokens_at_start = self.gemini.usage.summary()['run']['total_tokens']
+        last_report = self._started
+
+        pending = iter(todo)
+        in_flight: Dict[Future, Dict] = {}
+        stopped = False
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill")
+
+        try:
+            while True:
+                # Keep the pool full while the budget allows another problem
+                while not stopped and len(in_flight) < self.concurrency:
+                    if self._halted:
+                        logger.warning("%s, stopping backfill (resume later)", self._halted)
+                        stopped = True
+                        break
+                    problem = next(pending, None)
+                    if problem is None:
+                        break
+                    if not self._affordable(problem, len(in_flight)):
+                        logger.warning("Gemini daily budget reached, stopping backfill (resume later)")
+                        stopped = True
+                        break
+                    in_flight[executor.submit(self._generate, problem)] = problem
+
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, timeout=config.BACKFILL_REPORT_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    problem = in_flight.pop(future)
+                    self._finish(problem, future)
+
+                if time.monotonic() - last_report >= config.BACKFILL_REPORT_INTERVAL:
+                    self._report(len(todo))
+                    last_report = time.monotonic()
+
+        except KeyboardInterrupt:
+            logger.info("Backfill interrupted, waiting for %s problem(s) in flight", len(in_flight))
+            raise
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, problem in in_flight.items():
+                if future.done() and not future.cancelled():
+                    self._finish(problem, future)
+            self._save(force=True)
+            if self._completed:
+                self._report(len(todo))
+
+        remaining = sum(1 for p in problems if str(p.get('ID')) not in self.done)
+        logger.info("Backfill finished this session: %s problems still to do", remaining)
+        return remaining == 0
+
+    def _affordable(self, problem: Dict, in_flight: int) -> bool:
+        """Whether the budget covers this problem, the ones in flight and the daily delivery."""
+        estimate = self.gemini.estimate_tokens(str(problem.get('ID')), self.languages)
+        reserve = config.GEMINI_TWO_CALL_TOKEN_ESTIMATE
+        return self.gemini.usage.can_afford(estimate * (in_flight + 1) + reserve)
+
+    def _unavailable(self) -> Optional[str]:
+        """Why Gemini cannot generate anything right now (None if it can)."""
+        if self.gemini.resilience.breaker.is_open:
+            return "Gemini circuit is open"
+        if not self.gemini.usage.can_afford(config.GEMINI_SINGLE_CALL_TOKEN_ESTIMATE):
+            return "Gemini daily budget reached"
+        return None
+
+    def _generate(self, problem: Dict) -> Optional[bool]:
+        """
+        Generate one problem's solution into the cache (runs in a worker).
+
+        Returns:
+            True if every part of the solution is now cached, False if the
+            problem failed, None if Gemini was unavailable (left for resume)
+        """
+        problem_info = self.leetcode.format_problem_info(problem)
+        with log_stage("generate"):
+            self.gemini.generate_solution(problem_info, languages=self.languages)
+        # generate_solution always returns text; only fully cached solutions count
+        if self.gemini.cached_solution(problem_info, self.languages) is not None:
+            return True
+
+        # A fallback caused by the circuit or the budget is not the problem's fault
+        reason = self._unavailable()
+        if reason:
+            self._halted = reason
+            return None
+        return False
+
+    def _finish(self, problem: Dict, future: Future):
+        """Record the outcome of one problem."""
+        problem_id = str(problem.get('ID'))
+        try:
+            ok = future.result()
+        except Exception as e:
+            logger.error("Backfill of problem %s failed: %s", problem_id, e)
+            ok = False
+
+        if ok is None:
+            logger.info("Problem %s left for the next backfill: %s", problem_id, self._halted)
+            return
+
+        with self._lock:
+            self._completed += 1
+            if ok:
+                self.done.add(problem_id)
+                self.failed.pop(problem_id, None)
+            else:
+                self.failed[problem_id] = self.failed.get(problem_id, 0) + 1
+        self._save()
+
+    def _report(self, total: int):
+        """Log throughput and ETA for this session."""
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        tokens = self.gemini.usage.summary()['run']['total_tokens'] - self._tokens_at_start
+        per_minute = self._completed / elapsed * 60
+        eta = (total - self._completed) / per_minute * 60 if per_minute else float('inf')
+
+        logger.info(
+            "📦 Backfill %s/%s (%.1f%%), %s failed, %.1f problems/min, %.0f tokens/min, ETA %s",
+            self._completed, total, 100 * self._completed / total, len(self.failed),
+            per_minute, tokens / elapsed * 60,
+            _format_duration(eta) if eta != float('inf') else "unknown"
+        )
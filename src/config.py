@@ -21,11 +21,14 @@ class Config:
     LEETCODE_RATING_URL: str = "https://zerotrac.github.io/leetcode_problem_rating/data.json"
     LEETCODE_PROBLEM_URL: str = "https://leetcode.com/problems/{slug}/"
     RATING_TOLERANCE: int = 50
+    RATING_HISTOGRAM_BUCKET: int = 100  # Bucket width of the rating histogram
 
     # Google Sheets settings
     SHEET_NAME: str = "LeetCode_Daily_Tutor"
+    SPREADSHEET_KEY: str = ""  # Open by key (skips the name lookup); cached automatically if unset
     SETTINGS_WORKSHEET: str = "Settings"
     HISTORY_WORKSHEET: str = "History"
+    SETTINGS_CACHE_TTL: int = 60  # Seconds settings are trusted before checking the spreadsheet for changes
 
     # API Keys and Tokens (loaded from environment)
     telegram_bot_token: Optional[str] = None
@@ -37,14 +40,74 @@ class Config:
     GEMINI_MODEL: str = "gemini-2.5-flash"
     GEMINI_TEMPERATURE: float = 0.7
     GEMINI_MAX_TOKENS: int = 7500  # Safe limit (max is 8000)
+    GEMINI_REQUEST_TIMEOUT: int = 120  # Timeout for a single Gemini call (seconds)
+    GEMINI_STREAMING: bool = False  # Stream generation into a progressively edited message
+
+    # Gemini token budget (per UTC day, across all runs sharing STATE_DIR)
+    GEMINI_DAILY_TOKEN_BUDGET: int = 200000  # 0 disables the token budget
+    GEMINI_DAILY_COST_BUDGET: float = 0.0  # USD, 0 disables the cost budget
+    GEMINI_INPUT_PRICE_PER_MTOK: float = 0.30  # USD per 1M prompt tokens
+    GEMINI_OUTPUT_PRICE_PER_MTOK: float = 2.50  # USD per 1M output tokens
+    GEMINI_TWO_CALL_TOKEN_ESTIMATE: int = 6000  # Expected tokens for code + explanation calls
+    GEMINI_SINGLE_CALL_TOKEN_ESTIMATE: int = 3500  # Expected tokens for the combined call
+    GEMINI_CODE_TOKEN_ESTIMATE: int = 3000  # Expected tokens for one language's code call
+
+    # Gemini adaptive concurrency (grows on success, halves on HTTP 429)
+    GEMINI_INITIAL_CONCURRENCY: int = 2
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_TOKENS_PER_MINUTE: int = 250000  # Token quota per minute, 0 disables the bucket
+
+    # Solution languages (cpp, python, java, go), comma separated
+    SOLUTION_LANGUAGES: str = "cpp"
+
+    # Local compile check of generated C++ (skipped if the compiler is missing)
+    COMPILE_CHECK_ENABLED: bool = True
+    COMPILE_CHECK_COMPILER: str = "g++"
+    COMPILE_CHECK_MAX_ATTEMPTS: int = 2  # Re-prompts with the compiler error before giving up
+    COMPILE_CHECK_TIMEOUT: int = 30  # Seconds per compile
+    COMPILE_CHECK_WORKERS: int = 4  # Compiler processes run at once
 
     # Telegram settings
     TELEGRAM_MAX_MESSAGE_LENGTH: int = 4000  # Telegram limit is 4096, use 4000 for safety
     TELEGRAM_REQUEST_TIMEOUT: int = 30  # Timeout for Telegram API requests (seconds)
+    TELEGRAM_EDIT_INTERVAL: float = 1.5  # Minimum seconds between streaming message edits
+    TELEGRAM_DOCUMENT_DELIVERY: bool = True  # Send multi-chunk solutions as a summary plus one document
+
+    # Spaced-repetition reviews
+    REVIEW_RATIO: float = 0.0  # Share of deliveries that are due reviews (0 disables review mode)
+    REVIEW_DEFAULT_QUALITY: int = 4  # SM-2 recall quality assumed for a delivery (0-5)
+
+    # Digest mode (several problems per run)
+    DIGEST_SIZE: int = 3  # Problems per digest
+    DIGEST_QUEUE_SIZE: int = 1  # Generated problems waiting for delivery at most
+
+    # Backfill (python main.py backfill)
+    BACKFILL_CONCURRENCY: int = 4  # Problems generated at once
+    BACKFILL_REPORT_INTERVAL: int = 30  # Seconds between progress reports
+    BACKFILL_CHECKPOINT_INTERVAL: int = 5  # Minimum seconds between checkpoint writes
+
+    # Delivery outbox
+    OUTBOX_CONCURRENCY: int = 4  # Chats delivered to concurrently when draining
+    OUTBOX_MAX_ATTEMPTS: int = 5  # Failed drains before a message is given up on
 
     # HTTP request settings
     HTTP_REQUEST_TIMEOUT: int = 30  # Default timeout for HTTP requests (seconds)
     HTTP_QUICK_TIMEOUT: int = 10  # Timeout for quick API checks (seconds)
+    HTTP_POOL_SIZE: int = 4  # Minimum pooled connections per host (raised to cover the concurrency settings)
+    HTTP_STUBS: str = ""  # Redirect hosts to local stubs: "host=http://127.0.0.1:port,..."
+
+    # Retry and circuit breaker policy (shared by all external services)
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY: float = 1.0  # Backoff base (seconds), doubled per attempt with full jitter
+    RETRY_MAX_DELAY: float = 10.0  # Backoff ceiling (seconds)
+    CIRCUIT_FAILURE_THRESHOLD: int = 3  # Consecutive failed calls that open a circuit
+    CIRCUIT_RESET_TIMEOUT: int = 300  # Seconds before an open circuit allows a probe
+    # Per-dependency reset timeouts (seconds), overriding CIRCUIT_RESET_TIMEOUT
+    CIRCUIT_RESET_TIMEOUTS: str = "leetcode=900,sheets=300,gemini=300,telegram=120"
+
+    # Run deadline (hard bound on the whole run, shared by all outbound calls)
+    RUN_DEADLINE_SECONDS: int = 300  # 0 disables the run deadline
+    RUN_DEADLINE_RESERVE: int = 20  # Seconds kept back for the cheapest fallback delivery
 
     # Google Sheets settings (worksheet dimensions)
     SHEETS_SETTINGS_ROWS: int = 10
@@ -52,9 +115,69 @@ class Config:
     SHEETS_HISTORY_ROWS: int = 1000
     SHEETS_HISTORY_COLS: int = 1
 
+    # Local state (usage totals, caches, checkpoints)
+    STATE_DIR: str = ".state"
+
+    # Delivery schedule (used by daemon mode)
+    DELIVERY_TIME: str = "09:00"  # Default local delivery time (HH:MM)
+    TIMEZONE: str = "Asia/Taipei"  # Time zone of delivery times
+    TENANTS: str = ""  # Chats as "chat_id@HH:MM/cpp+python,..." (default: the configured chat)
+
+    # Daemon mode
+    DATASET_REFRESH_INTERVAL: int = 3600  # Seconds between background dataset refreshes
+    OUTBOX_DRAIN_INTERVAL: int = 300  # Seconds between background outbox drains
+    HEALTH_HOST: str = "127.0.0.1"
+    HEALTH_PORT: int = 8080  # Health/metrics endpoint port, 0 disables it
+
+    # Command bot (getUpdates long polling)
+    BOT_ENABLED: bool = False  # Also run the command bot inside the daemon
+    BOT_POLL_TIMEOUT: int = 25  # Seconds a getUpdates request is held open
+    BOT_WORKERS: int = 4  # Commands handled concurrently (one at a time per chat)
+    BOT_RATE_LIMIT_PER_MINUTE: int = 6  # Sustained commands per chat
+    BOT_RATE_LIMIT_BURST: int = 3  # Commands a chat may send back to back
+    BOT_RATING_STEP: int = 100  # Rating change per /harder or /easier
+    BOT_SETTINGS_TTL: int = 300  # Seconds the sent history stays cached
+
+    # Profiling (python main.py --profile)
+    PROFILE_TOP_ENTRIES: int = 25  # Allocation sites listed per stage report
+
     # Logging settings
     LOG_LEVEL: str = "INFO"
-    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"  # Text mode
+    LOG_FILE: str = ""  # Also log to this file
+    LOG_JSON: bool = False  # Emit structured JSON lines (with run_id and stage)
+
+    # Settings that may be overridden from the environment
+    OPTIONAL_OVERRIDES = (
+        "STATE_DIR",
+        "SPREADSHEET_KEY",
+        "SETTINGS_CACHE_TTL",
+        "HTTP_STUBS",
+        "CIRCUIT_RESET_TIMEOUT",
+        "CIRCUIT_RESET_TIMEOUTS",
+        "RUN_DEADLINE_SECONDS",
+        "GEMINI_STREAMING",
+        "GEMINI_DAILY_TOKEN_BUDGET",
+        "GEMINI_DAILY_COST_BUDGET",
+        "GEMINI_MAX_CONCURRENCY",
+        "GEMINI_TOKENS_PER_MINUTE",
+        "SOLUTION_LANGUAGES",
+        "COMPILE_CHECK_ENABLED",
+        "COMPILE_CHECK_COMPILER",
+        "TELEGRAM_DOCUMENT_DELIVERY",
+        "DIGEST_SIZE",
+        "REVIEW_RATIO",
+        "DELIVERY_TIME",
+        "TIMEZONE",
+        "TENANTS",
+        "HEALTH_PORT",
+        "BOT_ENABLED",
+        "PROFILE_TOP_ENTRIES",
+        "LOG_LEVEL",
+        "LOG_FORMAT",
+        "LOG_FILE",
+        "LOG_JSON",
+    )
 
     def __post_init__(self):
         """Load environment variables after initialization."""
@@ -67,6 +190,10 @@ class Config:
         self.gemini_api_key = self._get_env_var("GEMINI_API_KEY")
         self.google_sheets_json = self._get_env_var("GOOGLE_SHEETS_JSON")
 
+        # Optional overrides for tunable settings
+        for name in self.OPTIONAL_OVERRIDES:
+            setattr(self, name, self._get_optional_env_var(name, getattr(self, name)))
+
     @staticmethod
     def _get_env_var(var_name: str) -> str:
         """
@@ -88,6 +215,30 @@ class Config:
             sys.exit(1)
         return value
 
+    @staticmethod
+    def _get_optional_env_var(var_name: str, default):
+        """
+        Retrieve an optional environment variable, cast to the default's type.
+
+        Args:
+            var_name: Name of the environment variable
+            default: Value used when the variable is unset or invalid
+
+        Returns:
+            Parsed value of the environment variable, or the default
+        """
+        value = os.getenv(var_name)
+        if value is None or value == "":
+            return default
+
+        try:
+            if isinstance(default, bool):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+            return type(default)(value)
+        except (TypeError, ValueError):
+            print(f"⚠️  Warning: Invalid value for '{var_name}', using default {default!r}")
+            return default
+
     def validate(self) -> bool:
         """
         Validate that all required configuration is present.
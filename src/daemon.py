@@ -0,0 +1,199 @@
+"""
+Daemon mode.
+
+Keeps one LeetCodeDailyTutor (and its authenticated clients, dataset index
+and caches) alive, delivers to every tenant at its own time from an
+in-process scheduler, refreshes the dataset and drains the outbox in the
+background, and serves a local health/metrics endpoint. With BOT_ENABLED
+the command bot runs alongside on the same problem index. Settings
+worksheet changes are picked up without a restart, including a new
+delivery time.
+"""
+
+import signal
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.config import config
+from src.services.bot import CommandBot
+from src.services.outbox import drain_outbox
+from src.utils.journal import RunJournal
+from src.utils.logger import logger
+from src.utils.metrics import HealthServer, metrics
+from src.utils.scheduler import Scheduler
+from src.utils.tenants import Tenant, delivery_timezone, load_tenants
+
+
+class TutorDaemon:
+    """Long-running scheduler around a warm LeetCodeDailyTutor."""
+
+    def __init__(self, app, tenants: Optional[List[Tenant]] = None):
+        """
+        Initialize daemon.
+
+        Args:
+            app: Initialized LeetCodeDailyTutor
+            tenants: Chats to deliver to (defaults to load_tenants(), which
+                     follows the delivery time in the Settings worksheet)
+        """
+        self.app = app
+        self.follow_settings = tenants is None
+        self.default_time = config.DELIVERY_TIME
+        self.tenants = tenants or load_tenants()
+        self.timezone = delivery_timezone()
+        self.scheduler = Scheduler()
+        self.health: Optional[HealthServer] = None
+        self.bot: Optional[CommandBot] = None
+        self.last_results: Dict[str, Dict] = {}
+
+    def _now(self) -> datetime:
+        """Current time in the delivery time zone."""
+        return datetime.now(self.timezone)
+
+    def deliver(self, tenant: Tenant):
+        """
+        Run one tenant's daily delivery with a fresh run deadline.
+
+        Args:
+            tenant: Tenant to deliver to
+        """
+        self.app.deadline.restart()
+        with metrics.timer("delivery"):
+            exit_code = self.app.run(
+                chat_id=tenant.chat_id,
+                dataset_max_age=config.DATASET_REFRESH_INTERVAL,
+                languages=tenant.solution_languages
+            )
+
+        metrics.inc("deliveries" if exit_code == 0 else "delivery_failures")
+        self.last_results[tenant.chat_id] = {
+            'ok': exit_code == 0,
+            'at': self._now().isoformat(timespec="seconds"),
+        }
+
+    def refresh_dataset(self):
+        """Refresh the rating dataset and index ahead of the next delivery."""
+        self.app.deadline.restart()
+        with metrics.timer("dataset_refresh"):
+            self.app.leetcode.fetch_problem_ratings()
+        metrics.inc("dataset_refreshes")
+
+    def drain(self):
+        """Retry undelivered outbox messages."""
+        self.app.deadline.restart()
+        result = drain_outbox(self.app.telegram, outbox=self.app.outbox)
+        metrics.inc("outbox_sent", len(result.sent))
+        metrics.inc("outbox_failed", len(result.failed))
+
+    def refresh_settings(self):
+        """
+        Re-check the Settings worksheet (a cheap revision check unless it
+        changed) and reschedule tenants whose delivery time moved.
+        """
+        self.app.deadline.restart()
+        settings = self.app.sheets.get_settings()
+        default_time = settings.delivery_time or config.DELIVERY_TIME
+        if not self.follow_settings or default_time == self.default_time:
+            return
+
+        self.default_time = default_time
+        previous = {tenant.chat_id: tenant for tenant in self.tenants}
+        self.tenants = load_tenants(default_time)
+
+        for tenant in self.tenants:
+            old = previous.get(tenant.chat_id)
+            if old is None or old.delivery_time == tenant.delivery_time:
+                continue
+            if self.scheduler.move(f"deliver:{tenant.chat_id}", self._first_due(tenant)):
+                logger.info(
+                    "Rescheduled chat %s daily at %s (%s)",
+                    tenant.chat_id, tenant.delivery_time.strftime("%H:%M"), config.TIMEZONE
+                )
+
+    def _tenant(self, chat_id: str) -> Tenant:
+        """Current tenant entry of a chat (entries are replaced when settings change)."""
+        return next(tenant for tenant in self.tenants if tenant.chat_id == chat_id)
+
+    def _first_due(self, tenant: Tenant) -> float:
+        """Due time of a tenant's next delivery, catching up on a missed one."""
+        now = self._now()
+        if tenant.due_today(now) and not RunJournal(chat_id=tenant.chat_id).complete:
+            logger.info("Chat %s missed today's delivery, catching up now", tenant.chat_id)
+            return now.timestamp()
+        return tenant.next_delivery(now).timestamp()
+
+    def _schedule_tenant(self, tenant: Tenant):
+        """Schedule a tenant's daily delivery, catching up on a missed one."""
+        chat_id = tenant.chat_id
+
+        def next_due(_finished: float) -> float:
+            return self._tenant(chat_id).next_delivery(self._now()).timestamp()
+
+        self.scheduler.schedule(
+            f"deliver:{chat_id}", lambda: self.deliver(self._tenant(chat_id)), self._first_due(tenant), next_due
+        )
+
+    def status(self) -> Dict:
+        """Extra fields for the health endpoint."""
+        return {
+            'tenants': len(self.tenants),
+            'dataset_size': len(self.app.leetcode.index) if self.app.leetcode.index else 0,
+            'last_deliveries': self.last_results,
+            'next_jobs': [
+                {'job': name, 'due': datetime.fromtimestamp(due, self.timezone).isoformat(timespec="seconds")}
+                for name, due in self.scheduler.pending()
+            ],
+        }
+
+    def run(self) -> int:
+        """
+        Serve until SIGINT/SIGTERM.
+
+        Returns:
+            Exit code
+        """
+        # Warm the index right away; later refreshes run in the background
+        self.scheduler.every("refresh-dataset", self.refresh_dataset, config.DATASET_REFRESH_INTERVAL, delay=0)
+        self.scheduler.every("drain-outbox", self.drain, config.OUTBOX_DRAIN_INTERVAL)
+
+        # Delivery times from the Settings worksheet apply before the first schedule
+        try:
+            self.refresh_settings()
+        except Exception as e:
+            logger.warning("Could not read settings, using configured delivery times: %s", e)
+        self.scheduler.every("refresh-settings", self.refresh_settings, config.SETTINGS_CACHE_TTL)
+
+        for tenant in self.tenants:
+            self._schedule_tenant(tenant)
+            logger.info(
+                "Scheduled chat %s daily at %s (%s)",
+                tenant.chat_id, tenant.delivery_time.strftime("%H:%M"), config.TIMEZONE
+            )
+
+        if config.HEALTH_PORT:
+            self.health = HealthServer(config.HEALTH_HOST, config.HEALTH_PORT, status=self.status)
+            self.health.start()
+
+        if config.BOT_ENABLED:
+            # Shares the warm problem index with scheduled deliveries
+            self.bot = CommandBot(leetcode=self.app.leetcode)
+            self.bot.start_background()
+
+        def shutdown(signum, _frame):
+            logger.info("Received signal %s, shutting down after the current job", signum)
+            self.scheduler.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        logger.info("🕒 Daemon started with %s tenant(s)", len(self.tenants))
+        try:
+            self.scheduler.run_forever()
+        finally:
+            if self.bot:
+                self.bot.stop()
+            if self.health:
+                self.health.stop()
+
+        logger.info("Daemon stopped")
+        return 0
@@ -0,0 +1,217 @@
+"""
+Digest mode.
+
+Delivers several distinct problems in one run. Generation and delivery run
+as a bounded producer/consumer pipeline: a producer thread generates and
+renders problem k+1 while the calling thread delivers problem k through the
+outbox, so Gemini latency overlaps Telegram delivery. Delivered problems are
+checkpointed per day and chat, and recorded in history with one batched
+write at the end.
+"""
+
+import contextvars
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from src.config import config
+from src.services.outbox import Outbox, drain_outbox
+from src.services.telegram import Part
+from src.utils.logger import log_stage, logger
+from src.utils.state import load_json, save_json, state_path
+from src.utils.tenants import delivery_date
+
+
+@dataclass
+class DigestItem:
+    """One generated and rendered problem waiting for delivery."""
+
+    problem_id: str
+    chunks: List[Part]
+
+
+@dataclass
+class ProducerFailed:
+    """Ends the producer's output early with the error that stopped it."""
+
+    error: Exception
+
+
+class DigestRun:
+    """Pipelined delivery of several problems to one chat."""
+
+    # Marks the end of the producer's output
+    _DONE = object()
+
+    def __init__(
+        self,
+        app,
+        count: Optional[int] = None,
+        chat_id: Optional[str] = None,
+        languages: Optional[Sequence[str]] = None
+    ):
+        """
+        Initialize digest run.
+
+        Args:
+            app: Initialized LeetCodeDailyTutor
+            count: Number of problems (defaults to config.DIGEST_SIZE)
+            chat_id: Chat to deliver to (defaults to the configured chat)
+            languages: Solution languages (defaults to config.SOLUTION_LANGUAGES)
+        """
+        self.app = app
+        self.count = count or config.DIGEST_SIZE
+        self.chat_id = str(chat_id or config.telegram_chat_id)
+        self.languages = languages
+        self.day = delivery_date().isoformat()
+        self.path = state_path("digest", f"{self.day}_{self.chat_id}.json")
+        self.state: Dict = load_json(self.path, default=None) or {}
+
+    def _save(self):
+        """Persist the digest checkpoint."""
+        save_json(self.path, self.state)
+
+    def run(self, dataset_max_age: Optional[float] = None) -> bool:
+        """
+        Select, generate and deliver the digest.
+
+        A re-run on the same day delivers the same problems and skips the
+        ones already delivered.
+
+        Args:
+            dataset_max_age: Passed to select_problems
+
+        Returns:
+            True if every problem was delivered and recorded
+        """
+        problems = self.state.get('problems')
+        if problems:
+            logger.info("♻️  Resuming today's digest of %s problems", len(problems))
+        else:
+            with log_stage("select"):
+                problems = self.app.select_problems(self.count, dataset_max_age)
+            if not problems:
+                return False
+            self.state = {'problems': problems, 'delivered': [], 'recorded': False}
+            self._save()
+
+        delivered = set(self.state['delivered'])
+        todo = [p for p in problems if str(p.get('ID')) not in delivered]
+        if todo:
+            logger.info("📚 Digest: %s of %s problems to deliver", len(todo), len(problems))
+            self._pipeline(todo)
+
+        if len(self.state['delivered']) < len(problems):
+            logger.error(
+                "Digest delivered %s of %s problems", len(self.state['delivered']), len(problems)
+            )
+            return False
+
+        if not self.state['recorded']:
+            with log_stage("record"):
+                if not self.app.sheets.add_many_to_history(self.state['delivered']):
+                    logger.warning("Failed to update history (digest was sent)")
+                    return True
+            self.state['recorded'] = True
+            self._save()
+
+        return True
+
+    def _pipeline(self, problems: List[Dict]):
+        """
+        Generate in a producer thread while delivering on this one.
+
+        Raises:
+            Exception: Whatever stopped the producer, once the problems it
+                       finished before have been delivered
+        """
+        items: queue.Queue = queue.Queue(maxsize=config.DIGEST_QUEUE_SIZE)
+        stop = threading.Event()
+
+        # copy_context keeps the run ID on the producer's log records
+        producer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._produce, problems, items, stop),
+            name="digest-producer",
+            daemon=True
+        )
+        producer.start()
+
+        try:
+            while True:
+                item = items.get()
+                if item is self._DONE:
+                    break
+                if isinstance(item, ProducerFailed):
+                    logger.error("Digest generation stopped: %s", item.error)
+                    raise item.error
+                with log_stage("send"):
+                    if not self._deliver(item):
+                        logger.error("Digest delivery stopped at problem %s (kept in outbox)", item.problem_id)
+                        break
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue
+            while producer.is_alive():
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+    def _produce(self, problems: List[Dict], items: queue.Queue, stop: threading.Event):
+        """
+        Generate and render each problem, blocking while the queue is full.
+
+        Errors end the output with a ProducerFailed item instead of escaping
+        the thread, so the consumer fails the run rather than reporting a
+        short digest.
+        """
+        outcome = self._DONE
+        try:
+            for problem in problems:
+                if stop.is_set():
+                    return
+                problem_info = self.app.leetcode.format_problem_info(problem)
+
+                with log_stage("generate"):
+                    try:
+                        solution = self.app.gemini.generate_solution(problem_info, languages=self.languages)
+                    except Exception as e:
+                        logger.error("Solution generation failed for %s: %s", problem_info['id'], e)
+                        solution = "⚠️ AI 解法生成失敗，請參考題目連結"
+
+                with log_stage("render"):
+                    chunks = self.app.telegram.render_for_delivery(problem_info, solution)
+
+                items.put(DigestItem(problem_info['id'], chunks))
+        except Exception as e:
+            outcome = ProducerFailed(e)
+        finally:
+            items.put(outcome)
+
+    def _deliver(self, item: DigestItem) -> bool:
+        """
+        Deliver one problem through the outbox and checkpoint it.
+
+        Returns:
+            True if every chunk was delivered
+        """
+        outbox = self.app.outbox
+        keys = outbox.enqueue_chunks(
+            f"{self.day}:{self.chat_id}:digest:{item.problem_id}", self.chat_id, item.chunks
+        )
+        drain_outbox(self.app.telegram, chat_id=self.chat_id, outbox=outbox)
+
+        statuses = outbox.statuses(keys)
+        if any(statuses.get(key) != Outbox.SENT for key in keys):
+            return False
+
+        self.state['delivered'].append(item.problem_id)
+        self._save()
+        logger.info(
+            "✅ Digest problem %s delivered (%s/%s)",
+            item.problem_id, len(self.state['delivered']), len(self.state['problems'])
+        )
+        return True
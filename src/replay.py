@@ -0,0 +1,675 @@
+"""
+Record/replay mode.
+
+Record runs the daily pipeline for real in a fresh state directory and
+captures every outbound interaction into one fixture bundle: HTTP exchanges
+(rating dataset, Bot API), the Settings and History worksheets, and each
+Gemini response keyed by its prompt. Replay serves the bundle from local
+stand-ins (an HTTP server for the dataset and the Bot API, an in-memory
+spreadsheet, a stub Gemini client) with configurable injected latency, so
+end-to-end latency and throughput can be measured offline and reproducibly.
+The random seed is part of the bundle, so a replay selects the same problem
+and sends the same prompts as the recording.
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import gspread
+
+from src.config import config
+from src.services.sheets import Settings
+from src.utils.http import get_transport
+from src.utils.logger import logger
+from src.utils.state import load_json, save_json
+
+FIXTURE_VERSION = 1
+
+# Dependencies that accept injected latency
+LATENCY_TARGETS = ("dataset", "telegram", "sheets", "gemini")
+
+# Host of the Bot API (the rating dataset host comes from its URL)
+TELEGRAM_HOST = "api.telegram.org"
+
+# Chunks a replayed Gemini answer is streamed in
+STREAM_CHUNKS = 8
+
+_BOT_METHOD = re.compile(r'^/bot[^/]+/(\w+)')
+
+
+class ReplayMiss(RuntimeError):
+    """A replayed run made a request the fixture has no answer for."""
+
+
+def parse_latency(value: str) -> Dict[str, float]:
+    """
+    Parse injected latency such as ``gemini=1500,telegram=80`` (milliseconds).
+
+    Args:
+        value: Comma-separated ``target=ms`` entries
+
+    Returns:
+        Seconds per target (unlisted targets get none)
+
+    Raises:
+        ValueError: If a target is unknown or a value is not a number
+    """
+    latency = {}
+    for entry in value.split(","):
+        target, _, ms = entry.strip().partition("=")
+        if not target:
+            continue
+        if target not in LATENCY_TARGETS:
+            raise ValueError(f"Unknown latency target {target!r} (one of {', '.join(LATENCY_TARGETS)})")
+        latency[target] = float(ms) / 1000
+    return latency
+
+
+def prompt_key(prompt) -> str:
+    """Fixture key of a Gemini prompt."""
+    return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()[:24]
+
+
+def _usage(usage_metadata) -> Dict[str, int]:
+    """Token counts of a usage_metadata object."""
+    return {
+        name: int(getattr(usage_metadata, name, 0) or 0)
+        for name in ("prompt_token_count", "candidates_token_count", "total_token_count")
+    }
+
+
+# ---- Recording -------------------------------------------------------------
+
+class Recorder:
+    """Collects the outbound interactions of one run into a fixture bundle."""
+
+    def __init__(self, seed: int):
+        """
+        Start an empty bundle.
+
+        Args:
+            seed: Random seed the recorded run uses
+        """
+        self.bundle: Dict = {
+            'version': FIXTURE_VERSION,
+            'recorded_at': datetime.now().isoformat(timespec="seconds"),
+            'seed': seed,
+            'http': [],
+            'sheets': {},
+            'gemini': {},
+        }
+        self._lock = threading.Lock()
+
+    def on_http(self, method: str, url: str, response):
+        """
+        Transport hook: keep one HTTP exchange.
+
+        Args:
+            method: HTTP method
+            url: Requested URL (before any stub override)
+            response: Response received
+        """
+        headers = {
+            name: response.headers[name]
+            for name in ("Content-Type", "ETag", "Last-Modified")
+            if name in response.headers
+        }
+        with self._lock:
+            self.bundle['http'].append({
+                'method': method,
+                'url': url,
+                'status': response.status_code,
+                'headers': headers,
+                'body': response.text,
+            })
+
+    def snapshot_sheets(self, spreadsheet: gspread.Spreadsheet):
+        """
+        Keep the worksheets the run reads.
+
+        Args:
+            spreadsheet: Connected spreadsheet
+        """
+        self.bundle['sheets'] = {
+            'settings': spreadsheet.worksheet(config.SETTINGS_WORKSHEET).get(Settings.RANGE),
+            'history': spreadsheet.worksheet(config.HISTORY_WORKSHEET).col_values(1),
+        }
+
+    def on_gemini(self, prompt, text: str, usage_metadata):
+        """
+        Keep one Gemini answer.
+
+        Args:
+            prompt: Prompt contents sent to the model
+            text: Complete answer text
+            usage_metadata: Token usage reported with the answer (may be None)
+        """
+        with self._lock:
+            self.bundle['gemini'][prompt_key(prompt)] = {
+                'text': text,
+                'usage': _usage(usage_metadata),
+            }
+
+    def save(self, path: str):
+        """
+        Write the bundle.
+
+        Args:
+            path: Fixture file path (JSON)
+        """
+        save_json(path, self.bundle)
+        logger.info(
+            "📼 Fixture saved to %s (%s HTTP exchanges, %s Gemini answers, %s history rows)",
+            path, len(self.bundle['http']), len(self.bundle['gemini']),
+            len(self.bundle['sheets'].get('history', []))
+        )
+
+
+class _RecordingModels:
+    """``client.models`` proxy that records every answer."""
+
+    def __init__(self, models, recorder: Recorder):
+        """
+        Wrap a ``client.models`` object.
+
+        Args:
+            models: The real SDK models object
+            recorder: Recorder receiving every answer
+        """
+        self._models = models
+        self._recorder = recorder
+
+    def generate_content(self, model: str, contents, config=None):
+        """
+        Call the real model and record its answer.
+
+        Args:
+            model: Model name
+            contents: Prompt
+            config: Generation config
+
+        Returns:
+            The SDK response, unchanged
+        """
+        response = self._models.generate_content(model=model, contents=contents, config=config)
+        self._recorder.on_gemini(contents, response.text or "", getattr(response, 'usage_metadata', None))
+        return response
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator:
+        """
+        Stream from the real model, recording the answer once it is complete.
+
+        Args:
+            model: Model name
+            contents: Prompt
+            config: Generation config
+
+        Returns:
+            Iterator over the SDK's response chunks, unchanged
+        """
+        parts = []
+        usage_metadata = None
+        for chunk in self._models.generate_content_stream(model=model, contents=contents, config=config):
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                usage_metadata = chunk.usage_metadata
+            if chunk.text:
+                parts.append(chunk.text)
+            yield chunk
+        self._recorder.on_gemini(contents, ''.join(parts), usage_metadata)
+
+    def __getattr__(self, name):
+        """Pass every other attribute through to the real models object."""
+        return getattr(self._models, name)
+
+
+class RecordingGeminiClient:
+    """Gemini client wrapper feeding a Recorder."""
+
+    def __init__(self, client, recorder: Recorder):
+        """
+        Wrap a Gemini client.
+
+        Args:
+            client: The real ``genai.Client``
+            recorder: Recorder receiving every answer
+        """
+        self.models = _RecordingModels(client.models, recorder)
+
+
+# ---- Stand-ins -------------------------------------------------------------
+
+class StubGeminiClient:
+    """Gemini client answering from a fixture bundle after injected latency."""
+
+    def __init__(self, answers: Dict[str, Dict], latency: float = 0.0):
+        """
+        Initialize stub.
+
+        Args:
+            answers: Recorded answers by prompt key
+            latency: Seconds per request
+        """
+        self.models = self
+        self.answers = answers
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, contents) -> Dict:
+        """Recorded answer for a prompt."""
+        with self._lock:
+            self.calls += 1
+        answer = self.answers.get(prompt_key(contents))
+        if answer is None:
+            raise ReplayMiss("No recorded Gemini answer for this prompt")
+        return answer
+
+    @staticmethod
+    def _response(text: str, usage: Optional[Dict[str, int]]) -> SimpleNamespace:
+        """Response object shaped like the SDK's."""
+        return SimpleNamespace(
+            text=text,
+            candidates=[SimpleNamespace(finish_reason='STOP')],
+            usage_metadata=SimpleNamespace(**usage) if usage else None,
+        )
+
+    def generate_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        """
+        Answer a prompt from the fixture after the injected latency.
+
+        Args:
+            model: Model name (ignored)
+            contents: Prompt
+            config: Generation config (ignored)
+
+        Returns:
+            Response shaped like the SDK's
+
+        Raises:
+            ReplayMiss: If the fixture has no answer for the prompt
+        """
+        answer = self._answer(contents)
+        time.sleep(self.latency)
+        return self._response(answer['text'], answer['usage'])
+
+    def generate_content_stream(self, model: str, contents, config=None) -> Iterator[SimpleNamespace]:
+        """
+        Stream a recorded answer in STREAM_CHUNKS pieces spread over the
+        injected latency.
+
+        Args:
+            model: Model name (ignored)
+            contents: Prompt
+            config: Generation config (ignored)
+
+        Returns:
+            Iterator over response chunks shaped like the SDK's
+
+        Raises:
+            ReplayMiss: If the fixture has no answer for the prompt
+        """
+        answer = self._answer(contents)
+        text = answer['text']
+        size = max(1, math.ceil(len(text) / STREAM_CHUNKS))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for i, piece in enumerate(pieces):
+            time.sleep(self.latency / len(pieces))
+            # Usage is cumulative; only the final chunk carries the totals
+            yield self._response(piece, answer['usage'] if i == len(pieces) - 1 else None)
+
+
+class FakeWorksheet:
+    """In-memory worksheet serving recorded rows."""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", rows: List[List[str]]):
+        """
+        Initialize worksheet.
+
+        Args:
+            spreadsheet: Owning spreadsheet (counts requests, applies latency)
+            rows: Recorded rows
+        """
+        self.spreadsheet = spreadsheet
+        self.rows = [list(row) for row in rows]
+
+    def get(self, _range: str) -> List[List[str]]:
+        """
+        Read the worksheet's rows.
+
+        Args:
+            _range: A1 range (ignored; the recorded rows are the range)
+
+        Returns:
+            Copy of the rows
+        """
+        self.spreadsheet.wait()
+        return [list(row) for row in self.rows]
+
+    def col_values(self, column: int) -> List[str]:
+        """
+        Read one column.
+
+        Args:
+            column: 1-based column number
+
+        Returns:
+            Cell values of the column ('' for short rows)
+        """
+        self.spreadsheet.wait()
+        return [row[column - 1] if len(row) >= column else '' for row in self.rows]
+
+    def append_rows(self, rows: List[List]):
+        """
+        Append rows, bumping the spreadsheet's revision.
+
+        Args:
+            rows: Rows to append
+        """
+        self.spreadsheet.wait()
+        self.rows.extend([str(value) for value in row] for row in rows)
+        self.spreadsheet.revision += 1
+
+
+class FakeSpreadsheet:
+    """In-memory stand-in for the tutor's spreadsheet."""
+
+    id = "replay"
+
+    def __init__(self, sheets: Dict, latency: float = 0.0):
+        """
+        Initialize stand-in.
+
+        Args:
+            sheets: Recorded worksheets ({'settings': rows, 'history': column})
+            latency: Seconds per request
+        """
+        self.latency = latency
+        self.revision = 1
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.worksheets = {
+            config.SETTINGS_WORKSHEET: FakeWorksheet(self, sheets.get('settings', [])),
+            config.HISTORY_WORKSHEET: FakeWorksheet(self, [[value] for value in sheets.get('history', [])]),
+        }
+
+    def wait(self):
+        """Count a request and apply the injected latency."""
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        """
+        Look up a worksheet.
+
+        Args:
+            title: Worksheet title
+
+        Returns:
+            The recorded worksheet
+
+        Raises:
+            gspread.exceptions.WorksheetNotFound: If it was not recorded
+        """
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def get_lastUpdateTime(self) -> str:
+        """
+        Revision marker, changing whenever rows are appended.
+
+        Returns:
+            Opaque revision string
+        """
+        self.wait()
+        return f"replay-{self.revision}"
+
+
+class StandInServer:
+    """Local HTTP server answering for the rating dataset and the Bot API."""
+
+    def __init__(self, exchanges: List[Dict], latency: Optional[Dict[str, float]] = None):
+        """
+        Initialize server on a free local port.
+
+        Args:
+            exchanges: Recorded HTTP exchanges; successful GETs are served by path
+            latency: Seconds per request by target ("dataset", "telegram")
+        """
+        self.latency = latency or {}
+        self.documents: Dict[str, Dict] = {}
+        for exchange in exchanges:
+            if exchange['method'] == "GET" and exchange['status'] == 200 and not _BOT_METHOD.match(
+                urlsplit(exchange['url']).path
+            ):
+                self.documents[self._path(exchange['url'])] = exchange
+
+        self.calls: Dict[str, int] = {}
+        self._message_id = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @staticmethod
+    def _path(url: str) -> str:
+        """Path and query of a URL."""
+        parts = urlsplit(url)
+        return parts.path + (f"?{parts.query}" if parts.query else "")
+
+    @property
+    def base_url(self) -> str:
+        """Scheme and authority to redirect hosts to."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _bot_result(self, method: str) -> Dict:
+        """Plausible result of a Bot API method."""
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self._message_id += 1
+            message_id = self._message_id
+
+        if method == "getMe":
+            return {'id': 1, 'is_bot': True, 'username': "replay_bot"}
+        if method == "getUpdates":
+            return []
+        return {'message_id': message_id, 'date': int(time.time()), 'chat': {'id': config.telegram_chat_id}}
+
+    def _handler(self):
+        """Build the request handler class bound to this server."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Bot API and file host for the recorded Telegram traffic."""
+
+            def _reply(self, status: int, body: bytes, headers: Dict[str, str]):
+                """Send a complete response."""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self):
+                """Answer a Bot API call or serve a recorded document."""
+                # Drain the request body (JSON or multipart upload)
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+                match = _BOT_METHOD.match(self.path)
+                if match:
+                    time.sleep(server.latency.get("telegram", 0.0))
+                    body = json.dumps({'ok': True, 'result': server._bot_result(match.group(1))})
+                    self._reply(200, body.encode(), {"Content-Type": "application/json"})
+                    return
+
+                document = server.documents.get(self.path)
+                if document is None:
+                    self.send_error(404, "Not recorded")
+                    return
+                time.sleep(server.latency.get("dataset", 0.0))
+                self._reply(200, document['body'].encode("utf-8"), document['headers'])
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, format, *args):
+                """Route access logs to the debug log."""
+                logger.debug("Stand-in server: " + format, *args)
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread.start()
+        logger.info("Stand-in server listening on %s", self.base_url)
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---- Entry points ----------------------------------------------------------
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def record_fixture(path: str, app_factory: Callable, seed: Optional[int] = None) -> int:
+    """
+    Run the pipeline for real and record its interactions.
+
+    The run uses a fresh state directory, so it selects, generates and
+    delivers from scratch (to the configured chat and spreadsheet).
+
+    Args:
+        path: Fixture file to write
+        app_factory: Builds a LeetCodeDailyTutor (called with no arguments)
+        seed: Random seed (a random one if None)
+
+    Returns:
+        Exit code of the recorded run
+    """
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    recorder = Recorder(seed)
+    transport = get_transport()
+    state_dir = config.STATE_DIR
+
+    with tempfile.TemporaryDirectory(prefix="leetcode-tutor-record-") as scratch:
+        config.STATE_DIR = scratch
+        transport.recorder = recorder.on_http
+        try:
+            app = app_factory()
+            recorder.snapshot_sheets(app.sheets.spreadsheet)
+            app.gemini.client = RecordingGeminiClient(app.gemini.client, recorder)
+
+            random.seed(seed)
+            exit_code = app.run()
+        finally:
+            transport.recorder = None
+            config.STATE_DIR = state_dir
+
+    recorder.save(path)
+    return exit_code
+
+
+def replay_fixture(
+    path: str,
+    app_factory: Callable,
+    runs: int = 1,
+    latency: Optional[Dict[str, float]] = None
+) -> Dict:
+    """
+    Replay a fixture against local stand-ins and measure the pipeline.
+
+    Every run starts from a fresh state directory and the recorded seed.
+
+    Args:
+        path: Fixture file
+        app_factory: Builds a LeetCodeDailyTutor (called with ``spreadsheet=``)
+        runs: Number of end-to-end runs
+        latency: Injected seconds per request by target (see parse_latency)
+
+    Returns:
+        Report with per-run latency percentiles, throughput and call counts
+
+    Raises:
+        ValueError: If the fixture is missing or of another version
+    """
+    bundle = load_json(path, default=None)
+    if not bundle or bundle.get('version') != FIXTURE_VERSION:
+        raise ValueError(f"{path} is not a version {FIXTURE_VERSION} fixture")
+
+    latency = latency or {}
+    server = StandInServer(bundle['http'], latency)
+    server.start()
+
+    transport = get_transport()
+    hosts = [urlsplit(config.LEETCODE_RATING_URL).hostname, TELEGRAM_HOST]
+    for host in hosts:
+        transport.override(host, server.base_url)
+
+    state_dir = config.STATE_DIR
+    durations: List[float] = []
+    failures = 0
+    gemini_calls = sheets_requests = 0
+
+    try:
+        for i in range(runs):
+            with tempfile.TemporaryDirectory(prefix="leetcode-tutor-replay-") as scratch:
+                config.STATE_DIR = scratch
+                spreadsheet = FakeSpreadsheet(bundle['sheets'], latency.get("sheets", 0.0))
+                app = app_factory(spreadsheet=spreadsheet)
+                gemini = StubGeminiClient(bundle['gemini'], latency.get("gemini", 0.0))
+                app.gemini.client = gemini
+
+                random.seed(bundle['seed'])
+                start = time.perf_counter()
+                exit_code = app.run()
+                durations.append(time.perf_counter() - start)
+
+                failures += int(exit_code != 0)
+                gemini_calls += gemini.calls
+                sheets_requests += spreadsheet.requests
+                logger.info("Replay run %s/%s: exit %s in %.2fs", i + 1, runs, exit_code, durations[-1])
+    finally:
+        config.STATE_DIR = state_dir
+        for host in hosts:
+            transport.override(host, None)
+        server.stop()
+
+    total = sum(durations)
+    report = {
+        'fixture': path,
+        'runs': runs,
+        'failures': failures,
+        'latency_injected_ms': {target: round(seconds * 1000, 1) for target, seconds in latency.items()},
+        'run_p50_s': round(_percentile(durations, 50), 3),
+        'run_p95_s': round(_percentile(durations, 95), 3),
+        'run_max_s': round(max(durations), 3),
+        'runs_per_minute': round(runs / total * 60, 2) if total else None,
+        'bot_api_calls': dict(server.calls),
+        'gemini_calls': gemini_calls,
+        'sheets_requests': sheets_requests,
+    }
+    logger.info(
+        "📼 Replay: %s run(s), %s failed, p50 %.2fs, p95 %.2fs, max %.2fs, %.1f runs/min",
+        runs, failures, report['run_p50_s'], report['run_p95_s'], report['run_max_s'],
+        report['runs_per_minute'] or 0
+    )
+    return report
@@ -0,0 +1,310 @@
+"""
+Telegram command bot.
+Long-polls getUpdates and answers on-demand commands (/next, /harder,
+/easier, /again) from the in-memory problem index and the solution cache.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+
+from src.config import config
+from src.services.gemini import GeminiService
+from src.services.leetcode import LeetCodeService
+from src.services.sheets import SheetsService
+from src.services.telegram import Part, TelegramService
+from src.utils.deadline import Deadline
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.rate_limit import KeyedRateLimiter
+from src.utils.scheduler import Scheduler
+from src.utils.state import load_json, save_json, state_path
+from src.utils.tenants import load_tenants
+
+
+HELP_TEXT = (
+    "📚 <b>LeetCode Daily Tutor</b>\n\n"
+    "/next - 換一題（目前難度）\n"
+    "/harder - 難一點的題目\n"
+    "/easier - 簡單一點的題目\n"
+    "/again - 重新發送上一題"
+)
+
+
+class CommandBot:
+    """Long-polling bot answering commands from authorized chats."""
+
+    def __init__(self, leetcode: Optional[LeetCodeService] = None):
+        """
+        Initialize bot.
+
+        Args:
+            leetcode: Service holding a warm problem index (shared with the
+                      daemon, which keeps it fresh); if None the bot creates
+                      one and warms and refreshes it itself
+        """
+        # Commands are interactive: each call is bounded by its own timeout
+        self.deadline = Deadline()
+        self.owns_index = leetcode is None
+        self.leetcode = leetcode or LeetCodeService(self.deadline)
+        self.sheets = SheetsService(self.deadline)
+        self.gemini = GeminiService(self.deadline)
+        self.telegram = TelegramService(self.deadline)
+
+        self.tenants = {tenant.chat_id: tenant for tenant in load_tenants()}
+        self.limiter = KeyedRateLimiter(config.BOT_RATE_LIMIT_PER_MINUTE, config.BOT_RATE_LIMIT_BURST)
+        self.executor = ThreadPoolExecutor(max_workers=config.BOT_WORKERS, thread_name_prefix="bot")
+        self.offset_path = state_path("bot", "offset.json")
+        self.scheduler = Scheduler()
+
+        self._stopped = threading.Event()
+        self._chat_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._throttled: Set[str] = set()
+        self._cache: Dict[str, Tuple[float, object]] = {}
+
+        self.commands: Dict[str, Callable[[str], None]] = {
+            'start': self.cmd_help,
+            'help': self.cmd_help,
+            'next': self.cmd_next,
+            'harder': lambda chat_id: self._change_rating(chat_id, config.BOT_RATING_STEP),
+            'easier': lambda chat_id: self._change_rating(chat_id, -config.BOT_RATING_STEP),
+            'again': self.cmd_again,
+        }
+
+    # ---- Polling ---------------------------------------------------------
+
+    def run_forever(self):
+        """Poll and dispatch updates until ``stop`` is called."""
+        if self.owns_index:
+            self._start_refresh()
+
+        offset = (load_json(self.offset_path, default={}) or {}).get('offset')
+        failures = 0
+        logger.info("🤖 Command bot polling for updates (%s chats allowed)", len(self.tenants))
+
+        while not self._stopped.is_set():
+            try:
+                updates = self.telegram.get_updates(offset, config.BOT_POLL_TIMEOUT)
+                failures = 0
+            except (requests.RequestException, ValueError) as e:
+                failures += 1
+                delay = min(config.RETRY_MAX_DELAY * failures, 60)
+                logger.warning("getUpdates failed (%s), retrying in %ss", e, delay)
+                self._stopped.wait(delay)
+                continue
+
+            for update in updates:
+                offset = update['update_id'] + 1
+                self._dispatch(update)
+
+            if updates:
+                save_json(self.offset_path, {'offset': offset})
+
+        self.scheduler.stop()
+        self.executor.shutdown(wait=True)
+        logger.info("Command bot stopped")
+
+    def stop(self):
+        """Stop polling after the current getUpdates request."""
+        self._stopped.set()
+        self.scheduler.stop()
+
+    def _start_refresh(self):
+        """
+        Warm the problem index before the first command and refresh it every
+        config.DATASET_REFRESH_INTERVAL seconds on a background thread.
+        """
+        try:
+            self.leetcode.ensure_fresh(config.DATASET_REFRESH_INTERVAL)
+        except Exception as e:
+            # The first command retries the download
+            logger.warning("Could not warm the problem index: %s", e)
+
+        self.scheduler.every("refresh-dataset", self.refresh_dataset, config.DATASET_REFRESH_INTERVAL)
+        threading.Thread(target=self.scheduler.run_forever, name="bot-refresh", daemon=True).start()
+
+    def refresh_dataset(self):
+        """Refresh the rating dataset and index between commands."""
+        with metrics.timer("dataset_refresh"):
+            self.leetcode.fetch_problem_ratings()
+        metrics.inc("dataset_refreshes")
+
+    def start_background(self) -> threading.Thread:
+        """Run the bot in a daemon thread."""
+        thread = threading.Thread(target=self.run_forever, name="command-bot", daemon=True)
+        thread.start()
+        return thread
+
+    def _dispatch(self, update: Dict):
+        """Validate, rate-limit and hand one update to a worker."""
+        message = update.get('message') or {}
+        text = (message.get('text') or '').strip()
+        chat_id = str((message.get('chat') or {}).get('id', ''))
+        if not text.startswith('/') or not chat_id:
+            return
+
+        # "/next@MyBot extra" -> "next"
+        command = text.split()[0][1:].split('@')[0].lower()
+        handler = self.commands.get(command)
+        if handler is None:
+            return
+
+        if chat_id not in self.tenants:
+            logger.warning("Ignoring /%s from unauthorized chat %s", command, chat_id)
+            return
+
+        if not self.limiter.allow(chat_id):
+            metrics.inc("bot_throttled")
+            if chat_id not in self._throttled:
+                self._throttled.add(chat_id)
+                self.executor.submit(self.telegram.send_to_chat, chat_id, "⏳ 指令太頻繁，請稍後再試")
+            return
+        self._throttled.discard(chat_id)
+
+        metrics.inc("bot_commands")
+        self.executor.submit(self._handle, chat_id, command, handler)
+
+    def _handle(self, chat_id: str, command: str, handler: Callable[[str], None]):
+        """Run a command, one at a time per chat."""
+        with self._locks_guard:
+            lock = self._chat_locks.setdefault(chat_id, threading.Lock())
+
+        with lock, metrics.timer("bot_command"):
+            logger.info("Handling /%s for chat %s", command, chat_id)
+            try:
+                handler(chat_id)
+            except Exception as e:
+                logger.error("Command /%s failed for chat %s: %s", command, chat_id, e, exc_info=True)
+                self.telegram.send_to_chat(chat_id, "⚠️ 指令處理失敗，請稍後再試", parse_mode=None)
+
+    # ---- Commands --------------------------------------------------------
+
+    def cmd_help(self, chat_id: str):
+        """Reply with the command list."""
+        self.telegram.send_to_chat(chat_id, HELP_TEXT)
+
+    def cmd_next(self, chat_id: str):
+        """Send a new problem at the chat's current rating."""
+        state = self._chat_state(chat_id)
+        rating = state.get('rating') or self.sheets.get_target_rating()
+        self._send_new_problem(chat_id, rating)
+
+    def _change_rating(self, chat_id: str, step: int):
+        """Move the chat's rating by ``step`` and send a problem there."""
+        state = self._chat_state(chat_id)
+        base = state.get('rating') or self.sheets.get_target_rating()
+        rating = max(0, base + step)
+        self._save_chat_state(chat_id, {**state, 'rating': rating})
+        self._send_new_problem(chat_id, rating)
+
+    def cmd_again(self, chat_id: str):
+        """Re-send the chat's last problem."""
+        problem = self._chat_state(chat_id).get('last_problem')
+        if not problem:
+            self.telegram.send_to_chat(chat_id, "還沒有可以重新發送的題目，試試 /next", parse_mode=None)
+            return
+        self._send_problem(chat_id, problem)
+
+    # ---- Helpers ---------------------------------------------------------
+
+    def _send_new_problem(self, chat_id: str, rating: int):
+        """Pick an unsent problem near ``rating`` and deliver it."""
+        if self.leetcode.index is None:
+            self.leetcode.fetch_problem_ratings()
+
+        settings = self.sheets.get_settings()
+        tolerance = settings.tolerance or config.RATING_TOLERANCE
+        history = self._cached('history', self.sheets.get_history_ids)
+
+        candidates = self.leetcode.exclude_solved(
+            self.leetcode.candidates_by_rating(rating, tolerance, settings.problem_filter), history
+        )
+        if not candidates:
+            self.telegram.send_to_chat(
+                chat_id, f"找不到 Rating {rating} ± {tolerance} 的新題目", parse_mode=None
+            )
+            return
+
+        problem = random.choice(candidates)
+        if self._send_problem(chat_id, problem):
+            problem_id = str(problem.get('ID'))
+            history.add(problem_id)
+            self.sheets.add_to_history(problem_id)
+
+    def _send_problem(self, chat_id: str, problem: Dict) -> bool:
+        """
+        Deliver a problem: straight from the solution cache when possible,
+        otherwise header first and the solution streamed into it.
+
+        Returns:
+            True if the whole message was delivered
+        """
+        problem_info = self.leetcode.format_problem_info(problem)
+        languages = self.tenants[chat_id].solution_languages or self.sheets.get_settings().languages or None
+        self._save_chat_state(chat_id, {**self._chat_state(chat_id), 'last_problem': problem})
+
+        cached = self.gemini.cached_solution(problem_info, languages)
+        if cached:
+            metrics.inc("bot_cache_hits")
+            return self.telegram.send_chunks(self._render(problem_info, cached), chat_id=chat_id)
+
+        progressive = self.telegram.start_progressive_message(problem_info, chat_id=chat_id)
+        solution = self.gemini.generate_solution(
+            problem_info,
+            on_progress=progressive.update if progressive else None,
+            languages=languages
+        )
+        chunks = self._render(problem_info, solution)
+
+        if progressive is None:
+            return self.telegram.send_chunks(chunks, chat_id=chat_id)
+        return progressive.finalize(chunks)
+
+    def _render(self, problem_info: Dict, solution: str) -> List[Part]:
+        """Format and split a problem message."""
+        return self.telegram.render_for_delivery(problem_info, solution)
+
+    def _cached(self, key: str, loader: Callable[[], object], default=None):
+        """
+        Return a Sheets value cached for config.BOT_SETTINGS_TTL seconds
+        (settings have their own cache in SheetsService).
+
+        Args:
+            key: Cache key
+            loader: Reads the value from Sheets
+            default: Returned if the value was never loaded and loading fails
+        """
+        entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < config.BOT_SETTINGS_TTL:
+            return entry[1]
+
+        try:
+            value = loader()
+        except Exception:
+            if entry:
+                logger.warning("Using stale %s after a Sheets error", key)
+                return entry[1]
+            if default is not None:
+                return default
+            raise
+
+        self._cache[key] = (time.monotonic(), value)
+        return value
+
+    @staticmethod
+    def _state_path(chat_id: str) -> str:
+        """Per-chat bot state file."""
+        return state_path("bot", f"chat_{chat_id}.json")
+
+    def _chat_state(self, chat_id: str) -> Dict:
+        """Load a chat's rating override and last problem."""
+        return load_json(self._state_path(chat_id), default={}) or {}
+
+    def _save_chat_state(self, chat_id: str, state: Dict):
+        """Persist a chat's bot state."""
+        save_json(self._state_path(chat_id), state)
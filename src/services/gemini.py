@@ -3,25 +3,86 @@ Google Gemini AI service module.
 Handles AI-powered solution generation.
 """
 
-from typing import Dict
+import contextvars
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
 from google import genai
 
 from src.config import config
+from src.utils.cache import SolutionCache
+from src.utils.compile_check import CompileChecker
+from src.utils.deadline import Deadline, DeadlineExceeded
 from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.rate_limit import AimdLimiter
+from src.utils.resilience import ResilientCaller, is_quota_error
+from src.utils.usage import TokenUsageTracker
+
+
+_limiter: Optional[AimdLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AimdLimiter:
+    """
+    Return the process-wide Gemini limiter (the quota is per API key, so
+    every GeminiService shares it).
+
+    Returns:
+        Shared AimdLimiter (created on first use)
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AimdLimiter(
+                initial=config.GEMINI_INITIAL_CONCURRENCY,
+                maximum=config.GEMINI_MAX_CONCURRENCY,
+                tokens_per_minute=config.GEMINI_TOKENS_PER_MINUTE,
+                initial_estimate=config.GEMINI_CODE_TOKEN_ESTIMATE
+            )
+        return _limiter
 
 
 class GeminiService:
     """Service for interacting with Google Gemini API."""
 
-    # Prompt for code generation (first call)
-    CODE_PROMPT = """請為以下 LeetCode 題目提供 C++ 解法程式碼。
+    # Supported solution languages: key -> (display name, code fence tag)
+    LANGUAGES = {
+        'cpp': ('C++', 'cpp'),
+        'python': ('Python', 'python'),
+        'java': ('Java', 'java'),
+        'go': ('Go', 'go'),
+    }
+
+    # Prompt for code generation (one call per language)
+    CODE_PROMPT = """請為以下 LeetCode 題目提供 {language} 解法程式碼。
 
 題目名稱: {title}
 題目連結: {url}
 
-只需要提供完整的 C++ 程式碼，不需要任何說明。
+只需要提供完整的 {language} 程式碼，不需要任何說明。
 程式碼必須可以直接在 LeetCode 上執行。
 
+直接輸出程式碼，不要加任何其他文字："""
+
+    # Prompt for regenerating code that failed the local compile check
+    CODE_FIX_PROMPT = """以下是 LeetCode 題目「{title}」（{url}）的 {language} 解法，但無法通過編譯。
+
+程式碼：
+```{fence}
+{code}
+```
+
+編譯錯誤：
+```
+{errors}
+```
+
+請修正錯誤，提供完整且可以直接在 LeetCode 上執行的 {language} 程式碼。
 直接輸出程式碼，不要加任何其他文字："""
 
     # Prompt for explanation generation (second call)
@@ -44,10 +105,51 @@ Rating: {rating}
 
 請直接開始，使用 ## 作為章節標題。保持簡潔專業。"""
 
-    def __init__(self):
-        """Initialize Gemini service."""
+    # Prompt for the combined single-call mode (used when the budget is tight)
+    SINGLE_CALL_PROMPT = """你是一位資深的演算法面試教練。請針對以下 LeetCode 題目提供解題分析與 {language} 解法。
+
+題目名稱: {title}
+題目連結: {url}
+Rating: {rating}
+
+請按照以下格式提供內容（使用繁體中文）：
+
+## 題目描述
+[用 2-3 句話簡潔描述這道題目在問什麼]
+
+## 解題思路
+[簡述核心演算法與解題邏輯，2-3 句話]
+
+## 複雜度分析
+- **Time Complexity**: O(?)
+- **Space Complexity**: O(?)
+
+## {language} 程式碼
+```{fence}
+[完整且可直接在 LeetCode 上執行的 {language} 程式碼]
+```
+
+請直接開始，使用 ## 作為章節標題。保持簡潔專業。"""
+
+    # Placeholders returned when a single generation step fails
+    CODE_FAILED = "// Code generation failed"
+    EXPLANATION_FAILED = "## 題目描述\n無法生成說明"
+
+    def __init__(self, deadline: Optional[Deadline] = None):
+        """
+        Initialize Gemini service.
+
+        Args:
+            deadline: Run deadline bounding every call (unbounded if None)
+        """
+        self.deadline = deadline or Deadline()
+        self.resilience = ResilientCaller("gemini", self.deadline)
+        self.usage = TokenUsageTracker()
+        self.limiter = get_limiter()
+        self.cache = SolutionCache()
+        self.compile_checker = CompileChecker() if config.COMPILE_CHECK_ENABLED else None
         self._configure_api()
-        logger.info(f"Gemini service initialized with model: {config.GEMINI_MODEL}")
+        logger.info("Gemini service initialized with model: %s", config.GEMINI_MODEL)
 
     def _configure_api(self):
         """Configure Gemini API with credentials."""
@@ -55,89 +157,449 @@ Rating: {rating}
             self.client = genai.Client(api_key=config.gemini_api_key)
             logger.info("Gemini API configured successfully")
         except Exception as e:
-            logger.error(f"Failed to configure Gemini API: {e}")
+            logger.error("Failed to configure Gemini API: %s", e)
             raise
 
-    def generate_solution(self, problem_info: Dict[str, str]) -> str:
+    @classmethod
+    def resolve_languages(cls, languages: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+        """
+        Validate requested solution languages.
+
+        Args:
+            languages: Language keys (defaults to config.SOLUTION_LANGUAGES)
+
+        Returns:
+            Known language keys in request order (C++ if none are valid)
+        """
+        if languages is None:
+            languages = config.SOLUTION_LANGUAGES.split(",")
+
+        resolved = []
+        for language in languages:
+            language = language.strip().lower()
+            if language in cls.LANGUAGES and language not in resolved:
+                resolved.append(language)
+            elif language:
+                logger.warning("Unsupported solution language '%s', skipping", language)
+
+        return tuple(resolved) or ('cpp',)
+
+    @staticmethod
+    def _part_key(problem_id: str, part: str) -> str:
+        """Cache key of one solution part (explanation or one language's code)."""
+        return f"{problem_id}:{part}"
+
+    def cached_solution(
+        self,
+        problem_info: Dict[str, str],
+        languages: Optional[Sequence[str]] = None
+    ) -> Optional[str]:
         """
-        Generate complete solution by calling AI twice:
-        1. Get C++ code
-        2. Get explanation and analysis
-        Then combine them into a formatted response.
+        Assemble a solution purely from cached parts.
 
         Args:
             problem_info: Dictionary containing problem information
-                         (title, url, rating)
+            languages: Solution languages (defaults to config.SOLUTION_LANGUAGES)
 
         Returns:
-            Complete solution text with code and explanation
+            Solution text, or None unless every part is cached
+        """
+        problem_id = problem_info.get('id')
+        if not problem_id:
+            return None
+
+        explanation = self.cache.get(self._part_key(problem_id, 'explanation'))
+        if not explanation:
+            return None
+
+        codes = {}
+        for language in self.resolve_languages(languages):
+            codes[language] = self.cache.get(self._part_key(problem_id, language))
+            if not codes[language]:
+                return None
+
+        return self._assemble(explanation, codes)
+
+    def generate_solution(
+        self,
+        problem_info: Dict[str, str],
+        on_progress: Optional[Callable[[str], None]] = None,
+        languages: Optional[Sequence[str]] = None
+    ) -> str:
+        """
+        Generate complete solution, degrading gracefully with the daily budget:
+        1. Cached parts for this problem (no tokens)
+        2. Explanation plus one code call per language, run concurrently,
+           if the budget allows
+        3. One combined call (first language only) if only that fits
+        4. Fallback message once the budget is exhausted
 
-        Raises:
-            Exception: If API call fails
+        Args:
+            problem_info: Dictionary containing problem information
+                         (id, title, url, rating)
+            on_progress: Optional callback enabling streaming mode; it receives
+                         the markdown generated so far as text arrives
+            languages: Solution languages (defaults to config.SOLUTION_LANGUAGES)
+
+        Returns:
+            Complete solution text with code and explanation
         """
-        try:
-            logger.info(f"Generating solution for: {problem_info.get('title')}")
+        languages = self.resolve_languages(languages)
+        problem_id = problem_info.get('id')
+
+        cached = self.cached_solution(problem_info, languages)
+        if cached:
+            logger.info("Using cached solution for problem %s (%s)", problem_id, "/".join(languages))
+            return cached
 
-            # Step 1: Generate C++ code
-            code = self._generate_code(problem_info)
+        # Keep the remaining time for delivering the cheapest fallback
+        if self.deadline.near():
+            logger.warning("Run deadline is near, skipping generation")
+            return self._get_fallback_message()
 
-            # Step 2: Generate explanation
-            explanation = self._generate_explanation(problem_info)
+        try:
+            logger.info(
+                "Generating solution for: %s (%s)", problem_info.get('title'), "/".join(languages)
+            )
 
-            # Step 3: Combine them
-            combined = f"""{explanation}
+            if self.usage.can_afford(self.estimate_tokens(problem_id, languages)):
+                solution = self._generate_parts(problem_info, languages, on_progress)
+            elif self.usage.can_afford(config.GEMINI_SINGLE_CALL_TOKEN_ESTIMATE):
+                logger.warning("Gemini budget is tight, using single-call mode")
+                solution = self._generate_single_call(problem_info, languages[0], on_progress)
+            else:
+                logger.warning("Gemini daily budget exhausted, sending fallback message")
+                return self._get_fallback_message()
 
-## C++ 程式碼
-```cpp
-{code}
-```"""
+            if solution is None:
+                return self._get_fallback_message()
 
             logger.info("Solution generated successfully")
-            return combined
+            return solution
 
         except Exception as e:
-            logger.error(f"Failed to generate solution: {e}")
+            logger.error("Failed to generate solution: %s", e)
             return self._get_fallback_message()
 
-    def _generate_code(self, problem_info: Dict[str, str]) -> str:
-        """Generate C++ code only."""
+    def estimate_tokens(self, problem_id: Optional[str], languages: Sequence[str]) -> int:
+        """Expected tokens for generating the parts that are not cached yet."""
+        def cached(part: str) -> bool:
+            return bool(problem_id) and bool(self.cache.get(self._part_key(problem_id, part)))
+
+        estimate = sum(
+            config.GEMINI_CODE_TOKEN_ESTIMATE for language in languages if not cached(language)
+        )
+        if not cached('explanation'):
+            estimate += config.GEMINI_TWO_CALL_TOKEN_ESTIMATE - config.GEMINI_CODE_TOKEN_ESTIMATE
+        return estimate
+
+    def _generate_parts(
+        self,
+        problem_info: Dict[str, str],
+        languages: Sequence[str],
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """
+        Generate the explanation and every language's code concurrently,
+        reusing and filling the per-part cache.
+
+        The explanation is generated (and streamed) on the calling thread
+        while the code calls run in a thread pool, so a preview grows in
+        the same order as the final message.
+
+        Returns:
+            Combined solution text, or None if every call failed
+        """
+        problem_id = problem_info.get('id')
+
+        def cached(part: str) -> Optional[str]:
+            return self.cache.get(self._part_key(problem_id, part)) if problem_id else None
+
+        explanation = cached('explanation')
+        codes = {language: cached(language) for language in languages}
+        missing = [language for language in languages if not codes[language]]
+
+        with ThreadPoolExecutor(max_workers=max(len(missing), 1), thread_name_prefix="gemini") as pool:
+            # Copy the context so log records keep the run ID and stage
+            futures = {
+                language: pool.submit(
+                    contextvars.copy_context().run, self._generate_code, problem_info, language
+                )
+                for language in missing
+            }
+
+            if explanation is None:
+                explanation = self._generate_explanation(problem_info, on_progress)
+                if problem_id and explanation != self.EXPLANATION_FAILED:
+                    self.cache.put(self._part_key(problem_id, 'explanation'), explanation)
+
+            for language, future in futures.items():
+                codes[language] = future.result()
+                if problem_id and codes[language] != self.CODE_FAILED:
+                    self.cache.put(self._part_key(problem_id, language), codes[language])
+                if on_progress:
+                    on_progress(self._assemble(explanation, codes))
+
+        if explanation == self.EXPLANATION_FAILED and all(
+            code == self.CODE_FAILED for code in codes.values()
+        ):
+            return None
+
+        return self._assemble(explanation, codes)
+
+    def _assemble(self, explanation: str, codes: Dict[str, Optional[str]]) -> str:
+        """
+        Combine the explanation with one code section per language.
+
+        Args:
+            explanation: Explanation markdown
+            codes: Code per language key, in display order (None = not ready)
+
+        Returns:
+            Solution markdown
+        """
+        sections = [explanation]
+        for language, code in codes.items():
+            if code is None:
+                continue
+            name, fence = self.LANGUAGES[language]
+            sections.append(f"## {name} 程式碼\n```{fence}\n{code}\n```")
+        return "\n\n".join(sections)
+
+    def _generate_single_call(
+        self,
+        problem_info: Dict[str, str],
+        language: str = 'cpp',
+        on_progress: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Generate code and explanation with one combined call.
+
+        Returns:
+            Solution text, or None if the call failed
+        """
         try:
-            prompt = self.CODE_PROMPT.format(
+            name, fence = self.LANGUAGES[language]
+            prompt = self.SINGLE_CALL_PROMPT.format(
                 title=problem_info.get('title', 'Unknown'),
-                url=problem_info.get('url', '')
+                url=problem_info.get('url', ''),
+                rating=problem_info.get('rating', '0'),
+                language=name,
+                fence=fence
             )
 
+            response = self._call_model(prompt, kind="single", on_text=on_progress)
+            if not response.text:
+                return None
+
+            self._warn_if_truncated(response, "Single-call solution")
+            return response.text.strip()
+
+        except Exception as e:
+            logger.error("Single-call generation failed: %s", e)
+            return None
+
+    def _call_model(
+        self,
+        prompt: str,
+        kind: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Call Gemini and record the token usage of the response.
+
+        Args:
+            prompt: Prompt text
+            kind: Call label used for usage logging
+            on_text: If given, stream the response and call this with the
+                     accumulated text after every received chunk
+
+        Returns:
+            The generate_content response (text, candidates, usage_metadata)
+
+        Raises:
+            CircuitOpenError: If Gemini is known to be down
+            DeadlineExceeded: If the run deadline leaves no time for the call
+        """
+        return self.resilience.call(self._call_model_once, prompt, kind, on_text)
+
+    def _call_model_once(
+        self,
+        prompt: str,
+        kind: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Perform one Gemini call attempt (see _call_model), admitted by the
+        shared adaptive limiter.
+        """
+        wait = self.deadline.remaining() - config.RUN_DEADLINE_RESERVE
+        permit = self.limiter.acquire(timeout=wait if wait != math.inf else None)
+        if permit is None:
+            raise DeadlineExceeded("No Gemini capacity became available before the run deadline")
+
+        try:
+            response, used = self._request(prompt, kind, on_text)
+        except Exception as e:
+            throttled = is_quota_error(e)
+            self.limiter.release(permit, throttled=throttled, used_tokens=0 if throttled else None)
+            if throttled:
+                metrics.inc("gemini_throttled")
+                logger.warning("Gemini quota hit, concurrency limit now %.1f", self.limiter.limit)
+            raise
+
+        self.limiter.release(permit, used_tokens=used['total_tokens'])
+        return response
+
+    def _request(
+        self,
+        prompt: str,
+        kind: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Tuple[object, Dict[str, int]]:
+        """
+        Send one generate_content request.
+
+        Returns:
+            (response, token counts recorded for it)
+        """
+        # Bounded by the run deadline, minus the time reserved for delivery
+        timeout = self.deadline.timeout(
+            config.GEMINI_REQUEST_TIMEOUT, reserve=config.RUN_DEADLINE_RESERVE
+        )
+        generation_config = {
+            'temperature': config.GEMINI_TEMPERATURE,
+            'max_output_tokens': config.GEMINI_MAX_TOKENS,
+            'http_options': {'timeout': int(timeout * 1000)},
+        }
+
+        if on_text is None:
             response = self.client.models.generate_content(
                 model=config.GEMINI_MODEL,
                 contents=prompt,
-                config={
-                    'temperature': config.GEMINI_TEMPERATURE,
-                    'max_output_tokens': config.GEMINI_MAX_TOKENS,
-                }
+                config=generation_config
             )
+            used = self.usage.record(getattr(response, 'usage_metadata', None), kind=kind)
+            return response, used
+
+        parts = []
+        last_chunk = None
+        usage_metadata = None
+        for chunk in self.client.models.generate_content_stream(
+            model=config.GEMINI_MODEL,
+            contents=prompt,
+            config=generation_config
+        ):
+            last_chunk = chunk
+            # Usage is cumulative; the final chunk carries the totals
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                usage_metadata = chunk.usage_metadata
+            if chunk.text:
+                parts.append(chunk.text)
+                on_text(''.join(parts))
+
+        used = self.usage.record(usage_metadata, kind=kind)
+        return SimpleNamespace(
+            text=''.join(parts),
+            candidates=getattr(last_chunk, 'candidates', None),
+            usage_metadata=usage_metadata,
+        ), used
+
+    @staticmethod
+    def _warn_if_truncated(response, label: str):
+        """Log a warning if the response did not finish normally."""
+        if hasattr(response, 'candidates') and response.candidates:
+            finish_reason = response.candidates[0].finish_reason
+            if finish_reason != 'STOP':
+                logger.warning("%s may be incomplete. Finish reason: %s", label, finish_reason)
+
+    def _generate_code(
+        self,
+        problem_info: Dict[str, str],
+        language: str = 'cpp',
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Generate code only, in one language.
 
-            if not response.text:
-                return "// Code generation failed"
-
-            code = response.text.strip()
+        C++ code is compile-checked locally; code that does not compile is
+        sent back with the compiler error, up to config.COMPILE_CHECK_MAX_ATTEMPTS
+        times, and the last attempt is returned either way.
+        """
+        name, fence = self.LANGUAGES[language]
+        try:
+            prompt = self.CODE_PROMPT.format(
+                title=problem_info.get('title', 'Unknown'),
+                url=problem_info.get('url', ''),
+                language=name
+            )
+            code = self._request_code(prompt, language, on_text)
+            if code is None:
+                return self.CODE_FAILED
+
+            if language == 'cpp' and self.compile_checker is not None:
+                for attempt in range(1, config.COMPILE_CHECK_MAX_ATTEMPTS + 1):
+                    result = self.compile_checker.check(code)
+                    if result.ok:
+                        break
+                    logger.warning(
+                        "Generated C++ for %s does not compile (re-prompt %s/%s): %s",
+                        problem_info.get('id'), attempt, config.COMPILE_CHECK_MAX_ATTEMPTS,
+                        result.errors.splitlines()[0] if result.errors else "no output"
+                    )
+                    fixed = self._request_code(
+                        self.CODE_FIX_PROMPT.format(
+                            title=problem_info.get('title', 'Unknown'),
+                            url=problem_info.get('url', ''),
+                            language=name,
+                            fence=fence,
+                            code=code,
+                            errors=result.errors
+                        ),
+                        language,
+                        on_text
+                    )
+                    if fixed is None:
+                        break
+                    code = fixed
+                else:
+                    if not self.compile_checker.check(code).ok:
+                        logger.error("C++ for %s still does not compile, sending it anyway", problem_info.get('id'))
+
+            logger.info("%s code generated: %s characters", name, len(code))
+            return code
 
-            # Check if response was truncated
-            if hasattr(response, 'candidates') and response.candidates:
-                finish_reason = response.candidates[0].finish_reason
-                if finish_reason != 'STOP':
-                    logger.warning(f"Code generation may be incomplete. Finish reason: {finish_reason}")
+        except Exception as e:
+            logger.error("%s code generation failed: %s", name, e)
+            return self.CODE_FAILED
+
+    def _request_code(
+        self,
+        prompt: str,
+        language: str,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """
+        Run one code prompt and strip any code fences from the answer.
 
-            # Remove ``` markers if AI added them
-            code = code.replace('```cpp', '').replace('```c++', '').replace('```', '').strip()
+        Returns:
+            Code, or None if the model returned nothing
+        """
+        response = self._call_model(prompt, kind=f"code:{language}", on_text=on_text)
+        if not response.text:
+            return None
 
-            logger.info(f"Code generated: {len(code)} characters")
-            return code
+        # Check if response was truncated
+        self._warn_if_truncated(response, "Code generation")
 
-        except Exception as e:
-            logger.error(f"Code generation failed: {e}")
-            return "// Code generation failed"
+        # Remove ``` markers if AI added them
+        return re.sub(r'^```[\w+#-]*[ \t]*$', '', response.text.strip(), flags=re.MULTILINE).strip()
 
-    def _generate_explanation(self, problem_info: Dict[str, str]) -> str:
+    def _generate_explanation(
+        self,
+        problem_info: Dict[str, str],
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
         """Generate problem explanation and analysis."""
         try:
             prompt = self.EXPLANATION_PROMPT.format(
@@ -145,30 +607,20 @@ Rating: {rating}
                 rating=problem_info.get('rating', '0')
             )
 
-            response = self.client.models.generate_content(
-                model=config.GEMINI_MODEL,
-                contents=prompt,
-                config={
-                    'temperature': config.GEMINI_TEMPERATURE,
-                    'max_output_tokens': config.GEMINI_MAX_TOKENS,
-                }
-            )
+            response = self._call_model(prompt, kind="explanation", on_text=on_text)
 
             if not response.text:
-                return "## 題目描述\n無法生成說明"
+                return self.EXPLANATION_FAILED
 
             # Check if response was truncated
-            if hasattr(response, 'candidates') and response.candidates:
-                finish_reason = response.candidates[0].finish_reason
-                if finish_reason != 'STOP':
-                    logger.warning(f"Explanation may be incomplete. Finish reason: {finish_reason}")
+            self._warn_if_truncated(response, "Explanation")
 
-            logger.info(f"Explanation generated: {len(response.text)} characters")
+            logger.info("Explanation generated: %s characters", len(response.text))
             return response.text.strip()
 
         except Exception as e:
-            logger.error(f"Explanation generation failed: {e}")
-            return "## 題目描述\n無法生成說明"
+            logger.error("Explanation generation failed: %s", e)
+            return self.EXPLANATION_FAILED
 
     def _get_fallback_message(self) -> str:
         """
@@ -204,5 +656,5 @@ Rating: {rating}
             )
             return bool(response.text)
         except Exception as e:
-            logger.error(f"Gemini API test failed: {e}")
+            logger.error("Gemini API test failed: %s", e)
             return False
@@ -3,44 +3,238 @@ LeetCode service module.
 Handles fetching and processing LeetCode problem data.
 """
 
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
 import requests
 
 from src.config import config
-from src.utils.logger import logger
+from src.services.problem_index import DatasetDelta, ProblemFilter, ProblemIndex, compute_delta
+from src.utils.deadline import Deadline
+from src.utils.http import get_transport
+from src.utils.logger import log_stage, logger
+from src.utils.resilience import CircuitOpenError, ResilientCaller
+from src.utils.state import load_json, save_json, state_path
 
 
 class LeetCodeService:
     """Service for interacting with LeetCode problem data."""
 
-    def __init__(self):
-        """Initialize LeetCode service."""
+    def __init__(self, deadline: Optional[Deadline] = None):
+        """
+        Initialize LeetCode service.
+
+        Args:
+            deadline: Run deadline bounding every request (unbounded if None)
+        """
+        self.deadline = deadline or Deadline()
+        self.resilience = ResilientCaller("leetcode", self.deadline)
+        self.http = get_transport()
         self.rating_url = config.LEETCODE_RATING_URL
         self.problem_url_template = config.LEETCODE_PROBLEM_URL
+        self.snapshot_path = state_path("dataset.json")
+
+        # Latest dataset, its index and the delta that produced it
+        self.problems: Optional[List[Dict]] = None
+        self.index: Optional[ProblemIndex] = None
+        self.last_delta: Optional[DatasetDelta] = None
+        self.refreshed_at: Optional[float] = None
+        # (ETag, Last-Modified) of the loaded dataset
+        self.version: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._index_lock = threading.RLock()
 
     def fetch_problem_ratings(self) -> List[Dict]:
         """
         Fetch all LeetCode problem ratings from the data source.
 
+        The previous download is kept as a local snapshot: the request is
+        conditional (ETag / Last-Modified), a changed dataset is diffed
+        against the loaded dataset and only the delta is applied to the
+        index, and the snapshot is used if the data source is unreachable.
+        Other processes sharing STATE_DIR may advance the snapshot, so it
+        only seeds a cold start and is never assumed to match the index.
+
         Returns:
             List of problem dictionaries with rating information
 
         Raises:
-            requests.RequestException: If the HTTP request fails
+            requests.RequestException: If the HTTP request fails after retries
+                                       and no snapshot is available
+            CircuitOpenError: If the data source is known to be down
+                              and no snapshot is available
+            DeadlineExceeded: If the run deadline has been reached
         """
+        logger.info("Fetching LeetCode problem ratings...")
+        snapshot = load_json(self.snapshot_path, default=None)
+
         try:
-            logger.info("Fetching LeetCode problem ratings...")
-            response = requests.get(self.rating_url, timeout=config.HTTP_REQUEST_TIMEOUT)
-            response.raise_for_status()
+            with log_stage("fetch"):
+                response = self.resilience.call(self._get_ratings, snapshot)
+
+        except (requests.RequestException, CircuitOpenError) as e:
+            if not snapshot:
+                logger.error("Failed to fetch LeetCode ratings: %s", e)
+                raise
+            logger.warning("Failed to fetch LeetCode ratings (%s), using cached snapshot", e)
+            self._install_snapshot(snapshot)
+            return self.problems
+
+        if response.status_code == 304:
+            logger.info("Rating dataset unchanged since last download")
+            self._install_snapshot(snapshot)
+            return self.problems
+
+        with log_stage("parse"):
+            problems = response.json()
+            logger.info("Successfully fetched %s problems", len(problems))
+            version = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+            save_json(self.snapshot_path, {
+                'etag': version[0],
+                'last_modified': version[1],
+                'problems': problems,
+            })
+
+            with self._index_lock:
+                # Diff against what is indexed; the snapshot only informs a cold start
+                base = self.problems if self.problems is not None else (snapshot or {}).get('problems')
+                delta = None
+                if base is not None:
+                    delta = compute_delta(base, problems)
+                    self._log_delta(delta)
+                self._update_problems(problems, delta, version)
+        return self.problems
+
+    @staticmethod
+    def _snapshot_version(snapshot: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """(ETag, Last-Modified) recorded with a snapshot."""
+        return snapshot.get('etag'), snapshot.get('last_modified')
+
+    def _install_snapshot(self, snapshot: Dict):
+        """
+        Make the snapshot's dataset current, keeping the loaded index when it
+        already holds that dataset and rebuilding it otherwise.
+
+        Args:
+            snapshot: Snapshot read before the request
+        """
+        version = self._snapshot_version(snapshot)
+        with self._index_lock:
+            if self.problems is not None and any(version) and self.version == version:
+                self._update_problems(self.problems, DatasetDelta(), version)
+            else:
+                self._update_problems(snapshot['problems'], None, version)
+
+    def _get_ratings(self, snapshot: Optional[Dict] = None) -> requests.Response:
+        """Perform one (conditional) download attempt of the rating dataset."""
+        headers = {}
+        if snapshot:
+            if snapshot.get('etag'):
+                headers['If-None-Match'] = snapshot['etag']
+            if snapshot.get('last_modified'):
+                headers['If-Modified-Since'] = snapshot['last_modified']
+
+        response = self.http.get(
+            self.rating_url,
+            headers=headers,
+            timeout=self.deadline.timeout(config.HTTP_REQUEST_TIMEOUT)
+        )
+        response.raise_for_status()
+        return response
 
-            data = response.json()
-            logger.info(f"Successfully fetched {len(data)} problems")
+    def _update_problems(
+        self,
+        problems: List[Dict],
+        delta: Optional[DatasetDelta],
+        version: Optional[Tuple[Optional[str], Optional[str]]] = None
+    ):
+        """
+        Install a new dataset, maintaining the index incrementally when the
+        delta from the indexed dataset is known.
 
-            return data
+        Args:
+            problems: New dataset
+            delta: Changes relative to the current dataset (None = unknown)
+            version: (ETag, Last-Modified) of the new dataset
+        """
+        with self._index_lock:
+            if self.index is None or delta is None or self.problems is None:
+                self.index = ProblemIndex(problems)
+            elif not delta.empty:
+                self.index.apply_delta(delta)
+
+            self.problems = problems
+            self.version = version
+            self.last_delta = delta
+            self.refreshed_at = time.monotonic()
 
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch LeetCode ratings: {e}")
-            raise
+    def ensure_fresh(self, max_age: Optional[float] = None) -> List[Dict]:
+        """
+        Fetch the dataset unless the index was refreshed recently.
+
+        Args:
+            max_age: Seconds an index stays fresh (None = always fetch)
+
+        Returns:
+            Current dataset
+        """
+        if (
+            max_age is not None
+            and self.refreshed_at is not None
+            and time.monotonic() - self.refreshed_at < max_age
+        ):
+            return self.problems
+        return self.fetch_problem_ratings()
+
+    @staticmethod
+    def _log_delta(delta: DatasetDelta):
+        """Log what changed between the snapshot and the new download."""
+        if delta.empty:
+            logger.info("Rating dataset delta: no changes")
+            return
+
+        logger.info("Rating dataset delta: %s", delta.summary())
+
+        contests = delta.new_contests()
+        if contests:
+            logger.info("🆕 New contests in dataset: %s", ", ".join(contests))
+
+        for old, new in delta.rerated:
+            logger.debug(
+                "Re-rated %s (%s): %s -> %s",
+                new.get('ID'), new.get('Title'), old.get('Rating'), new.get('Rating')
+            )
+
+    def candidates_by_rating(
+        self,
+        target_rating: int,
+        tolerance: Optional[int] = None,
+        problem_filter: Optional[ProblemFilter] = None
+    ) -> List[Dict]:
+        """
+        Problems within the target rating range, answered from the index.
+
+        Args:
+            target_rating: Target difficulty rating
+            tolerance: Rating tolerance (defaults to config.RATING_TOLERANCE)
+            problem_filter: Contest type / problem index / year restrictions
+
+        Returns:
+            Matching problems in ascending rating order
+        """
+        if tolerance is None:
+            tolerance = config.RATING_TOLERANCE
+        if self.index is None:
+            self.fetch_problem_ratings()
+
+        with self._index_lock:
+            filtered = self.index.query(target_rating, tolerance, problem_filter)
+        logger.info(
+            "Filtered %s problems with rating %s ± %s (%s)",
+            len(filtered), target_rating, tolerance,
+            problem_filter.describe() if problem_filter else "no filter"
+        )
+        return filtered
 
     def filter_by_rating(
         self,
@@ -75,8 +269,8 @@ class LeetCodeService:
                 filtered.append(problem)
 
         logger.info(
-            f"Filtered {len(filtered)} problems with rating "
-            f"{target_rating} ± {tolerance}"
+            "Filtered %s problems with rating %s ± %s",
+            len(filtered), target_rating, tolerance
         )
 
         return filtered
@@ -102,8 +296,8 @@ class LeetCodeService:
         ]
 
         logger.info(
-            f"Filtered out {len(problems) - len(unsolved)} already solved problems. "
-            f"{len(unsolved)} remaining"
+            "Filtered out %s already solved problems. %s remaining",
+            len(problems) - len(unsolved), len(unsolved)
         )
 
         return unsolved
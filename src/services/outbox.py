@@ -0,0 +1,384 @@
+"""
+Delivery outbox module.
+Persists rendered messages in SQLite and delivers them with an asyncio sender,
+so generation and delivery are decoupled and a Telegram outage never loses
+the day's message. Messages that fail OUTBOX_MAX_ATTEMPTS times are set
+aside as dead and reported; ``python main.py drain --retry-dead`` requeues
+them.
+"""
+
+import asyncio
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Union
+
+from src.config import config
+from src.utils.logger import logger
+from src.utils.state import state_path
+
+
+@dataclass
+class OutboxMessage:
+    """One rendered message waiting for delivery."""
+
+    key: str
+    chat_id: str
+    seq: int
+    text: str
+    parse_mode: Optional[str]
+    attempts: int
+    document: Optional[str] = None  # File name if the text is sent as a document
+
+
+@dataclass
+class DrainResult:
+    """Outcome of one outbox drain."""
+
+    sent: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    dead: List[str] = field(default_factory=list)  # Failed for the last allowed time
+
+    @property
+    def ok(self) -> bool:
+        """Whether every attempted message was delivered."""
+        return not self.failed
+
+
+class Outbox:
+    """Durable, idempotent store of messages to deliver, keyed by message key."""
+
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            key TEXT PRIMARY KEY,
+            chat_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            parse_mode TEXT,
+            document TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_status
+            ON messages (status, chat_id, created_at, seq);
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) the outbox database.
+
+        Args:
+            path: SQLite file path (defaults to STATE_DIR/outbox.sqlite3)
+        """
+        self.path = path or state_path("outbox.sqlite3")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            # Databases created before document delivery lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "document" not in columns:
+                conn.execute("ALTER TABLE messages ADD COLUMN document TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection (safe to use from any thread)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue_chunks(
+        self,
+        base_key: str,
+        chat_id: str,
+        chunks: List[Union[str, Dict[str, str]]],
+        indexes: Optional[List[int]] = None,
+        parse_mode: Optional[str] = "HTML"
+    ) -> List[str]:
+        """
+        Add the chunks of one message to the outbox.
+
+        Enqueueing is idempotent: chunks whose key already exists are left
+        untouched, so re-running generation never duplicates a delivery.
+
+        Args:
+            base_key: Unique key of the message (e.g. day:chat:problem)
+            chat_id: Target Telegram chat
+            chunks: Message chunks in delivery order (documents as
+                    {'document': filename, 'content': text})
+            indexes: Chunk indexes to enqueue (defaults to all)
+            parse_mode: Parse mode for formatting
+
+        Returns:
+            Keys of all chunks, in order
+        """
+        now = time.time()
+        keys = [f"{base_key}:{i}" for i in range(len(chunks))]
+        if indexes is None:
+            indexes = range(len(chunks))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO messages "
+                "(key, chat_id, seq, text, parse_mode, document, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (keys[i], str(chat_id), i, *self._columns(chunks[i], parse_mode), now)
+                    for i in indexes
+                ]
+            )
+
+        return keys
+
+    @staticmethod
+    def _columns(chunk: Union[str, Dict[str, str]], parse_mode: Optional[str]) -> tuple:
+        """Map a chunk to its (text, parse_mode, document) columns."""
+        if isinstance(chunk, dict):
+            return chunk['content'], None, chunk['document']
+        return chunk, parse_mode, None
+
+    def pending(self, chat_id: Optional[str] = None) -> List[OutboxMessage]:
+        """
+        List undelivered messages in delivery order.
+
+        Args:
+            chat_id: Restrict to one chat (all chats if None)
+
+        Returns:
+            Pending messages ordered by chat, enqueue time and sequence
+        """
+        query = (
+            "SELECT key, chat_id, seq, text, parse_mode, attempts, document FROM messages "
+            "WHERE status = ?"
+        )
+        params: list = [self.PENDING]
+        if chat_id is not None:
+            query += " AND chat_id = ?"
+            params.append(str(chat_id))
+        query += " ORDER BY chat_id, created_at, seq"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return [OutboxMessage(*row) for row in rows]
+
+    def statuses(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Look up the delivery status of messages.
+
+        Args:
+            keys: Message keys
+
+        Returns:
+            Mapping of key to status (missing keys are omitted)
+        """
+        if not keys:
+            return {}
+
+        placeholders = ",".join("?" * len(keys))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, status FROM messages WHERE key IN ({placeholders})",
+                keys
+            ).fetchall()
+
+        return dict(rows)
+
+    def dead(self, chat_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        List messages that were given up on.
+
+        Args:
+            chat_id: Restrict to one chat (all chats if None)
+
+        Returns:
+            Mapping of key to the last delivery error
+        """
+        query = "SELECT key, last_error FROM messages WHERE status = ?"
+        params: list = [self.DEAD]
+        if chat_id is not None:
+            query += " AND chat_id = ?"
+            params.append(str(chat_id))
+
+        with self._connect() as conn:
+            return dict(conn.execute(query + " ORDER BY chat_id, created_at, seq", params).fetchall())
+
+    def revive(self, chat_id: Optional[str] = None) -> int:
+        """
+        Requeue dead messages with a fresh attempt count.
+
+        Args:
+            chat_id: Restrict to one chat (all chats if None)
+
+        Returns:
+            Number of messages requeued
+        """
+        query = "UPDATE messages SET status = ?, attempts = 0 WHERE status = ?"
+        params: list = [self.PENDING, self.DEAD]
+        if chat_id is not None:
+            query += " AND chat_id = ?"
+            params.append(str(chat_id))
+
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount
+
+    def mark_sent(self, key: str):
+        """Record a successful delivery."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE messages SET status = ?, sent_at = ?, last_error = NULL WHERE key = ?",
+                (self.SENT, time.time(), key)
+            )
+
+    def mark_failed(self, key: str, error: str) -> bool:
+        """
+        Record a failed delivery attempt; the message is given up on once
+        it reaches config.OUTBOX_MAX_ATTEMPTS.
+
+        Args:
+            key: Message key
+            error: Why the attempt failed (reported for dead messages)
+
+        Returns:
+            True if the message is now dead
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE messages SET attempts = attempts + 1, last_error = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE status END "
+                "WHERE key = ?",
+                (error, config.OUTBOX_MAX_ATTEMPTS, self.DEAD, key)
+            )
+            row = conn.execute("SELECT status FROM messages WHERE key = ?", (key,)).fetchone()
+        return bool(row) and row[0] == self.DEAD
+
+
+class OutboxSender:
+    """Asyncio worker delivering outbox messages with bounded concurrency."""
+
+    def __init__(self, outbox: Outbox, telegram, concurrency: Optional[int] = None):
+        """
+        Initialize sender.
+
+        Args:
+            outbox: Outbox to drain
+            telegram: TelegramService used for delivery
+            concurrency: Maximum chats delivered to at once
+                         (defaults to config.OUTBOX_CONCURRENCY)
+        """
+        self.outbox = outbox
+        self.telegram = telegram
+        self.concurrency = concurrency or config.OUTBOX_CONCURRENCY
+
+    async def drain(self, chat_id: Optional[str] = None) -> DrainResult:
+        """
+        Deliver all pending messages.
+
+        Chats are delivered concurrently; messages within one chat are sent
+        in order, and a failure stops that chat so chunks never arrive out
+        of order.
+
+        Args:
+            chat_id: Restrict to one chat (all chats if None)
+
+        Returns:
+            Keys that were sent and keys that failed
+        """
+        # Later chunks of a message with a dead chunk wait for --retry-dead,
+        # so chunks never arrive out of order
+        held = {key.rsplit(":", 1)[0] for key in self.outbox.dead(chat_id)}
+
+        by_chat: Dict[str, List[OutboxMessage]] = {}
+        for message in self.outbox.pending(chat_id):
+            if message.key.rsplit(":", 1)[0] in held:
+                continue
+            by_chat.setdefault(message.chat_id, []).append(message)
+
+        result = DrainResult()
+        if not by_chat:
+            return result
+
+        logger.info(
+            "Draining outbox: %s messages for %s chats",
+            sum(len(m) for m in by_chat.values()), len(by_chat)
+        )
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(
+            self._drain_chat(messages, semaphore, result)
+            for messages in by_chat.values()
+        ))
+
+        logger.info("Outbox drained: %s sent, %s failed", len(result.sent), len(result.failed))
+        if result.dead:
+            errors = self.outbox.dead(chat_id)
+            logger.error(
+                "Gave up on %s message(s) after %s attempts: %s "
+                "(requeue with `python main.py drain --retry-dead`)",
+                len(result.dead), config.OUTBOX_MAX_ATTEMPTS,
+                ", ".join(f"{key} ({errors.get(key)})" for key in result.dead)
+            )
+        return result
+
+    async def _drain_chat(
+        self,
+        messages: List[OutboxMessage],
+        semaphore: asyncio.Semaphore,
+        result: DrainResult
+    ):
+        """Deliver one chat's messages in order."""
+        async with semaphore:
+            for message in messages:
+                error = await asyncio.to_thread(self._send, message)
+
+                if error is None:
+                    await asyncio.to_thread(self.outbox.mark_sent, message.key)
+                    result.sent.append(message.key)
+                    continue
+
+                dead = await asyncio.to_thread(self.outbox.mark_failed, message.key, error)
+                result.failed.append(message.key)
+                if dead:
+                    result.dead.append(message.key)
+                logger.error(
+                    "Outbox delivery to chat %s stopped at %s: %s", message.chat_id, message.key, error
+                )
+                return
+
+    def _send(self, message: OutboxMessage) -> Optional[str]:
+        """
+        Deliver one message (runs on a worker thread).
+
+        Returns:
+            None if delivered, else why it failed
+        """
+        if self.telegram.send_to_chat(message.chat_id, message.text, message.parse_mode, message.document):
+            return None
+        # Read on the sending thread: the reason is kept per thread
+        return self.telegram.last_error or "send failed"
+
+
+def drain_outbox(telegram, chat_id: Optional[str] = None, outbox: Optional[Outbox] = None) -> DrainResult:
+    """
+    Synchronously drain the outbox.
+
+    Args:
+        telegram: TelegramService used for delivery
+        chat_id: Restrict to one chat (all chats if None)
+        outbox: Outbox to drain (the default outbox if None)
+
+    Returns:
+        Drain result
+    """
+    sender = OutboxSender(outbox or Outbox(), telegram)
+    return asyncio.run(sender.drain(chat_id))
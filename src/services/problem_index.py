@@ -0,0 +1,384 @@
+"""
+Problem index module.
+Holds the rating dataset in a columnar, incrementally maintained index and
+computes deltas between dataset snapshots.
+"""
+
+import bisect
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from src.config import config
+
+
+# Contest type, known contest number and its date, days between contests
+CONTEST_SCHEDULES = {
+    'weekly': (300, date(2022, 6, 26), 7),
+    'biweekly': (100, date(2023, 3, 18), 14),
+}
+
+_CONTEST_SLUG_PATTERN = re.compile(r'^(weekly|biweekly)-contest-(\d+)$')
+
+
+def contest_type(problem: Dict) -> str:
+    """Contest type of a problem: 'weekly', 'biweekly' or 'other'."""
+    match = _CONTEST_SLUG_PATTERN.match(problem.get('ContestSlug') or '')
+    return match.group(1) if match else 'other'
+
+
+def contest_date(problem: Dict) -> Optional[date]:
+    """
+    Estimate the date of a problem's contest from its contest number.
+
+    The dataset carries no dates; weekly and biweekly contests run on a
+    fixed schedule, so the date is extrapolated from a known contest.
+
+    Returns:
+        Estimated contest date, or None for unrecognized contests
+    """
+    match = _CONTEST_SLUG_PATTERN.match(problem.get('ContestSlug') or '')
+    if not match:
+        return None
+
+    number, anchor_date, interval = CONTEST_SCHEDULES[match.group(1)]
+    return anchor_date + timedelta(days=(int(match.group(2)) - number) * interval)
+
+
+def _facets(problem: Dict) -> Iterator[Tuple[str, object]]:
+    """Yield the (facet, value) postings of a problem."""
+    yield 'contest_type', contest_type(problem)
+
+    index = problem.get('ProblemIndex')
+    if index:
+        yield 'problem_index', str(index).upper()
+
+    held_on = contest_date(problem)
+    if held_on is not None:
+        yield 'year', held_on.year
+
+
+@dataclass(frozen=True)
+class ProblemFilter:
+    """Compound problem filter; empty fields do not restrict."""
+
+    contest_types: FrozenSet[str] = frozenset()   # e.g. {'weekly'}
+    problem_indexes: FrozenSet[str] = frozenset()  # e.g. {'Q3', 'Q4'}
+    since_year: Optional[int] = None               # Contests held in or after
+
+    @property
+    def empty(self) -> bool:
+        """Whether the filter matches every problem."""
+        return not (self.contest_types or self.problem_indexes or self.since_year)
+
+    def describe(self) -> str:
+        """Summarize the filter for logging."""
+        parts = []
+        if self.contest_types:
+            parts.append("/".join(sorted(self.contest_types)))
+        if self.problem_indexes:
+            parts.append("/".join(sorted(self.problem_indexes)))
+        if self.since_year:
+            parts.append(f"since {self.since_year}")
+        return ", ".join(parts) or "no filter"
+
+
+@dataclass
+class DatasetDelta:
+    """Difference between two dataset snapshots, keyed by problem ID."""
+
+    added: List[Dict] = field(default_factory=list)
+    removed: List[Dict] = field(default_factory=list)
+    rerated: List[Tuple[Dict, Dict]] = field(default_factory=list)  # (old, new)
+    modified: List[Dict] = field(default_factory=list)  # Non-rating changes
+
+    @property
+    def empty(self) -> bool:
+        """Whether the snapshots are identical."""
+        return not (self.added or self.removed or self.rerated or self.modified)
+
+    def new_contests(self) -> List[str]:
+        """Contest slugs of added problems, in first-seen order."""
+        seen = {}
+        for problem in self.added:
+            slug = problem.get('ContestSlug')
+            if slug:
+                seen.setdefault(slug, None)
+        return list(seen)
+
+    def summary(self) -> str:
+        """One-line description for logging."""
+        return (
+            f"+{len(self.added)} added, -{len(self.removed)} removed, "
+            f"{len(self.rerated)} re-rated, {len(self.modified)} modified"
+        )
+
+
+def _problem_key(problem: Dict) -> Optional[str]:
+    """Return the ID key of a problem, or None if it has no ID."""
+    problem_id = problem.get('ID')
+    return None if problem_id is None else str(problem_id)
+
+
+def compute_delta(old: Iterable[Dict], new: Iterable[Dict]) -> DatasetDelta:
+    """
+    Compute the difference between two dataset snapshots.
+
+    Args:
+        old: Previously cached problems
+        new: Freshly downloaded problems
+
+    Returns:
+        Added, removed, re-rated and otherwise modified problems
+    """
+    old_by_id = {key: p for p in old if (key := _problem_key(p)) is not None}
+    new_by_id = {key: p for p in new if (key := _problem_key(p)) is not None}
+
+    delta = DatasetDelta()
+    for key, problem in new_by_id.items():
+        previous = old_by_id.get(key)
+        if previous is None:
+            delta.added.append(problem)
+        elif previous.get('Rating') != problem.get('Rating'):
+            delta.rerated.append((previous, problem))
+        elif previous != problem:
+            delta.modified.append(problem)
+
+    delta.removed = [p for key, p in old_by_id.items() if key not in new_by_id]
+    return delta
+
+
+class ProblemIndex:
+    """
+    Columnar index over the rating dataset.
+
+    Problems occupy stable slots in parallel column lists (IDs, ratings,
+    records). A sorted (rating, slot) list answers rating-range queries with
+    bisection, and a bucketed rating histogram is kept alongside. Inverted
+    indexes (contest type, problem index, contest year) map each value to a
+    bitset of slots held in a Python int, so compound filters are bitwise
+    ANDs. Everything is updated incrementally when a DatasetDelta is
+    applied; removed problems leave a tombstoned slot behind.
+    """
+
+    def __init__(self, problems: Optional[Iterable[Dict]] = None):
+        """
+        Initialize index.
+
+        Args:
+            problems: Initial dataset (problems without ID or Rating are skipped)
+        """
+        self.ids: List[Optional[str]] = []
+        self.ratings: List[float] = []
+        self.records: List[Optional[Dict]] = []
+        self._slots: Dict[str, int] = {}
+        self._order: List[Tuple[float, int]] = []
+        self._histogram: Counter = Counter()
+        self._postings: Dict[str, Dict[object, int]] = defaultdict(lambda: defaultdict(int))
+        self._live = 0
+
+        if problems:
+            for problem in problems:
+                self._insert(problem, keep_sorted=False)
+            self._order.sort()
+
+    def __len__(self) -> int:
+        """Number of live problems."""
+        return len(self._slots)
+
+    def __contains__(self, problem_id) -> bool:
+        """Whether a problem ID is indexed."""
+        return str(problem_id) in self._slots
+
+    @staticmethod
+    def _bucket(rating: float) -> int:
+        """Histogram bucket (lower bound) of a rating."""
+        width = config.RATING_HISTOGRAM_BUCKET
+        return int(rating // width) * width
+
+    def _insert(self, problem: Dict, keep_sorted: bool = True):
+        """Add a problem in a new slot."""
+        key = _problem_key(problem)
+        if key is None or 'Rating' not in problem or key in self._slots:
+            return
+
+        slot = len(self.ids)
+        rating = problem['Rating']
+        self.ids.append(key)
+        self.ratings.append(rating)
+        self.records.append(problem)
+        self._slots[key] = slot
+        self._histogram[self._bucket(rating)] += 1
+        self._live |= 1 << slot
+        self._post(problem, slot)
+
+        if keep_sorted:
+            bisect.insort(self._order, (rating, slot))
+        else:
+            self._order.append((rating, slot))
+
+    def _delete(self, key: str):
+        """Tombstone a problem's slot."""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+
+        rating = self.ratings[slot]
+        position = bisect.bisect_left(self._order, (rating, slot))
+        if position < len(self._order) and self._order[position] == (rating, slot):
+            del self._order[position]
+        self._histogram[self._bucket(rating)] -= 1
+        self._live &= ~(1 << slot)
+        self._unpost(self.records[slot], slot)
+
+        self.ids[slot] = None
+        self.records[slot] = None
+
+    def _rerate(self, problem: Dict):
+        """Move a problem to its new rating in the order and histogram."""
+        key = _problem_key(problem)
+        slot = self._slots.get(key)
+        if slot is None or 'Rating' not in problem:
+            self._insert(problem)
+            return
+
+        old_rating, new_rating = self.ratings[slot], problem['Rating']
+        position = bisect.bisect_left(self._order, (old_rating, slot))
+        if position < len(self._order) and self._order[position] == (old_rating, slot):
+            del self._order[position]
+        bisect.insort(self._order, (new_rating, slot))
+
+        self._histogram[self._bucket(old_rating)] -= 1
+        self._histogram[self._bucket(new_rating)] += 1
+        self.ratings[slot] = new_rating
+        self._replace_record(slot, problem)
+
+    def _post(self, problem: Dict, slot: int):
+        """Set a slot's bit in the postings of its facet values."""
+        bit = 1 << slot
+        for facet, value in _facets(problem):
+            self._postings[facet][value] |= bit
+
+    def _unpost(self, problem: Dict, slot: int):
+        """Clear a slot's bit from the postings of its facet values."""
+        bit = 1 << slot
+        for facet, value in _facets(problem):
+            self._postings[facet][value] &= ~bit
+
+    def _replace_record(self, slot: int, problem: Dict):
+        """Swap the record in a slot, re-posting its facets."""
+        self._unpost(self.records[slot], slot)
+        self.records[slot] = problem
+        self._post(problem, slot)
+
+    def apply_delta(self, delta: DatasetDelta):
+        """
+        Update the index in place.
+
+        Args:
+            delta: Changes between the indexed snapshot and the new one
+        """
+        for problem in delta.removed:
+            self._delete(_problem_key(problem))
+        for problem in delta.added:
+            self._insert(problem)
+        for _, problem in delta.rerated:
+            self._rerate(problem)
+        for problem in delta.modified:
+            slot = self._slots.get(_problem_key(problem))
+            if slot is not None:
+                self._replace_record(slot, problem)
+
+    def slots_in_range(self, low: float, high: float) -> List[int]:
+        """
+        Slots of problems with ``low <= rating <= high``.
+
+        Returns:
+            Slots in ascending rating order
+        """
+        start = bisect.bisect_left(self._order, (low, -1))
+        end = bisect.bisect_right(self._order, (high, float('inf')))
+        return [slot for _, slot in self._order[start:end]]
+
+    def filter_by_rating(self, target_rating: int, tolerance: int) -> List[Dict]:
+        """
+        Problems within ``target_rating ± tolerance``.
+
+        Returns:
+            Matching problem records in ascending rating order
+        """
+        return [
+            self.records[slot]
+            for slot in self.slots_in_range(target_rating - tolerance, target_rating + tolerance)
+        ]
+
+    def facet_mask(self, facet: str, values: Iterable) -> int:
+        """
+        Bitset of slots whose facet takes any of the given values.
+
+        Args:
+            facet: 'contest_type', 'problem_index' or 'year'
+            values: Accepted values
+
+        Returns:
+            Union of the values' postings
+        """
+        postings = self._postings.get(facet, {})
+        mask = 0
+        for value in values:
+            mask |= postings.get(value, 0)
+        return mask
+
+    def filter_mask(self, problem_filter: ProblemFilter) -> int:
+        """
+        Bitset of live slots matching a compound filter.
+
+        Returns:
+            Intersection of the filter's facet bitsets
+        """
+        mask = self._live
+        if problem_filter.contest_types:
+            mask &= self.facet_mask('contest_type', problem_filter.contest_types)
+        if problem_filter.problem_indexes:
+            mask &= self.facet_mask(
+                'problem_index', (index.upper() for index in problem_filter.problem_indexes)
+            )
+        if problem_filter.since_year:
+            years = [year for year in self._postings.get('year', {}) if year >= problem_filter.since_year]
+            mask &= self.facet_mask('year', years)
+        return mask
+
+    def query(
+        self,
+        target_rating: int,
+        tolerance: int,
+        problem_filter: Optional[ProblemFilter] = None
+    ) -> List[Dict]:
+        """
+        Problems within ``target_rating ± tolerance`` matching a filter.
+
+        Returns:
+            Matching problem records in ascending rating order
+        """
+        slots = self.slots_in_range(target_rating - tolerance, target_rating + tolerance)
+        if problem_filter is None or problem_filter.empty:
+            return [self.records[slot] for slot in slots]
+
+        mask = self.filter_mask(problem_filter)
+        return [self.records[slot] for slot in slots if mask >> slot & 1]
+
+    def get(self, problem_id) -> Optional[Dict]:
+        """Look up a problem record by ID."""
+        slot = self._slots.get(str(problem_id))
+        return None if slot is None else self.records[slot]
+
+    def histogram(self) -> Dict[int, int]:
+        """
+        Rating histogram.
+
+        Returns:
+            Mapping of bucket lower bound to problem count (non-empty buckets)
+        """
+        return {bucket: count for bucket, count in sorted(self._histogram.items()) if count}
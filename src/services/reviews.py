@@ -0,0 +1,201 @@
+"""
+Spaced-repetition reviews.
+
+Every problem delivered to a chat gets an SM-2 style schedule (repetitions,
+interval, easiness factor, due date), kept per chat under the state
+directory next to the journal. A min-heap keyed by due date answers "what
+is due for review" in O(log n); entries made stale by rescheduling are
+skipped lazily. Each chat's schedule is loaded once per process (see
+get_schedule) so the heap stays warm between deliveries. Reviews are
+interleaved with new problems by a ratio.
+"""
+
+import heapq
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from src.config import config
+from src.utils.logger import logger
+from src.utils.state import load_json, save_json, state_path
+from src.utils.tenants import delivery_date
+
+
+@dataclass
+class ReviewItem:
+    """SM-2 state of one delivered problem."""
+
+    problem_id: str
+    problem: Dict
+    repetitions: int = 0
+    interval: int = 0  # Days
+    easiness: float = 2.5
+    due: str = ""  # ISO date of the next review
+    graded_on: str = ""  # ISO date of the last grade
+    history: List[int] = field(default_factory=list)  # Qualities graded so far
+
+    def grade(self, quality: int, today: date):
+        """
+        Apply one SM-2 review.
+
+        Args:
+            quality: Recall quality 0-5 (below 3 restarts the schedule)
+            today: Review date
+        """
+        quality = max(0, min(5, quality))
+        self.graded_on = today.isoformat()
+        if quality >= 3:
+            if self.repetitions == 0:
+                self.interval = 1
+            elif self.repetitions == 1:
+                self.interval = 6
+            else:
+                self.interval = round(self.interval * self.easiness)
+            self.repetitions += 1
+        else:
+            self.repetitions = 0
+            self.interval = 1
+
+        self.easiness = max(1.3, self.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        self.due = (today + timedelta(days=self.interval)).isoformat()
+        self.history.append(quality)
+
+
+class ReviewSchedule:
+    """One chat's review schedule with a due-date heap."""
+
+    def __init__(self, chat_id: Optional[str] = None):
+        """
+        Load a chat's schedule.
+
+        Args:
+            chat_id: Telegram chat ID (defaults to the configured chat)
+        """
+        self.chat_id = str(chat_id or config.telegram_chat_id)
+        self.path = state_path("reviews", f"{self.chat_id}.json")
+        data = load_json(self.path, default=None) or {}
+
+        self.items: Dict[str, ReviewItem] = {
+            problem_id: ReviewItem(**item) for problem_id, item in data.get('items', {}).items()
+        }
+        # Accumulated share of deliveries owed to reviews
+        self.credit: float = data.get('credit', 0.0)
+
+        self._heap: List[Tuple[str, str]] = [(item.due, pid) for pid, item in self.items.items()]
+        heapq.heapify(self._heap)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        """Number of scheduled problems."""
+        return len(self.items)
+
+    def __contains__(self, problem_id) -> bool:
+        """Whether a problem is scheduled for review."""
+        return str(problem_id) in self.items
+
+    def _save(self):
+        """Persist the schedule."""
+        save_json(self.path, {
+            'items': {pid: asdict(item) for pid, item in self.items.items()},
+            'credit': self.credit,
+        })
+
+    def peek_due(self, today: Optional[date] = None) -> Optional[ReviewItem]:
+        """
+        The most overdue review, if any is due.
+
+        Args:
+            today: Reference date (defaults to today)
+
+        Returns:
+            Review item, or None if nothing is due
+        """
+        today_iso = (today or delivery_date()).isoformat()
+        while self._heap:
+            due, problem_id = self._heap[0]
+            item = self.items.get(problem_id)
+            if item is None or item.due != due:
+                # Rescheduled or removed since this entry was pushed
+                heapq.heappop(self._heap)
+                continue
+            return item if due <= today_iso else None
+        return None
+
+    def next_review(self, ratio: Optional[float] = None, today: Optional[date] = None) -> Optional[Dict]:
+        """
+        Decide whether this delivery is a review.
+
+        Each delivery earns ``ratio`` credit; a full credit is spent on the
+        most overdue review. Credit is capped at one, so days without due
+        reviews never cause a burst of them later.
+
+        Args:
+            ratio: Share of deliveries that are reviews (defaults to config.REVIEW_RATIO)
+            today: Reference date (defaults to today)
+
+        Returns:
+            Problem record to review, or None to deliver a new problem
+        """
+        ratio = config.REVIEW_RATIO if ratio is None else ratio
+        if ratio <= 0:
+            return None
+
+        with self._lock:
+            self.credit = min(self.credit + ratio, 1.0)
+            item = self.peek_due(today) if self.credit >= 1.0 else None
+            if item is not None:
+                self.credit -= 1.0
+                logger.info(
+                    "🔁 Review due for problem %s (repetition %s, due %s)",
+                    item.problem_id, item.repetitions, item.due
+                )
+            self._save()
+        return item.problem if item else None
+
+    def record(self, problem: Dict, quality: Optional[int] = None, today: Optional[date] = None):
+        """
+        Schedule the next review of a delivered problem (new or reviewed).
+
+        Args:
+            problem: Problem record
+            quality: Recall quality 0-5 (defaults to config.REVIEW_DEFAULT_QUALITY)
+            today: Delivery date (defaults to today)
+        """
+        problem_id = str(problem.get('ID'))
+        today = today or delivery_date()
+        with self._lock:
+            item = self.items.get(problem_id) or ReviewItem(problem_id=problem_id, problem=problem)
+            if item.graded_on == today.isoformat():
+                # A resumed run records the same delivery again
+                logger.info("Problem %s was already graded today", problem_id)
+                return
+            item.grade(config.REVIEW_DEFAULT_QUALITY if quality is None else quality, today)
+
+            self.items[problem_id] = item
+            heapq.heappush(self._heap, (item.due, problem_id))
+            self._save()
+        logger.info("Next review of problem %s on %s", problem_id, item.due)
+
+
+# Schedules loaded by this process, by state file
+_schedules: Dict[str, ReviewSchedule] = {}
+_schedules_lock = threading.Lock()
+
+
+def get_schedule(chat_id: Optional[str] = None) -> ReviewSchedule:
+    """
+    The process-wide schedule of a chat, loaded on first use.
+
+    Args:
+        chat_id: Telegram chat ID (defaults to the configured chat)
+
+    Returns:
+        Review schedule shared by every delivery to that chat
+    """
+    path = state_path("reviews", f"{chat_id or config.telegram_chat_id}.json")
+    with _schedules_lock:
+        schedule = _schedules.get(path)
+        if schedule is None:
+            schedule = _schedules[path] = ReviewSchedule(chat_id)
+        return schedule
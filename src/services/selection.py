@@ -0,0 +1,155 @@
+"""
+Vectorized candidate selection for many tenants at once.
+
+Holds the indexed ratings in a sorted NumPy array and answers a whole batch
+of tenants (each with its own target, tolerance and history) with array
+operations: rating windows by ``searchsorted``, candidate masks by
+broadcasting the windows against the filter and the tenants' history
+bitmaps, and one random draw per tenant to pick the winners.
+
+NumPy is optional; ``available()`` tells whether this engine can be used.
+The daemon does not use it: tenants share one target rating (the Settings
+worksheet) and one History worksheet, so a batch would be N copies of the
+same query. It stays for scripts/benchmark_selection.py until tenants get
+their own targets and histories.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from src.config import config
+from src.services.problem_index import ProblemFilter, ProblemIndex
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed by the benchmark
+    np = None
+
+
+# Tenants processed per block, bounding the (tenants x problems) work arrays
+BLOCK_TENANTS = 2048
+
+
+def available() -> bool:
+    """Whether NumPy is installed."""
+    return np is not None
+
+
+class BatchSelector:
+    """Snapshot of a ProblemIndex prepared for batched selection."""
+
+    def __init__(self, index: ProblemIndex):
+        """
+        Build the sorted rating arrays from an index.
+
+        Args:
+            index: Problem index (its live problems at this moment are used)
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("Vectorized selection needs numpy (pip install numpy)")
+
+        self.index = index
+        # Live slots in ascending rating order; columns below follow this order
+        self.slots = np.asarray(index.slots_in_range(float('-inf'), float('inf')), dtype=np.int64)
+        self.ratings = np.asarray([index.ratings[slot] for slot in self.slots], dtype=np.float64)
+        self.positions: Dict[str, int] = {
+            index.ids[slot]: position for position, slot in enumerate(self.slots.tolist())
+        }
+
+    def __len__(self) -> int:
+        """Number of problems in the snapshot."""
+        return len(self.slots)
+
+    def _columns(self, bitset: int) -> "np.ndarray":
+        """Convert a slot bitset of the index to a boolean column mask."""
+        size = max(len(self.index.ids), 1)
+        bits = np.unpackbits(
+            np.frombuffer(bitset.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8),
+            bitorder='little'
+        )
+        return bits[self.slots].astype(bool)
+
+    def history_bitmap(self, problem_ids: Iterable[str]) -> "np.ndarray":
+        """
+        Pack a tenant's sent problems into a bitmap over the snapshot.
+
+        Args:
+            problem_ids: IDs already sent to the tenant
+
+        Returns:
+            Packed bitmap (uint8, one bit per problem)
+        """
+        row = np.zeros(len(self), dtype=bool)
+        hits = [self.positions[str(pid)] for pid in problem_ids if str(pid) in self.positions]
+        row[hits] = True
+        return np.packbits(row, bitorder='little')
+
+    def select(
+        self,
+        targets: Sequence[float],
+        tolerances: Optional[Sequence[float]] = None,
+        histories: Optional["np.ndarray"] = None,
+        problem_filter: Optional[ProblemFilter] = None,
+        rng: Optional["np.random.Generator"] = None
+    ) -> List[Optional[Dict]]:
+        """
+        Pick one random unsent problem per tenant.
+
+        Args:
+            targets: Target rating per tenant
+            tolerances: Tolerance per tenant (defaults to config.RATING_TOLERANCE)
+            histories: Packed history bitmaps (see history_bitmap), one row
+                       per tenant, or a single bitmap shared by every tenant
+                       (None = no history)
+            problem_filter: Filter applied to every tenant
+            rng: Random generator (a fresh one if None)
+
+        Returns:
+            Selected problem per tenant (None if a tenant has no candidate)
+        """
+        rng = rng or np.random.default_rng()
+        targets = np.asarray(targets, dtype=np.float64)
+        tenants = len(targets)
+        tolerances = np.broadcast_to(
+            np.asarray(config.RATING_TOLERANCE if tolerances is None else tolerances, dtype=np.float64),
+            targets.shape
+        )
+
+        # Rating windows [low, high) as column ranges, for all tenants at once
+        low = np.searchsorted(self.ratings, targets - tolerances, side='left')
+        high = np.searchsorted(self.ratings, targets + tolerances, side='right')
+
+        if histories is not None:
+            histories = np.atleast_2d(histories)
+
+        allowed = None
+        if problem_filter is not None and not problem_filter.empty:
+            allowed = self._columns(self.index.filter_mask(problem_filter))
+
+        # One uniform draw per tenant picks the winner among its candidates
+        draws = rng.random(tenants)
+        picks = np.full(tenants, -1, dtype=np.int64)
+        columns = np.arange(len(self))
+
+        for start in range(0, tenants, BLOCK_TENANTS):
+            stop = min(start + BLOCK_TENANTS, tenants)
+            mask = (columns >= low[start:stop, None]) & (columns < high[start:stop, None])
+            if allowed is not None:
+                mask &= allowed
+            if histories is not None:
+                rows = histories if len(histories) == 1 else histories[start:stop]
+                mask &= ~np.unpackbits(rows, axis=1, count=len(self), bitorder='little').astype(bool)
+
+            counts = mask.sum(axis=1)
+            # The winner is the k-th candidate: the first column where the running count exceeds k
+            k = np.floor(draws[start:stop] * counts).astype(np.int64)
+            running = np.cumsum(mask, axis=1, dtype=np.int32)
+            chosen = np.argmax(running > k[:, None], axis=1)
+            picks[start:stop] = np.where(counts > 0, chosen, -1)
+
+        return [
+            self.index.records[self.slots[pick]] if pick >= 0 else None
+            for pick in picks.tolist()
+        ]
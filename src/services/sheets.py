@@ -4,67 +4,322 @@ Handles all interactions with Google Sheets for configuration and history tracki
 """
 
 import json
-from typing import Set, Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Optional, Tuple
 
 import gspread
-from google.oauth2.service_account import Credentials
 
 from src.config import config
+from src.services.problem_index import ProblemFilter
+from src.utils.deadline import Deadline
+from src.utils.google_auth import SCOPES, get_client, open_spreadsheet
 from src.utils.logger import logger
+from src.utils.resilience import ResilientCaller
+from src.utils.tenants import parse_time
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed contents of the Settings worksheet (column B):
+
+    B1 target rating, B2-B4 problem filter (contest types, problem indexes,
+    earliest contest year), B5 rating tolerance, B6 solution languages,
+    B7 delivery time (HH:MM), B8 digest size. Empty optional cells fall
+    back to the configured defaults.
+    """
+
+    target_rating: int
+    problem_filter: ProblemFilter = field(default_factory=ProblemFilter)
+    tolerance: Optional[int] = None  # None = config.RATING_TOLERANCE
+    languages: Tuple[str, ...] = ()  # Empty = config.SOLUTION_LANGUAGES
+    delivery_time: Optional[str] = None  # None = config.DELIVERY_TIME
+    digest_size: Optional[int] = None  # None = config.DIGEST_SIZE
+
+    # Worksheet range holding every setting
+    RANGE = 'B1:B8'
+
+    @classmethod
+    def from_cells(cls, cells: List[str]) -> "Settings":
+        """
+        Parse the settings column.
+
+        Invalid optional values are logged and ignored.
+
+        Args:
+            cells: Values of B1..B8 (missing trailing cells are empty)
+
+        Returns:
+            Parsed settings
+
+        Raises:
+            ValueError: If the target rating is empty or not an integer
+        """
+        cells = [cell.strip() for cell in cells] + [''] * (8 - len(cells))
+
+        if not cells[0]:
+            raise ValueError("Target rating (B1) is empty")
+        target_rating = int(cells[0])
+
+        def split(value: str) -> frozenset:
+            return frozenset(part.strip() for part in value.split(',') if part.strip())
+
+        def optional(label: str, value: str, parse):
+            if not value:
+                return None
+            try:
+                return parse(value)
+            except ValueError:
+                logger.warning("Invalid %s %r, ignoring", label, value)
+                return None
+
+        def positive_int(value: str) -> int:
+            number = int(value)
+            if number <= 0:
+                raise ValueError(value)
+            return number
+
+        def delivery_time(value: str) -> str:
+            return parse_time(value).strftime("%H:%M")
+
+        return cls(
+            target_rating=target_rating,
+            problem_filter=ProblemFilter(
+                contest_types=frozenset(value.lower() for value in split(cells[1])),
+                problem_indexes=frozenset(value.upper() for value in split(cells[2])),
+                since_year=optional("earliest contest year", cells[3], int),
+            ),
+            tolerance=optional("rating tolerance", cells[4], positive_int),
+            languages=tuple(dict.fromkeys(part.strip() for part in cells[5].lower().split(',') if part.strip())),
+            delivery_time=optional("delivery time", cells[6], delivery_time),
+            digest_size=optional("digest size", cells[7], positive_int),
+        )
+
+    def describe(self) -> str:
+        """Summarize the settings for logging."""
+        return (
+            f"rating {self.target_rating} ± {self.tolerance or config.RATING_TOLERANCE}, "
+            f"filter {self.problem_filter.describe()}, "
+            f"languages {'/'.join(self.languages) or config.SOLUTION_LANGUAGES}, "
+            f"delivery {self.delivery_time or config.DELIVERY_TIME}, "
+            f"digest {self.digest_size or config.DIGEST_SIZE}"
+        )
 
 
 class SheetsService:
     """Service for interacting with Google Sheets."""
 
     # Google API scopes
-    SCOPES = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
+    SCOPES = SCOPES
 
-    def __init__(self):
-        """Initialize Google Sheets service."""
+    def __init__(
+        self,
+        deadline: Optional[Deadline] = None,
+        spreadsheet: Optional[gspread.Spreadsheet] = None
+    ):
+        """
+        Initialize Google Sheets service.
+
+        Args:
+            deadline: Run deadline bounding every request (unbounded if None)
+            spreadsheet: Spreadsheet backend to use instead of connecting to
+                         Google (e.g. the replay stand-in)
+        """
+        self.deadline = deadline or Deadline()
+        self.resilience = ResilientCaller("sheets", self.deadline)
         self.client = None
         self.spreadsheet = None
-        self._connect()
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+
+        # Settings cache: value, spreadsheet revision it was read at, last check
+        self._settings: Optional[Settings] = None
+        self._settings_revision: Optional[str] = None
+        self._settings_checked = 0.0
+        self._settings_lock = threading.Lock()
+
+        if spreadsheet is not None:
+            self.spreadsheet = spreadsheet
+        else:
+            self._connect()
 
     def _connect(self):
-        """Establish connection to Google Sheets."""
+        """
+        Establish connection to Google Sheets.
+
+        The authorized client (and its in-memory access token) is shared by
+        every service in the process, and the spreadsheet is opened by its
+        cached key, so setup is a single request.
+        """
         try:
             logger.info("Connecting to Google Sheets...")
 
-            # Parse service account credentials
-            creds_dict = json.loads(config.google_sheets_json)
-
-            # Create credentials
-            credentials = Credentials.from_service_account_info(
-                creds_dict,
-                scopes=self.SCOPES
-            )
-
-            # Authorize client
-            self.client = gspread.authorize(credentials)
+            # Shared authorized client
+            self.client = get_client()
 
             # Open spreadsheet
-            self.spreadsheet = self.client.open(config.SHEET_NAME)
+            self.spreadsheet = self._call(open_spreadsheet, self.client, config.SHEET_NAME)
 
-            logger.info(f"Successfully connected to spreadsheet: {config.SHEET_NAME}")
+            logger.info("Successfully connected to spreadsheet: %s", config.SHEET_NAME)
 
         except json.JSONDecodeError as e:
-            logger.error(f"Invalid Google Sheets JSON credentials: {e}")
+            logger.error("Invalid Google Sheets JSON credentials: %s", e)
             raise
 
         except gspread.exceptions.SpreadsheetNotFound:
             logger.error(
-                f"Spreadsheet '{config.SHEET_NAME}' not found. "
-                "Please ensure it exists and the service account has access."
+                "Spreadsheet '%s' not found. "
+                "Please ensure it exists and the service account has access.",
+                config.SHEET_NAME
             )
             raise
 
         except Exception as e:
-            logger.error(f"Failed to connect to Google Sheets: {e}")
+            logger.error("Failed to connect to Google Sheets: %s", e)
             raise
 
+    def _apply_timeout(self):
+        """Bound the next requests by min(own timeout, remaining run budget)."""
+        if self.client is None:
+            return
+        self.client.set_timeout(self.deadline.timeout(config.HTTP_REQUEST_TIMEOUT))
+
+    def _call(self, func, *args):
+        """
+        Run a Sheets operation with retries and circuit breaking, bounding
+        every attempt by the run deadline.
+
+        Args:
+            func: Operation to run
+            *args: Positional arguments for the operation
+
+        Returns:
+            The operation's result
+        """
+        def attempt():
+            self._apply_timeout()
+            return func(*args)
+
+        return self.resilience.call(attempt)
+
+    def _worksheet(self, title: str) -> gspread.Worksheet:
+        """
+        Return a worksheet, cached so that lookups don't re-fetch the
+        spreadsheet metadata on every read.
+
+        Raises:
+            gspread.exceptions.WorksheetNotFound: If the worksheet does not exist
+        """
+        worksheet = self._worksheets.get(title)
+        if worksheet is None:
+            worksheet = self._worksheets[title] = self.spreadsheet.worksheet(title)
+        return worksheet
+
+    def _revision(self) -> Optional[str]:
+        """
+        Drive modification time of the spreadsheet, which changes on any edit.
+
+        Returns:
+            Revision marker, or None if it could not be read
+        """
+        try:
+            # gspread >= 6 fetches it on demand; older versions through the property
+            getter = getattr(self.spreadsheet, 'get_lastUpdateTime', None)
+            if getter is not None:
+                return self._call(getter)
+            return self._call(lambda: self.spreadsheet.lastUpdateTime)
+        except Exception as e:
+            logger.debug("Could not read spreadsheet revision: %s", e)
+            return None
+
+    def get_settings(self, max_age: Optional[float] = None) -> Settings:
+        """
+        Retrieve the typed settings, read as one range.
+
+        Loaded settings are trusted for ``max_age`` seconds; after that the
+        spreadsheet revision is checked and the range is only re-read if
+        the spreadsheet changed. A cold start reads the range directly
+        (a revision check could not save that read). If a re-read fails,
+        the last known settings are returned.
+
+        Args:
+            max_age: Seconds before the revision is re-checked
+                     (defaults to config.SETTINGS_CACHE_TTL)
+
+        Returns:
+            Current settings
+
+        Raises:
+            gspread.exceptions.WorksheetNotFound: If the Settings worksheet is missing
+            ValueError: If the target rating is invalid
+        """
+        max_age = config.SETTINGS_CACHE_TTL if max_age is None else max_age
+
+        with self._settings_lock:
+            cached = self._settings
+            if cached is not None and time.monotonic() - self._settings_checked < max_age:
+                return cached
+
+            if cached is None:
+                # Nothing to validate; the revision is recorded on the next check
+                revision = None
+            else:
+                revision = self._revision()
+            if cached is not None and revision is not None and revision == self._settings_revision:
+                self._settings_checked = time.monotonic()
+                logger.debug("Settings unchanged since %s", revision)
+                return cached
+
+            try:
+                rows = self._call(
+                    lambda: self._worksheet(config.SETTINGS_WORKSHEET).get(Settings.RANGE)
+                )
+                settings = Settings.from_cells([row[0] if row else '' for row in rows])
+
+            except gspread.exceptions.WorksheetNotFound:
+                logger.error(
+                    "Worksheet '%s' not found. "
+                    "Please create it in your spreadsheet.",
+                    config.SETTINGS_WORKSHEET
+                )
+                raise
+
+            except Exception as e:
+                if cached is not None:
+                    logger.warning("Failed to reload settings, keeping the previous ones: %s", e)
+                    return cached
+                if isinstance(e, ValueError):
+                    logger.error("Invalid target rating value: %s", e)
+                raise
+
+            if cached is None:
+                logger.info("Settings: %s", settings.describe())
+            elif settings != cached:
+                logger.info("⚙️  Settings changed: %s", settings.describe())
+
+            self._settings = settings
+            self._settings_revision = revision
+            self._settings_checked = time.monotonic()
+            return settings
+
+    def _rebase_revision(self, before: str):
+        """
+        Record the revision left by this process's own write, so the next
+        settings check does not treat it as an edit. If the spreadsheet had
+        already changed before the write, the recorded revision is kept and
+        the next check re-reads the settings.
+
+        Args:
+            before: Revision read just before the write
+        """
+        with self._settings_lock:
+            if before != self._settings_revision:
+                return
+            after = self._revision()
+            if after is not None:
+                self._settings_revision = after
+
     def get_target_rating(self) -> int:
         """
         Retrieve target rating from Settings worksheet.
@@ -75,28 +330,24 @@ class SheetsService:
         Raises:
             ValueError: If the rating value is invalid
         """
-        try:
-            worksheet = self.spreadsheet.worksheet(config.SETTINGS_WORKSHEET)
-            rating_value = worksheet.acell('B1').value
-
-            if not rating_value:
-                raise ValueError("Target rating (B1) is empty")
-
-            rating = int(rating_value)
-            logger.info(f"Target rating: {rating}")
+        return self.get_settings().target_rating
 
-            return rating
+    def get_problem_filter(self) -> ProblemFilter:
+        """
+        Retrieve the optional problem filter from the Settings worksheet
+        (B2: contest types, B3: problem indexes, B4: earliest contest year).
 
-        except gspread.exceptions.WorksheetNotFound:
-            logger.error(
-                f"Worksheet '{config.SETTINGS_WORKSHEET}' not found. "
-                "Please create it in your spreadsheet."
-            )
-            raise
+        Values are comma separated, e.g. ``weekly`` / ``Q3,Q4`` / ``2023``;
+        empty cells do not restrict.
 
-        except ValueError as e:
-            logger.error(f"Invalid target rating value: {e}")
-            raise
+        Returns:
+            Problem filter (empty if unset or unreadable)
+        """
+        try:
+            return self.get_settings().problem_filter
+        except Exception as e:
+            logger.warning("Failed to read problem filter, not filtering: %s", e)
+            return ProblemFilter()
 
     def get_history_ids(self) -> Set[str]:
         """
@@ -104,30 +355,35 @@ class SheetsService:
 
         Returns:
             Set of problem IDs that have been sent before
+
+        Raises:
+            Exception: If history cannot be read; an empty set here would
+                       silently allow repeats, so callers must not proceed
         """
         try:
-            worksheet = self.spreadsheet.worksheet(config.HISTORY_WORKSHEET)
-
             # Read all values from column A
-            values = worksheet.col_values(1)
+            values = self._call(
+                lambda: self._worksheet(config.HISTORY_WORKSHEET).col_values(1)
+            )
 
             # Skip header row and create set
             history_ids = set(values[1:]) if len(values) > 1 else set()
 
-            logger.info(f"Loaded {len(history_ids)} problem IDs from history")
+            logger.info("Loaded %s problem IDs from history", len(history_ids))
 
             return history_ids
 
         except gspread.exceptions.WorksheetNotFound:
             logger.warning(
-                f"Worksheet '{config.HISTORY_WORKSHEET}' not found. "
-                "Creating new history..."
+                "Worksheet '%s' not found. "
+                "Creating new history...",
+                config.HISTORY_WORKSHEET
             )
             return set()
 
         except Exception as e:
-            logger.error(f"Failed to read history: {e}")
-            return set()
+            logger.error("Failed to read history: %s", e)
+            raise
 
     def add_to_history(self, problem_id: str) -> bool:
         """
@@ -139,15 +395,39 @@ class SheetsService:
         Returns:
             True if successful, False otherwise
         """
+        return self.add_many_to_history([problem_id])
+
+    def add_many_to_history(self, problem_ids: List[str]) -> bool:
+        """
+        Add several problem IDs to the history worksheet with one write.
+
+        Args:
+            problem_ids: Problem IDs to add, in delivery order
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not problem_ids:
+            return True
+
         try:
-            worksheet = self.spreadsheet.worksheet(config.HISTORY_WORKSHEET)
-            worksheet.append_row([problem_id])
+            # Revision before our own write, to tell it apart from Settings edits
+            with self._settings_lock:
+                before = self._revision() if self._settings_revision is not None else None
+
+            self._call(
+                lambda: self._worksheet(config.HISTORY_WORKSHEET).append_rows(
+                    [[problem_id] for problem_id in problem_ids]
+                )
+            )
+            if before is not None:
+                self._rebase_revision(before)
 
-            logger.info(f"Added problem ID {problem_id} to history")
+            logger.info("Added problem ID(s) %s to history", ", ".join(problem_ids))
             return True
 
         except Exception as e:
-            logger.error(f"Failed to add problem to history: {e}")
+            logger.error("Failed to add problem(s) to history: %s", e)
             return False
 
     def initialize_sheets(self):
@@ -167,7 +447,16 @@ class SheetsService:
                     rows=config.SHEETS_SETTINGS_ROWS,
                     cols=config.SHEETS_SETTINGS_COLS
                 )
-                settings.update('A1:B1', [['Target_Rating', '1500']])
+                settings.update('A1:B8', [
+                    ['Target_Rating', '1500'],
+                    ['Contest_Types', ''],
+                    ['Problem_Indexes', ''],
+                    ['Since_Year', ''],
+                    ['Rating_Tolerance', ''],
+                    ['Languages', ''],
+                    ['Delivery_Time', ''],
+                    ['Digest_Size', ''],
+                ])
                 logger.info("Settings worksheet created with default rating 1500")
 
             # Check/create History worksheet
@@ -188,5 +477,5 @@ class SheetsService:
             return True
 
         except Exception as e:
-            logger.error(f"Failed to initialize spreadsheet: {e}")
+            logger.error("Failed to initialize spreadsheet: %s", e)
             return False
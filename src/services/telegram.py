@@ -3,24 +3,164 @@ Telegram Bot service module.
 Handles sending formatted messages to Telegram.
 """
 
+import html
+import re
+import threading
+import time
 from datetime import datetime
-from typing import Dict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 import requests
 
 from src.config import config
-from src.utils.logger import logger
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.http import get_transport
+from src.utils.logger import log_stage, logger
+from src.utils.resilience import CircuitOpenError, ResilientCaller
+
+# Failures of a Bot API call after retries
+SEND_ERRORS = (requests.RequestException, DeadlineExceeded, CircuitOpenError)
+
+# One delivery unit: a message text, or a document {'document': filename, 'content': text}
+Part = Union[str, Dict[str, str]]
+
+
+def describe_send_error(exc: BaseException) -> str:
+    """
+    Explain a failed Bot API call.
+
+    Args:
+        exc: Exception raised by the call
+
+    Returns:
+        Telegram's error description with the HTTP status if the response
+        carries one (e.g. "HTTP 400: Bad Request: chat not found"), else
+        the exception text
+    """
+    response = getattr(exc, 'response', None)
+    if response is not None:
+        try:
+            description = response.json().get('description')
+        except (ValueError, AttributeError):
+            description = None
+        if description:
+            return f"HTTP {response.status_code}: {description}"
+    return str(exc) or type(exc).__name__
 
 
 class TelegramService:
     """Service for sending messages via Telegram Bot API."""
 
-    def __init__(self):
-        """Initialize Telegram service."""
+    # Code fence tags mapped to Telegram syntax highlighting classes
+    CODE_LANGUAGE_CLASSES = {'c++': 'cpp', 'golang': 'go', 'py': 'python'}
+
+    # Opening and closing tags of a preformatted block
+    _PRE_OPEN = re.compile(r'<pre>(?:<code[^>]*>)?')
+
+    # Fenced code block, with the "## ... 程式碼" heading right above it if any
+    _CODE_SECTION = re.compile(
+        r'(?:^##[^\n]*\n)?```([\w+#-]+)?[ \t]*\n(.*?)\n```', re.DOTALL | re.MULTILINE
+    )
+
+    # Code fence tags mapped to a source file extension and line comment prefix
+    DOCUMENT_SOURCES = {
+        'cpp': ('cpp', '//'),
+        'python': ('py', '#'),
+        'java': ('java', '//'),
+        'go': ('go', '//'),
+    }
+
+    def __init__(self, deadline: Optional[Deadline] = None):
+        """
+        Initialize Telegram service.
+
+        Args:
+            deadline: Run deadline bounding every request (unbounded if None)
+        """
+        self.deadline = deadline or Deadline()
+        self.resilience = ResilientCaller("telegram", self.deadline)
+        self.http = get_transport()
         self.bot_token = config.telegram_bot_token
         self.chat_id = config.telegram_chat_id
         self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+        # Why the last send_to_chat of each thread failed
+        self._local = threading.local()
         logger.info("Telegram service initialized")
 
+    @property
+    def last_error(self) -> Optional[str]:
+        """Why the calling thread's last ``send_to_chat`` failed (None if it succeeded)."""
+        return getattr(self._local, 'error', None)
+
+    def _fail(self, exc: BaseException):
+        """Remember why the calling thread's current send failed."""
+        self._local.error = describe_send_error(exc)
+
+    def _timeout(self, own_timeout: Optional[float] = None) -> float:
+        """Timeout for the next request: min(own timeout, remaining run budget)."""
+        if own_timeout is None:
+            own_timeout = config.TELEGRAM_REQUEST_TIMEOUT
+        return self.deadline.timeout(own_timeout)
+
+    def _post(self, method: str, payload: Dict, files: Optional[Dict] = None) -> requests.Response:
+        """
+        Call a Bot API method, retrying transient failures (429, 5xx, network).
+
+        Args:
+            method: Bot API method name (e.g. "sendMessage")
+            payload: JSON payload (form fields when uploading files)
+            files: Multipart uploads, name -> (filename, bytes, content type)
+
+        Returns:
+            Successful HTTP response
+
+        Raises:
+            requests.RequestException: If the call ultimately fails
+            CircuitOpenError: If Telegram is known to be down
+            DeadlineExceeded: If the run deadline has been reached
+        """
+        return self.resilience.call(self._post_once, method, payload, files=files)
+
+    def _post_once(
+        self,
+        method: str,
+        payload: Dict,
+        own_timeout: Optional[float] = None,
+        files: Optional[Dict] = None
+    ) -> requests.Response:
+        """Perform one Bot API request attempt."""
+        url = f"{self.api_url}/{method}"
+        if files:
+            # Uploads are multipart; bytes (not file objects) make retries safe
+            response = self.http.post(url, data=payload, files=files, timeout=self._timeout(own_timeout))
+        else:
+            response = self.http.post(url, json=payload, timeout=self._timeout(own_timeout))
+        response.raise_for_status()
+        return response
+
+    def get_updates(self, offset: Optional[int] = None, poll_timeout: int = 25) -> List[Dict]:
+        """
+        Long-poll for incoming updates.
+
+        Polling bypasses the retry policy and circuit breaker: an idle or
+        failing poll must never open the circuit that message sends use.
+
+        Args:
+            offset: First update ID to return (acknowledges earlier ones)
+            poll_timeout: Seconds Telegram may hold the request open
+
+        Returns:
+            List of update objects
+
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        payload = {"timeout": poll_timeout, "allowed_updates": ["message"]}
+        if offset is not None:
+            payload["offset"] = offset
+
+        response = self._post_once("getUpdates", payload, own_timeout=poll_timeout + 10)
+        return response.json().get('result', [])
+
     def send_message(self, text: str, parse_mode: str = "HTML") -> bool:
         """
         Send a message to the configured Telegram chat.
@@ -41,67 +181,407 @@ class TelegramService:
                 return self._send_single_message(text, parse_mode)
 
             # Split long message into chunks
-            logger.info(f"Message too long ({len(text)} chars), splitting...")
-            chunks = self._split_message(text, config.TELEGRAM_MAX_MESSAGE_LENGTH)
+            logger.info("Message too long (%s chars), splitting...", len(text))
+            return self.send_chunks(self.split_for_delivery(text), parse_mode=parse_mode)
 
-            for i, chunk in enumerate(chunks, 1):
-                logger.info(f"Sending chunk {i}/{len(chunks)}...")
-                if not self._send_single_message(chunk, parse_mode):
-                    logger.error(f"Failed to send chunk {i}")
-                    return False
+        except Exception as e:
+            logger.error("Failed to send Telegram message: %s", e)
+            return False
 
-            logger.info("All message chunks sent successfully")
-            return True
+    def split_for_delivery(self, text: str) -> List[str]:
+        """
+        Split a formatted message into chunks that each fit one message.
 
-        except Exception as e:
-            logger.error(f"Failed to send Telegram message: {e}")
+        Args:
+            text: Formatted message
+
+        Returns:
+            List of message chunks
+        """
+        # Leave room for the tags that re-balance a split <pre> block
+        with log_stage("split"):
+            chunks = self._split_message(text, config.TELEGRAM_MAX_MESSAGE_LENGTH - 64)
+            return self._balance_pre_blocks(chunks)
+
+    def _balance_pre_blocks(self, chunks: List[str]) -> List[str]:
+        """
+        Close a <pre> block cut by a chunk boundary and reopen it (with the
+        same language) in the next chunk, so every chunk is valid HTML.
+
+        Args:
+            chunks: Split message
+
+        Returns:
+            Chunks with balanced <pre> tags
+        """
+        balanced = []
+        reopen = ""
+        for chunk in chunks:
+            chunk = reopen + chunk
+            reopen = ""
+
+            openings = list(self._PRE_OPEN.finditer(chunk))
+            opening = openings[-1] if openings else None
+            if opening and opening.start() > chunk.rfind("</pre>"):
+                reopen = opening.group(0)
+                closing = "</code></pre>" if "<code" in reopen else "</pre>"
+                chunk += closing
+
+            balanced.append(chunk)
+        return balanced
+
+    def render_for_delivery(self, problem_info: Dict[str, str], solution: str) -> List[Part]:
+        """
+        Render a problem message into delivery parts.
+
+        A message that fits in one chunk is delivered as is. A longer one is
+        (with config.TELEGRAM_DOCUMENT_DELIVERY) sent as a short summary
+        plus the full solution as one document, so a delivery takes at most
+        two API calls however long the solution is.
+
+        Args:
+            problem_info: Problem information dictionary
+            solution: AI-generated solution text (markdown format)
+
+        Returns:
+            Message chunks, or [summary, document]
+        """
+        chunks = self.split_for_delivery(self.format_daily_message(problem_info, solution))
+        if len(chunks) <= 1 or not config.TELEGRAM_DOCUMENT_DELIVERY:
+            return chunks
+
+        summary, complete = self.format_summary_message(problem_info, solution)
+        document = self.build_document(problem_info, solution, explained=complete)
+        logger.info(
+            "Solution needs %s chunks, sending a summary and %s instead", len(chunks), document['document']
+        )
+        return [summary, document]
+
+    def format_summary_message(self, problem_info: Dict[str, str], solution: str) -> Tuple[str, bool]:
+        """
+        Format the daily message without code, trimmed to one message.
+
+        Args:
+            problem_info: Problem information dictionary
+            solution: AI-generated solution text (markdown format)
+
+        Returns:
+            Tuple of (message text in HTML, whether the explanation is complete)
+        """
+        explanation = self._CODE_SECTION.sub("", solution).strip()
+        note = "\n\n📎 完整解法與程式碼請見下方附件"
+        limit = config.TELEGRAM_MAX_MESSAGE_LENGTH - 64
+
+        complete = True
+        message = self.format_daily_message(problem_info, explanation + note)
+        while len(message) > limit and explanation:
+            # Cut at a line break; HTML escaping makes the final length hard to predict
+            explanation = explanation[:int(len(explanation) * 0.8)].rsplit("\n", 1)[0]
+            complete = False
+            message = self.format_daily_message(problem_info, explanation + "\n…" + note)
+
+        return message, complete
+
+    def build_document(
+        self,
+        problem_info: Dict[str, str],
+        solution: str,
+        explained: bool = False
+    ) -> Dict[str, str]:
+        """
+        Build the attachment holding the full solution.
+
+        A solution with a single code block becomes a source file (e.g.
+        ``.cpp``) when the summary already carries the whole explanation;
+        otherwise the whole solution is attached as markdown.
+
+        Args:
+            problem_info: Problem information dictionary
+            solution: AI-generated solution text (markdown format)
+            explained: Whether the summary message shows the full explanation
+
+        Returns:
+            Document part: {'document': filename, 'content': text}
+        """
+        stem = f"{problem_info.get('id', 'solution')}-{problem_info.get('slug') or 'solution'}"
+        title = f"{problem_info.get('id', '')}. {problem_info.get('title', 'Unknown')}"
+        blocks = self._CODE_SECTION.findall(solution)
+
+        if explained and len(blocks) == 1:
+            language = (blocks[0][0] or '').lower()
+            language = self.CODE_LANGUAGE_CLASSES.get(language, language)
+            if language in self.DOCUMENT_SOURCES:
+                extension, comment = self.DOCUMENT_SOURCES[language]
+                content = f"{comment} {title}\n{comment} {problem_info.get('url', '')}\n\n{blocks[0][1].strip()}\n"
+                return {'document': f"{stem}.{extension}", 'content': content}
+
+        content = (
+            f"# {title}\n\n"
+            f"Rating: {problem_info.get('rating', 'N/A')}  \n"
+            f"{problem_info.get('url', '')}\n\n"
+            f"{solution.strip()}\n"
+        )
+        return {'document': f"{stem}.md", 'content': content}
+
+    def send_document(
+        self,
+        filename: str,
+        content: str,
+        chat_id: Optional[str] = None,
+        caption: Optional[str] = None
+    ) -> bool:
+        """
+        Upload a text document built in memory.
+
+        Args:
+            filename: File name shown in the chat
+            content: File content
+            chat_id: Target chat (defaults to the configured chat)
+            caption: Optional HTML caption
+
+        Returns:
+            True if the document was sent successfully
+        """
+        payload = {"chat_id": chat_id or self.chat_id}
+        if caption:
+            payload["caption"] = caption
+            payload["parse_mode"] = "HTML"
+        files = {"document": (filename, content.encode("utf-8"), "text/plain; charset=utf-8")}
+
+        try:
+            self._post("sendDocument", payload, files=files)
+            return True
+        except SEND_ERRORS as e:
+            logger.error("Failed to send document %s: %s", filename, e)
+            self._fail(e)
             return False
 
-    def _send_single_message(self, text: str, parse_mode: str = "HTML") -> bool:
+    def send_part(self, part: Part, parse_mode: Optional[str] = "HTML", chat_id: Optional[str] = None) -> bool:
+        """
+        Deliver one part: a message chunk or a document.
+
+        Args:
+            part: Message text or document part (see build_document)
+            parse_mode: Parse mode for message chunks
+            chat_id: Target chat (defaults to the configured chat)
+
+        Returns:
+            True if the part was delivered
+        """
+        if isinstance(part, dict):
+            return self.send_document(part['document'], part['content'], chat_id=chat_id)
+        return self._send_single_message(part, parse_mode, chat_id=chat_id)
+
+    def send_chunks(
+        self,
+        chunks: List[Part],
+        pending: Optional[Iterable[int]] = None,
+        on_sent: Optional[Callable[[int], None]] = None,
+        parse_mode: str = "HTML",
+        chat_id: Optional[str] = None
+    ) -> bool:
+        """
+        Send message chunks (or documents) in order, stopping at the first failure.
+
+        Args:
+            chunks: All parts of the message
+            pending: Indexes still to send (defaults to all)
+            on_sent: Called with each chunk index once it is delivered
+            parse_mode: Parse mode for formatting
+            chat_id: Target chat (defaults to the configured chat)
+
+        Returns:
+            True if every pending chunk was delivered
+        """
+        indexes = list(range(len(chunks))) if pending is None else sorted(pending)
+
+        for i in indexes:
+            logger.info("Sending chunk %s/%s...", i + 1, len(chunks))
+            if not self.send_part(chunks[i], parse_mode, chat_id=chat_id):
+                logger.error("Failed to send chunk %s", i + 1)
+                return False
+            if on_sent:
+                on_sent(i)
+
+        logger.info("All message chunks sent successfully")
+        return True
+
+    def send_to_chat(
+        self,
+        chat_id: str,
+        text: str,
+        parse_mode: Optional[str] = "HTML",
+        document: Optional[str] = None
+    ) -> bool:
+        """
+        Send a single message (or document) to a specific chat.
+
+        Args:
+            chat_id: Target Telegram chat ID
+            text: Message text to send (must fit in one message),
+                  or the document content
+            parse_mode: Parse mode for formatting
+            document: File name to send the text as a document instead
+
+        Returns:
+            True if message was sent successfully (see ``last_error`` otherwise)
+        """
+        self._local.error = None
+        if document:
+            return self.send_document(document, text, chat_id=chat_id)
+        return self._send_single_message(text, parse_mode, chat_id=chat_id)
+
+    def _send_single_message(
+        self,
+        text: str,
+        parse_mode: Optional[str] = "HTML",
+        chat_id: Optional[str] = None
+    ) -> bool:
         """
         Send a single message to Telegram.
 
         Args:
             text: Message text to send
             parse_mode: Parse mode for formatting (Markdown or HTML)
+            chat_id: Target chat (defaults to the configured chat)
 
         Returns:
             True if message was sent successfully
         """
+        chat_id = chat_id or self.chat_id
         try:
-            url = f"{self.api_url}/sendMessage"
             payload = {
-                "chat_id": self.chat_id,
+                "chat_id": chat_id,
                 "text": text,
-                "parse_mode": parse_mode,
                 "disable_web_page_preview": True
             }
+            if parse_mode:
+                payload["parse_mode"] = parse_mode
 
-            response = requests.post(url, json=payload, timeout=config.TELEGRAM_REQUEST_TIMEOUT)
-            response.raise_for_status()
+            self._post("sendMessage", payload)
             return True
 
-        except requests.RequestException as e:
-            logger.error(f"Failed to send message: {e}")
+        except SEND_ERRORS as e:
+            logger.error("Failed to send message: %s", e)
+            self._fail(e)
 
             # If Markdown parsing failed, try sending without parse_mode
             if parse_mode and "Bad Request" in str(e):
                 logger.warning("Markdown parsing failed, retrying without formatting...")
                 try:
                     payload_plain = {
-                        "chat_id": self.chat_id,
+                        "chat_id": chat_id,
                         "text": text,
                         "disable_web_page_preview": True
                     }
-                    response = requests.post(url, json=payload_plain, timeout=config.TELEGRAM_REQUEST_TIMEOUT)
-                    response.raise_for_status()
+                    self._post("sendMessage", payload_plain)
                     logger.info("Message sent successfully without formatting")
                     return True
-                except requests.RequestException as e2:
-                    logger.error(f"Failed to send plain text message: {e2}")
+                except SEND_ERRORS as e2:
+                    logger.error("Failed to send plain text message: %s", e2)
+                    self._fail(e2)
+
+            return False
+
+    def send_message_with_id(
+        self,
+        text: str,
+        parse_mode: str = "HTML",
+        chat_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Send a single message and return its message ID.
+
+        Args:
+            text: Message text to send (must fit in one message)
+            parse_mode: Parse mode for formatting
+            chat_id: Target chat (defaults to the configured chat)
+
+        Returns:
+            Telegram message ID, or None if sending failed
+        """
+        try:
+            payload = {
+                "chat_id": chat_id or self.chat_id,
+                "text": text,
+                "parse_mode": parse_mode,
+                "disable_web_page_preview": True
+            }
+
+            response = self._post("sendMessage", payload)
+            return response.json().get('result', {}).get('message_id')
+
+        except SEND_ERRORS + (ValueError,) as e:
+            logger.error("Failed to send message: %s", e)
+            return None
+
+    def edit_message_text(
+        self,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML",
+        chat_id: Optional[str] = None
+    ) -> bool:
+        """
+        Replace the text of a previously sent message.
+
+        Args:
+            message_id: ID of the message to edit
+            text: New message text (must fit in one message)
+            parse_mode: Parse mode for formatting, or None for plain text
+            chat_id: Chat of the message (defaults to the configured chat)
+
+        Returns:
+            True if the message now shows the given text
+        """
+        payload = {
+            "chat_id": chat_id or self.chat_id,
+            "message_id": message_id,
+            "text": text,
+            "disable_web_page_preview": True
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        try:
+            self._post("editMessageText", payload)
+            return True
+
+        except SEND_ERRORS as e:
+            response = getattr(e, 'response', None)
+            if response is not None and "message is not modified" in response.text:
+                return True
+
+            logger.error("Failed to edit message %s: %s", message_id, e)
+
+            # Fall back to plain text if the HTML could not be parsed
+            if parse_mode and "Bad Request" in str(e):
+                logger.warning("HTML parsing failed, retrying edit without formatting...")
+                return self.edit_message_text(message_id, text, parse_mode=None, chat_id=chat_id)
 
             return False
 
+    def start_progressive_message(
+        self,
+        problem_info: Dict[str, str],
+        chat_id: Optional[str] = None
+    ) -> Optional["ProgressiveMessage"]:
+        """
+        Send the problem header right away and return a handle for
+        streaming the rest of the message into it.
+
+        Args:
+            problem_info: Problem information dictionary
+            chat_id: Target chat (defaults to the configured chat)
+
+        Returns:
+            ProgressiveMessage handle, or None if the header could not be sent
+        """
+        progressive = ProgressiveMessage(self, problem_info, chat_id=chat_id)
+        if not progressive.start():
+            return None
+        return progressive
+
     def _split_message(self, text: str, max_length: int) -> list:
         """
         Split a long message into chunks at natural breakpoints.
@@ -166,18 +646,10 @@ class TelegramService:
         Returns:
             Formatted message text in HTML
         """
-        today = datetime.now().strftime("%Y-%m-%d")
-
         # Convert markdown solution to HTML-friendly format
         solution_html = self._convert_markdown_to_html(solution)
 
-        message = f"""<b>LeetCode Daily Challenge - {today}</b>
-
-🏆 <b>題目</b>: {problem_info.get('title', 'Unknown')}
-⭐ <b>Rating</b>: {problem_info.get('rating', 'N/A')}
-🔗 <a href="{problem_info.get('url', '')}">題目連結</a>
-
-━━━━━━━━━━━━━━━━
+        message = f"""{self.format_header(problem_info)}
 
 {solution_html}
 
@@ -186,6 +658,28 @@ class TelegramService:
 """
         return message
 
+    def format_header(self, problem_info: Dict[str, str]) -> str:
+        """
+        Format the problem header shown at the top of the daily message.
+
+        Args:
+            problem_info: Problem information dictionary
+
+        Returns:
+            Header text in HTML
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        review = "\n🔁 <b>複習題</b>（之前推送過，試著不看解法再寫一次）\n" if problem_info.get('review') else ""
+
+        return f"""<b>LeetCode Daily Challenge - {today}</b>
+{review}
+🏆 <b>題目</b>: {problem_info.get('title', 'Unknown')}
+⭐ <b>Rating</b>: {problem_info.get('rating', 'N/A')}
+🔗 <a href="{problem_info.get('url', '')}">題目連結</a>
+
+━━━━━━━━━━━━━━━━"""
+
     def _convert_markdown_to_html(self, text: str) -> str:
         """
         Convert markdown solution to HTML format for Telegram.
@@ -198,18 +692,17 @@ class TelegramService:
         Returns:
             HTML formatted text
         """
-        import re
-
         # Step 1: Extract and protect code blocks
         code_blocks = []
         def extract_code_block(match):
-            code = match.group(1).strip()
+            language = (match.group(1) or '').lower()
+            code = match.group(2).strip()
             # Don't escape HTML in code - keep it raw for <pre>
-            code_blocks.append(code)
+            code_blocks.append((language, code))
             return f"\n___CODE_BLOCK_{len(code_blocks)-1}___\n"
 
-        # Extract code blocks (```cpp ... ``` or ``` ... ```)
-        text = re.sub(r'```(?:cpp|c\+\+)?\s*\n(.*?)\n```', extract_code_block, text, flags=re.DOTALL | re.IGNORECASE)
+        # Extract code blocks (```cpp ... ```, ```python ... ``` or ``` ... ```)
+        text = re.sub(r'```([\w+#-]+)?[ \t]*\n(.*?)\n```', extract_code_block, text, flags=re.DOTALL)
 
         # Step 2: Convert remaining markdown to HTML
         # Escape HTML characters in non-code content
@@ -224,11 +717,16 @@ class TelegramService:
         # Convert inline `code` to <code>code</code>
         text = re.sub(r'`(.+?)`', r'<code>\1</code>', text)
 
-        # Step 3: Restore code blocks with <pre> tags
-        for i, code in enumerate(code_blocks):
+        # Step 3: Restore code blocks, each language in its own <pre> block
+        for i, (language, code) in enumerate(code_blocks):
             # Escape HTML in code content
             code_escaped = code.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            text = text.replace(f"___CODE_BLOCK_{i}___", f"<pre>{code_escaped}</pre>")
+            if language:
+                language = self.CODE_LANGUAGE_CLASSES.get(language, language)
+                block = f'<pre><code class="language-{language}">{code_escaped}</code></pre>'
+            else:
+                block = f"<pre>{code_escaped}</pre>"
+            text = text.replace(f"___CODE_BLOCK_{i}___", block)
 
         return text
 
@@ -241,19 +739,157 @@ class TelegramService:
         """
         try:
             url = f"{self.api_url}/getMe"
-            response = requests.get(url, timeout=config.HTTP_QUICK_TIMEOUT)
+            response = self.http.get(url, timeout=self._timeout(config.HTTP_QUICK_TIMEOUT))
             response.raise_for_status()
 
             data = response.json()
             if data.get('ok'):
                 bot_info = data.get('result', {})
                 logger.info(
-                    f"Telegram bot connected: @{bot_info.get('username', 'unknown')}"
+                    "Telegram bot connected: @%s", bot_info.get('username', 'unknown')
                 )
                 return True
 
             return False
 
         except Exception as e:
-            logger.error(f"Telegram connection test failed: {e}")
+            logger.error("Telegram connection test failed: %s", e)
+            return False
+
+
+class ProgressiveMessage:
+    """A Telegram message that is edited in place as generated text arrives."""
+
+    CURSOR = " ▌"
+
+    def __init__(
+        self,
+        telegram: TelegramService,
+        problem_info: Dict[str, str],
+        interval: Optional[float] = None,
+        chat_id: Optional[str] = None
+    ):
+        """
+        Initialize progressive message.
+
+        Args:
+            telegram: Telegram service used for sending and editing
+            problem_info: Problem information dictionary
+            interval: Minimum seconds between edits
+                      (defaults to config.TELEGRAM_EDIT_INTERVAL)
+            chat_id: Target chat (defaults to the configured chat)
+        """
+        self.telegram = telegram
+        self.chat_id = chat_id
+        self.header = telegram.format_header(problem_info)
+        self.interval = interval if interval is not None else config.TELEGRAM_EDIT_INTERVAL
+        self.message_id: Optional[int] = None
+        self._last_edit = 0.0
+        self._last_preview = ""
+
+    def start(self) -> bool:
+        """
+        Send the header message.
+
+        Returns:
+            True if the header was delivered
+        """
+        self.message_id = self.telegram.send_message_with_id(
+            f"{self.header}\n\n⏳ 解法生成中...", chat_id=self.chat_id
+        )
+        self._last_edit = time.monotonic()
+        return self.message_id is not None
+
+    def update(self, markdown: str):
+        """
+        Show the text generated so far, throttled to one edit per interval.
+
+        Args:
+            markdown: Accumulated markdown generated so far
+        """
+        if self.message_id is None or markdown == self._last_preview:
+            return
+
+        now = time.monotonic()
+        if now - self._last_edit < self.interval:
+            return
+
+        # Partial markdown is shown escaped; only the tail fits once it grows.
+        # The budget applies to the escaped text (&lt; etc. are longer)
+        budget = config.TELEGRAM_MAX_MESSAGE_LENGTH - len(self.header) - 16
+        text = f"{self.header}\n\n{self._tail(html.escape(markdown, quote=False), budget)}{self.CURSOR}"
+
+        self._last_edit = now
+        self._last_preview = markdown
+        self.telegram.edit_message_text(self.message_id, text, chat_id=self.chat_id)
+
+    @staticmethod
+    def _tail(escaped: str, budget: int) -> str:
+        """
+        Cut escaped text to its last ``budget`` characters without splitting
+        an entity.
+
+        Args:
+            escaped: HTML-escaped text
+            budget: Maximum length of the result
+
+        Returns:
+            The text, or "…" plus as much of its tail as fits
+        """
+        if len(escaped) <= budget:
+            return escaped
+
+        start = len(escaped) - budget + 1  # Room for the ellipsis
+        # Entities are at most 5 characters ("&amp;"); skip one cut in half
+        entity = escaped.rfind("&", max(start - 4, 0), start)
+        if entity != -1:
+            end = escaped.find(";", entity)
+            if end >= start:
+                start = end + 1
+        return "…" + escaped[start:]
+
+    def replace_preview(self, chunk: Part) -> bool:
+        """
+        Replace the preview with the first chunk of the final message.
+
+        Args:
+            chunk: First chunk of the final message
+
+        Returns:
+            True if the preview now shows the chunk (documents cannot
+            replace a text message)
+        """
+        if self.message_id is None or isinstance(chunk, dict):
             return False
+        return self.telegram.edit_message_text(self.message_id, chunk, chat_id=self.chat_id)
+
+    def finalize(
+        self,
+        chunks: List[Part],
+        on_sent: Optional[Callable[[int], None]] = None
+    ) -> bool:
+        """
+        Replace the preview with the first chunk of the final HTML message,
+        sending the remaining chunks as new messages.
+
+        Args:
+            chunks: Final message split for delivery (see render_for_delivery)
+            on_sent: Called with each chunk index once it is delivered
+
+        Returns:
+            True if every chunk was delivered
+        """
+        if not self.replace_preview(chunks[0]):
+            logger.warning("Could not finalize streamed message, sending it in full")
+            return self.telegram.send_chunks(chunks, on_sent=on_sent, chat_id=self.chat_id)
+
+        if on_sent:
+            on_sent(0)
+
+        if not self.telegram.send_chunks(
+            chunks, pending=range(1, len(chunks)), on_sent=on_sent, chat_id=self.chat_id
+        ):
+            return False
+
+        logger.info("Streamed message finalized (%s chunks)", len(chunks))
+        return True
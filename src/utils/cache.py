@@ -0,0 +1,60 @@
+"""
+Local cache of generated solutions.
+
+Each entry is a small JSON file under ``STATE_DIR/solutions`` so a problem
+only has to be generated once, no matter how many runs deliver it.
+"""
+
+import re
+import time
+from typing import Optional
+
+from src.config import config
+from src.utils.state import load_json, save_json, state_path
+
+
+class SolutionCache:
+    """File-backed cache of AI-generated solutions keyed by problem ID."""
+
+    def __init__(self, namespace: str = "solutions"):
+        """
+        Initialize cache.
+
+        Args:
+            namespace: Subdirectory of the state directory holding entries
+        """
+        self.namespace = namespace
+
+    def _path(self, key: str) -> str:
+        """Return the file path for a cache key."""
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+        return state_path(self.namespace, f"{safe_key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached solution.
+
+        Args:
+            key: Cache key (problem ID)
+
+        Returns:
+            Cached solution text, or None on a miss
+        """
+        entry = load_json(self._path(key))
+        if not entry:
+            return None
+        return entry.get('solution')
+
+    def put(self, key: str, solution: str):
+        """
+        Store a solution.
+
+        Args:
+            key: Cache key (problem ID)
+            solution: Solution text
+        """
+        save_json(self._path(key), {
+            'solution': solution,
+            'model': config.GEMINI_MODEL,
+            'created_at': int(time.time()),
+        })
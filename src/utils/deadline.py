@@ -0,0 +1,92 @@
+"""
+Run-level deadline budget.
+
+A single Deadline is shared by every service of a run. Each outbound call
+asks it for ``min(own timeout, remaining budget)``, so the whole run has a
+hard upper bound regardless of how many calls it makes.
+"""
+
+import math
+import time
+from typing import Callable, Optional
+
+from src.config import config
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call is attempted after the run budget is spent."""
+
+
+class Deadline:
+    """Wall-clock budget for one run."""
+
+    def __init__(
+        self,
+        budget_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize deadline.
+
+        Args:
+            budget_seconds: Total seconds the run may take (None = unbounded)
+            clock: Monotonic clock, injectable for tests
+        """
+        self._clock = clock
+        self.budget = budget_seconds
+        self.restart()
+
+    def restart(self):
+        """Start a fresh budget (for long-lived services running many runs)."""
+        self.expires_at = (
+            self._clock() + self.budget if self.budget else math.inf
+        )
+
+    def remaining(self) -> float:
+        """
+        Seconds left before the deadline.
+
+        Returns:
+            Remaining seconds (``math.inf`` for an unbounded deadline)
+        """
+        return self.expires_at - self._clock()
+
+    def timeout(self, own_timeout: float, reserve: float = 0.0) -> float:
+        """
+        Timeout to use for the next call.
+
+        Args:
+            own_timeout: The call's own timeout in seconds
+            reserve: Seconds to keep back for later, cheaper steps
+
+        Returns:
+            ``min(own_timeout, remaining - reserve)`` in seconds
+
+        Raises:
+            DeadlineExceeded: If no usable budget is left
+        """
+        available = self.remaining() - reserve
+        if available <= 0:
+            raise DeadlineExceeded(
+                f"Run deadline reached ({self.budget}s budget, {reserve}s reserved)"
+            )
+        return min(own_timeout, available)
+
+    def near(self, reserve: Optional[float] = None) -> bool:
+        """
+        Whether the run should switch to its cheapest fallback.
+
+        Args:
+            reserve: Seconds that must remain (defaults to config.RUN_DEADLINE_RESERVE)
+
+        Returns:
+            True if less than the reserve is left
+        """
+        if reserve is None:
+            reserve = config.RUN_DEADLINE_RESERVE
+        return self.remaining() < reserve
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
@@ -0,0 +1,115 @@
+"""
+Shared Google authorization.
+
+One service-account credential and one authorized gspread client are
+created per process and shared by every SheetsService (and the scripts).
+The access token stays in memory only: it grants Drive access and expires
+within the hour, so persisting it under the state directory (which CI
+caches between runs) would leak it without ever saving an exchange. The
+spreadsheet key is cached so it is opened by key instead of by a Drive
+search for its name.
+"""
+
+import json
+import os
+import threading
+from typing import Optional
+
+import gspread
+from google.oauth2.service_account import Credentials
+
+from src.config import config
+from src.utils.logger import logger
+from src.utils.state import load_json, save_json, state_path
+
+
+# Google API scopes
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+_lock = threading.Lock()
+_client: Optional[gspread.Client] = None
+
+
+def _spreadsheet_keys_path() -> str:
+    """State file mapping spreadsheet names to keys."""
+    return state_path("google", "spreadsheets.json")
+
+
+def _discard_persisted_token():
+    """Remove an access token written to the state directory by older versions."""
+    path = os.path.join(config.STATE_DIR, "google", "token.json")
+    try:
+        os.unlink(path)
+        logger.info("Removed persisted Google access token %s", path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not remove persisted Google access token %s: %s", path, e)
+
+
+def get_credentials() -> Credentials:
+    """
+    Build service-account credentials.
+
+    Returns:
+        Credentials (the access token is obtained on first use and kept in memory)
+
+    Raises:
+        json.JSONDecodeError: If GOOGLE_SHEETS_JSON is not valid JSON
+    """
+    _discard_persisted_token()
+    return Credentials.from_service_account_info(
+        json.loads(config.google_sheets_json),
+        scopes=SCOPES
+    )
+
+
+def get_client() -> gspread.Client:
+    """
+    Return the process-wide authorized gspread client.
+
+    Returns:
+        Shared client (created on first use)
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = gspread.authorize(get_credentials())
+        return _client
+
+
+def open_spreadsheet(client: gspread.Client, name: str) -> gspread.Spreadsheet:
+    """
+    Open a spreadsheet by its cached (or configured) key, falling back to
+    a lookup by name and caching the key it finds.
+
+    Args:
+        client: Authorized client
+        name: Spreadsheet title
+
+    Returns:
+        Opened spreadsheet
+
+    Raises:
+        gspread.exceptions.SpreadsheetNotFound: If no spreadsheet has the name
+        PermissionError: If the configured key is not accessible
+    """
+    keys = load_json(_spreadsheet_keys_path(), default={}) or {}
+    key = config.SPREADSHEET_KEY or keys.get(name)
+
+    if key:
+        try:
+            return client.open_by_key(key)
+        except (gspread.exceptions.SpreadsheetNotFound, PermissionError) as e:
+            # A stale key (spreadsheet gone or access revoked) justifies a lookup
+            if config.SPREADSHEET_KEY:
+                raise
+            logger.warning("Cached spreadsheet key for '%s' failed (%s), looking it up by name", name, e)
+
+    spreadsheet = client.open(name)
+    keys[name] = spreadsheet.id
+    save_json(_spreadsheet_keys_path(), keys)
+    return spreadsheet
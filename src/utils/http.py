@@ -0,0 +1,237 @@
+"""
+Shared HTTP transport.
+
+All plain HTTP calls (rating dataset, Telegram Bot API) go through one
+pooled ``requests.Session``, so a process keeps one warm connection pool
+per host. The transport negotiates compression (gzip, plus brotli when a
+decoder is installed), accounts response sizes and times per host, and can
+redirect a host to a local stub server for tests.
+"""
+
+import importlib.util
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import config
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+
+def _accept_encoding() -> str:
+    """Encodings this process can decode, best first."""
+    encodings = ["gzip", "deflate"]
+    # urllib3 decodes brotli only when one of these packages is installed
+    if any(importlib.util.find_spec(name) for name in ("brotli", "brotlicffi")):
+        encodings.insert(0, "br")
+    return ", ".join(encodings)
+
+
+@dataclass
+class HostStats:
+    """Traffic accounting for one host."""
+
+    requests: int = 0
+    errors: int = 0
+    wire_bytes: int = 0  # As received (compressed)
+    body_bytes: int = 0  # After decoding
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict:
+        """Plain dict for logging."""
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'wire_bytes': self.wire_bytes,
+            'body_bytes': self.body_bytes,
+            'seconds': round(self.seconds, 3),
+        }
+
+
+class HttpTransport:
+    """Pooled, compressed, instrumented HTTP client."""
+
+    def __init__(self, pool_size: Optional[int] = None, stubs: Optional[str] = None):
+        """
+        Initialize transport.
+
+        Args:
+            pool_size: Connections kept per host (defaults to config.HTTP_POOL_SIZE,
+                       raised to cover the configured concurrency)
+            stubs: Host overrides as "host=http://127.0.0.1:port,..."
+                   (defaults to config.HTTP_STUBS)
+        """
+        # Outbox senders, bot workers and the getUpdates long poll can all
+        # talk to api.telegram.org at once
+        pool_size = pool_size or max(
+            config.HTTP_POOL_SIZE, config.OUTBOX_CONCURRENCY + config.BOT_WORKERS + 1
+        )
+        # Never block on a busy pool: that wait has no timeout and ignores the
+        # run deadline. Surplus connections are simply not kept afterwards
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, pool_block=False)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = _accept_encoding()
+
+        self.stubs: Dict[str, str] = {}
+        for entry in (config.HTTP_STUBS if stubs is None else stubs).split(","):
+            host, _, base_url = entry.strip().partition("=")
+            if host and base_url:
+                self.override(host, base_url)
+
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+        # Sees every response as (method, url, response); set in record mode
+        self.recorder: Optional[Callable[[str, str, requests.Response], None]] = None
+
+    def override(self, host: str, base_url: Optional[str]):
+        """
+        Send requests for ``host`` to a local stub instead.
+
+        Args:
+            host: Host name to redirect (e.g. "api.telegram.org")
+            base_url: Stub scheme and authority (e.g. "http://127.0.0.1:8081"),
+                      or None to remove the override
+        """
+        if base_url is None:
+            self.stubs.pop(host, None)
+            return
+        self.stubs[host] = base_url.rstrip("/")
+        logger.info("HTTP requests for %s are redirected to %s", host, self.stubs[host])
+
+    def _resolve(self, url: str) -> str:
+        """Apply a stub override to a URL."""
+        parts = urlsplit(url)
+        stub = self.stubs.get(parts.hostname or "")
+        if not stub:
+            return url
+        stub_parts = urlsplit(stub)
+        return urlunsplit((stub_parts.scheme, stub_parts.netloc, parts.path, parts.query, parts.fragment))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            **kwargs: Passed to ``requests.Session.request``
+
+        Returns:
+            Response (status is not checked)
+
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        host = urlsplit(url).hostname or ""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self._resolve(url), **kwargs)
+        except requests.RequestException:
+            self._account(host, time.perf_counter() - start, error=True)
+            raise
+
+        self._account(host, time.perf_counter() - start, response=response)
+        if self.recorder is not None:
+            self.recorder(method, url, response)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the shared session."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST through the shared session."""
+        return self.request("POST", url, **kwargs)
+
+    def _account(
+        self,
+        host: str,
+        seconds: float,
+        response: Optional[requests.Response] = None,
+        error: bool = False
+    ):
+        """Add one request to the per-host totals."""
+        wire = body = 0
+        if response is not None:
+            body = len(response.content)
+            try:
+                wire = response.raw.tell()
+            except (AttributeError, OSError):
+                wire = int(response.headers.get("Content-Length") or body)
+            error = response.status_code >= 400
+
+        with self._lock:
+            stats = self._stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.errors += int(error)
+            stats.wire_bytes += wire
+            stats.body_bytes += body
+            stats.seconds += seconds
+
+        metrics.inc("http_requests")
+        metrics.inc("http_wire_bytes", wire)
+        metrics.observe("http_request", seconds)
+
+        if response is not None:
+            logger.debug(
+                "%s %s -> %s, %s bytes (%s on the wire, %s), %.3fs",
+                response.request.method, host, response.status_code, body, wire,
+                response.headers.get("Content-Encoding", "identity"), seconds
+            )
+
+    def stats(self, since: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        Per-host traffic totals.
+
+        The transport lives as long as the process, so a run (in the daemon
+        or a multi-run replay) reports the difference from a snapshot taken
+        when it started.
+
+        Args:
+            since: Earlier result of ``stats()`` to subtract (None = totals
+                   since the process started)
+
+        Returns:
+            Mapping of host to request count, errors, bytes and seconds
+            (hosts without requests since the snapshot are omitted)
+        """
+        with self._lock:
+            totals = {host: stats.as_dict() for host, stats in self._stats.items()}
+        if since is None:
+            return totals
+
+        delta = {}
+        for host, current in totals.items():
+            before = since.get(host, {})
+            entry = {name: value - before.get(name, 0) for name, value in current.items()}
+            entry['seconds'] = round(entry['seconds'], 3)
+            if entry['requests']:
+                delta[host] = entry
+        return delta
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Return the process-wide transport.
+
+    Returns:
+        Shared HttpTransport (created on first use)
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
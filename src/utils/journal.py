@@ -0,0 +1,129 @@
+"""
+Per-day run journal.
+
+Checkpoints every stage of the daily pipeline (selected problem, generated
+solution, rendered chunks, per-chunk delivery, history record) so a re-run
+resumes from the last completed stage instead of picking a new problem,
+regenerating and re-sending.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from src.config import config
+from src.utils.state import load_json, save_json, state_path
+from src.utils.tenants import delivery_date
+
+
+class RunJournal:
+    """Checkpointed state of one chat's delivery for one day."""
+
+    def __init__(self, day: Optional[str] = None, chat_id: Optional[str] = None):
+        """
+        Load (or start) the journal for a day and chat.
+
+        Args:
+            day: Date string (YYYY-MM-DD), defaults to today in config.TIMEZONE
+            chat_id: Telegram chat ID (defaults to the configured chat)
+        """
+        self.day = day or delivery_date().isoformat()
+        self.chat_id = str(chat_id or config.telegram_chat_id)
+        self.path = state_path("journal", f"{self.day}_{self.chat_id}.json")
+        self.data: Dict = load_json(self.path, default=None) or {
+            'day': self.day,
+            'chat_id': self.chat_id,
+        }
+
+    def _save(self):
+        """Persist the journal."""
+        self.data['updated_at'] = int(time.time())
+        save_json(self.path, self.data)
+
+    @property
+    def problem(self) -> Optional[Dict]:
+        """The problem selected for this day, if any."""
+        return self.data.get('problem')
+
+    @property
+    def is_review(self) -> bool:
+        """Whether the selected problem is a review (already in history)."""
+        return bool(self.data.get('review'))
+
+    @property
+    def solution(self) -> Optional[str]:
+        """The generated solution, if generation completed."""
+        return self.data.get('solution')
+
+    @property
+    def chunks(self) -> Optional[List]:
+        """The rendered message chunks (and document), if rendering completed."""
+        return self.data.get('chunks')
+
+    @property
+    def recorded(self) -> bool:
+        """Whether the problem was added to history."""
+        return bool(self.data.get('recorded'))
+
+    @property
+    def complete(self) -> bool:
+        """Whether every stage of the day's run has completed."""
+        return self.recorded and self.chunks is not None and not self.pending_chunks()
+
+    def record_selection(self, problem: Dict, review: bool = False):
+        """
+        Checkpoint the selected problem.
+
+        Args:
+            problem: Problem record
+            review: Whether it is a spaced-repetition review
+        """
+        self.data['problem'] = problem
+        self.data['review'] = review
+        self._save()
+
+    def record_solution(self, solution: str):
+        """Checkpoint the generated solution."""
+        self.data['solution'] = solution
+        self._save()
+
+    def record_chunks(self, chunks: List):
+        """Checkpoint the rendered chunks, none of them delivered yet."""
+        self.data['chunks'] = chunks
+        self.data['delivered'] = [False] * len(chunks)
+        self._save()
+
+    def mark_chunk_sent(self, index: int):
+        """Checkpoint delivery of one chunk."""
+        self.data['delivered'][index] = True
+        self._save()
+
+    def pending_chunks(self) -> List[int]:
+        """
+        Indexes of chunks not yet delivered.
+
+        Returns:
+            Sorted list of chunk indexes
+        """
+        delivered = self.data.get('delivered') or []
+        return [i for i, sent in enumerate(delivered) if not sent]
+
+    def mark_recorded(self):
+        """Checkpoint the history record."""
+        self.data['recorded'] = True
+        self._save()
+
+    def describe(self) -> str:
+        """Summarize the journal for resume logging."""
+        if not self.problem:
+            return "nothing checkpointed yet"
+
+        parts = [f"problem {self.problem.get('ID')}"]
+        if self.solution is not None:
+            parts.append("solution generated")
+        if self.chunks is not None:
+            sent = len(self.chunks) - len(self.pending_chunks())
+            parts.append(f"{sent}/{len(self.chunks)} chunks delivered")
+        if self.recorded:
+            parts.append("history recorded")
+        return ", ".join(parts)
+
@@ -1,10 +1,51 @@
 """
 Logging configuration and utilities.
+
+Records are handed to a ``QueueHandler`` on the calling thread and written
+by a ``QueueListener`` thread, so console/file I/O stays off the hot path.
+Every record carries the current run ID and pipeline stage, which the
+structured JSON mode emits as separate fields (as it does tracebacks).
+The default logger is configured from config.LOG_* settings.
 """
 
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from typing import Optional
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, ContextManager, Iterator, Optional
+
+from src.config import config
+
+# Per-run correlation context, attached to every record by ContextFilter
+_run_id: contextvars.ContextVar = contextvars.ContextVar("run_id", default="-")
+_stage: contextvars.ContextVar = contextvars.ContextVar("stage", default="-")
+
+# Attributes present on every LogRecord; anything else was passed via extra=
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Optional wrapper entered around every stage (see src.utils.profiling)
+_stage_hook: Optional[Callable[[str], ContextManager]] = None
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current run ID and stage to each record."""
+
+    def filter(self, record):
+        """Copy context variables onto the record (never drops records)."""
+        if not hasattr(record, "run_id"):
+            record.run_id = _run_id.get()
+        if not hasattr(record, "stage"):
+            record.stage = _stage.get()
+        return True
 
 
 class ColoredFormatter(logging.Formatter):
@@ -21,16 +62,116 @@ class ColoredFormatter(logging.Formatter):
     RESET = '\033[0m'
 
     def format(self, record):
-        """Format log record with colors."""
+        """Format log record with colors without mutating the original."""
         log_color = self.COLORS.get(record.levelname, self.RESET)
-        record.levelname = f"{log_color}{record.levelname}{self.RESET}"
-        return super().format(record)
+        colored = copy.copy(record)
+        colored.levelname = f"{log_color}{record.levelname}{self.RESET}"
+        return super().format(colored)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatter emitting one JSON object per line."""
+
+    def format(self, record):
+        """Serialize the record, its context fields and any extras."""
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", "-"),
+            "stage": getattr(record, "stage", "-"),
+            "message": record.getMessage(),
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key not in payload:
+                payload[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message."""
+
+    def prepare(self, record):
+        """
+        Make the record safe to hand to another thread.
+
+        Unlike QueueHandler.prepare, the traceback is formatted into
+        ``exc_text`` instead of being folded into the message, so each
+        formatter decides how to render it (text appends it, JSON emits a
+        separate field).
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def new_run_id() -> str:
+    """
+    Start a new correlation context for a pipeline run.
+
+    Returns:
+        The newly generated run ID
+    """
+    run_id = uuid.uuid4().hex[:12]
+    _run_id.set(run_id)
+    _stage.set("-")
+    return run_id
+
+
+def get_run_id() -> str:
+    """Return the correlation ID of the current run."""
+    return _run_id.get()
+
+
+@contextmanager
+def log_stage(stage: str) -> Iterator[None]:
+    """
+    Tag all records logged inside the block with a pipeline stage.
+
+    Args:
+        stage: Stage name (e.g. "select", "generate", "send")
+    """
+    token = _stage.set(stage)
+    try:
+        if _stage_hook is None:
+            yield
+        else:
+            with _stage_hook(stage):
+                yield
+    finally:
+        _stage.reset(token)
+
+
+def set_stage_hook(hook: Optional[Callable[[str], ContextManager]]):
+    """
+    Install (or remove, with None) a context manager factory entered
+    around every log_stage block.
+
+    Args:
+        hook: Called with the stage name; returns the context manager
+    """
+    global _stage_hook
+    _stage_hook = hook
 
 
 def setup_logger(
     name: str = "LeetCodeTutor",
     level: str = "INFO",
-    log_file: Optional[str] = None
+    log_file: Optional[str] = None,
+    json_format: bool = False,
+    text_format: str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
 ) -> logging.Logger:
     """
     Setup and configure logger.
@@ -39,39 +180,74 @@ def setup_logger(
         name: Logger name
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Optional file path for logging to file
+        json_format: Emit structured JSON lines instead of colored text
+        text_format: Record format of text mode
 
     Returns:
         Configured logger instance
     """
+    global _listener
+
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
+    logger.propagate = False
 
-    # Remove existing handlers
+    # Remove existing handlers and stop a previous listener
     logger.handlers.clear()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
-    # Console handler with colors
+    datefmt = '%Y-%m-%d %H:%M:%S'
+
+    # Console handler (colored text, or JSON lines)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.DEBUG)
-    console_formatter = ColoredFormatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    if json_format:
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(ColoredFormatter(text_format, datefmt=datefmt))
+    handlers = [console_handler]
 
-    # File handler (if specified)
+    # File handler (if specified) never receives ANSI codes
     if log_file:
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        if json_format:
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(text_format, datefmt=datefmt))
+        handlers.append(file_handler)
+
+    # The calling thread only enqueues; the listener thread does the I/O
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
 
     return logger
 
 
+def shutdown_logging():
+    """Flush pending records and stop the background listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
 # Default logger instance
-logger = setup_logger()
+logger = setup_logger(
+    level=config.LOG_LEVEL,
+    log_file=config.LOG_FILE or None,
+    json_format=config.LOG_JSON,
+    text_format=config.LOG_FORMAT,
+)
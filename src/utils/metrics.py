@@ -0,0 +1,151 @@
+"""
+Process metrics and a local health endpoint.
+
+Counters and timings are kept in memory and exposed over HTTP as JSON
+(``/healthz``) and in the Prometheus text format (``/metrics``).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional
+
+from src.utils.logger import logger
+
+
+class Metrics:
+    """Thread-safe counters and timing summaries."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, amount: float = 1):
+        """Increase a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration."""
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {'count': 0, 'sum': 0.0, 'max': 0.0, 'last': 0.0}
+            )
+            timing['count'] += 1
+            timing['sum'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['last'] = seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time a block and record it under ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        """
+        Current values.
+
+        Returns:
+            Dict with uptime, counters and timings
+        """
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'counters': dict(self._counters),
+                'timings': {name: dict(timing) for name, timing in self._timings.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = [f"tutor_uptime_seconds {snapshot['uptime_seconds']}"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"tutor_{name}_total {value}")
+        for name, timing in sorted(snapshot['timings'].items()):
+            lines.append(f"tutor_{name}_seconds_count {timing['count']}")
+            lines.append(f"tutor_{name}_seconds_sum {timing['sum']:.6f}")
+            lines.append(f"tutor_{name}_seconds_max {timing['max']:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics
+metrics = Metrics()
+
+
+class HealthServer:
+    """Tiny HTTP server exposing ``/healthz`` and ``/metrics``."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        status: Optional[Callable[[], Dict]] = None,
+        registry: Metrics = metrics
+    ):
+        """
+        Initialize health server.
+
+        Args:
+            host: Interface to bind (keep it local)
+            port: Port to bind
+            status: Returns extra fields for ``/healthz``
+            registry: Metrics to expose
+        """
+        self.status = status or dict
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        """Bound (host, port)."""
+        return self._server.server_address
+
+    def _handler(self):
+        """Build the request handler class bound to this server."""
+        health = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/healthz":
+                    body = json.dumps(
+                        {'status': 'ok', **health.status(), **health.registry.snapshot()},
+                        default=str
+                    ).encode()
+                    content_type = "application/json"
+                elif self.path == "/metrics":
+                    body = health.registry.render_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Health endpoint: " + format, *args)
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread.start()
+        logger.info("Health endpoint listening on http://%s:%s", *self.address[:2])
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
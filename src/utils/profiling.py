@@ -0,0 +1,236 @@
+"""
+Per-stage CPU and allocation profiling.
+
+When enabled, every ``log_stage`` block (fetch, parse, filter, select,
+generate, render, split, send, record) runs under its own cProfile
+profiler and between two tracemalloc snapshots. Nested stages are
+attributed exclusively: the enclosing stage's profiler is paused while an
+inner stage runs. Repeated stages (a digest, a daemon) are merged, and on
+stop every stage is written as ``<stage>.pstats`` (open it with
+``python -m pstats`` or snakeviz) plus ``<stage>.alloc.txt`` listing the
+source lines that allocated the most memory.
+
+cProfile only sees the thread that entered the stage; tracemalloc
+snapshots cover the whole process, so allocations of concurrent threads
+show up in whichever stages overlap them. Snapshots and their diffs are
+slow on a large heap; that bookkeeping is excluded from the stage times
+(including those of enclosing stages). When profiling is off the only
+cost is one ``None`` check per stage.
+"""
+
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.config import config
+from src.utils.logger import logger, set_stage_hook
+from src.utils.state import state_path
+
+# Frames of the profiler itself are left out of allocation reports
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class StageProfile:
+    """Merged measurements of every run of one stage."""
+
+    name: str
+    runs: int = 0
+    seconds: float = 0.0
+    profiles: List[cProfile.Profile] = field(default_factory=list)
+    # "file:line" -> [net bytes, net blocks] allocated by that line
+    allocations: Dict[str, List[int]] = field(default_factory=dict)
+
+    @property
+    def net_bytes(self) -> int:
+        """Net bytes allocated (and not freed) while the stage ran."""
+        return sum(size for size, _ in self.allocations.values())
+
+    def top_allocations(self, limit: int) -> List[Tuple[str, int, int]]:
+        """Lines with the largest net allocation as (line, bytes, blocks)."""
+        ranked = sorted(self.allocations.items(), key=lambda item: item[1][0], reverse=True)
+        return [(line, size, count) for line, (size, count) in ranked[:limit] if size > 0]
+
+
+class StageProfiler:
+    """Profile every pipeline stage until stopped."""
+
+    def __init__(self, output_dir: Optional[str] = None, top: Optional[int] = None):
+        """
+        Prepare a profiler.
+
+        Args:
+            output_dir: Directory for the reports (defaults to a timestamped
+                        directory under STATE_DIR/profile)
+            top: Entries per allocation report (defaults to config.PROFILE_TOP_ENTRIES)
+        """
+        self.output_dir = output_dir or state_path("profile", datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.top = top or config.PROFILE_TOP_ENTRIES
+        self.stages: Dict[str, StageProfile] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing allocations and hook into log_stage."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        set_stage_hook(self.stage)
+        logger.info("🔬 Profiling every stage into %s", self.output_dir)
+
+    def stop(self) -> Dict[str, StageProfile]:
+        """
+        Unhook, write the reports and log a summary.
+
+        Returns:
+            Measurements per stage
+        """
+        set_stage_hook(None)
+        self.write()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return self.stages
+
+    def _stack(self) -> List[Optional[cProfile.Profile]]:
+        """This thread's stack of active stage profilers."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.overhead = 0.0  # Seconds of bookkeeping on this thread
+        return stack
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile one run of a stage.
+
+        Args:
+            name: Stage name
+        """
+        stack = self._stack()
+        outer = stack[-1] if stack else None
+        if outer is not None:
+            outer.disable()
+
+        bookkeeping = time.perf_counter()
+        before = tracemalloc.take_snapshot()
+        profile: Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler owns the interpreter (another thread, Python 3.12+)
+            profile = None
+        stack.append(profile)
+        start = time.perf_counter()
+        nested_overhead = self._local.overhead
+
+        try:
+            yield
+        finally:
+            stop = time.perf_counter()
+            if profile is not None:
+                profile.disable()
+            stack.pop()
+            # Bookkeeping of nested stages is not this stage's work
+            elapsed = stop - start - (self._local.overhead - nested_overhead)
+            after = tracemalloc.take_snapshot()
+            self._record(name, elapsed, profile, before, after)
+            self._local.overhead += time.perf_counter() - stop + (start - bookkeeping)
+            if outer is not None:
+                outer.enable()
+
+    def _record(
+        self,
+        name: str,
+        elapsed: float,
+        profile: Optional[cProfile.Profile],
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot
+    ):
+        """Merge one stage run into its totals."""
+        diff = after.filter_traces(_SNAPSHOT_FILTERS).compare_to(
+            before.filter_traces(_SNAPSHOT_FILTERS), 'lineno'
+        )
+        with self._lock:
+            totals = self.stages.setdefault(name, StageProfile(name))
+            totals.runs += 1
+            totals.seconds += elapsed
+            if profile is not None:
+                totals.profiles.append(profile)
+            for stat in diff:
+                if stat.size_diff or stat.count_diff:
+                    frame = stat.traceback[0]
+                    entry = totals.allocations.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+                    entry[0] += stat.size_diff
+                    entry[1] += stat.count_diff
+
+    def write(self):
+        """Write the .pstats and allocation report of every stage."""
+        if not self.stages:
+            logger.info("🔬 Profiling: no stage ran")
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info("🔬 Profile by stage (reports in %s)", self.output_dir)
+
+        for name, totals in sorted(self.stages.items(), key=lambda item: item[1].seconds, reverse=True):
+            hottest = "-"
+            if totals.profiles:
+                stats = pstats.Stats(*totals.profiles)
+                stats.dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+                hottest = _hottest_function(stats)
+
+            top = totals.top_allocations(self.top)
+            with open(os.path.join(self.output_dir, f"{name}.alloc.txt"), 'w', encoding='utf-8') as f:
+                f.write(
+                    f"Stage {name}: {totals.runs} run(s), {totals.seconds:.3f}s, "
+                    f"net {totals.net_bytes / 1024:+.1f} KiB\n\n"
+                )
+                for line, size, count in top:
+                    f.write(f"{size / 1024:>+12.1f} KiB {count:>+9} blocks  {line}\n")
+
+            logger.info(
+                "   %-9s %3s run(s) %8.3fs  net %+9.1f KiB  hottest %s",
+                name, totals.runs, totals.seconds, totals.net_bytes / 1024, hottest
+            )
+
+
+def _hottest_function(stats: pstats.Stats) -> str:
+    """The function with the most own time, as "file:line(name) seconds"."""
+    entries = stats.stats  # (file, line, name) -> (calls, primitive, tottime, cumtime, callers)
+    if not entries:
+        return "-"
+    (filename, lineno, function), (_, _, tottime, _, _) = max(
+        entries.items(), key=lambda item: item[1][2]
+    )
+    return f"{os.path.basename(filename)}:{lineno}({function}) {tottime:.3f}s"
+
+
+def start_profiler(output_dir: Optional[str] = None) -> StageProfiler:
+    """
+    Create and start a stage profiler.
+
+    Args:
+        output_dir: Report directory (default: STATE_DIR/profile/<timestamp>)
+
+    Returns:
+        The running profiler (call stop() to write the reports)
+    """
+    profiler = StageProfiler(output_dir)
+    profiler.start()
+    return profiler
@@ -0,0 +1,255 @@
+"""
+Rate limiting.
+
+Token buckets (per process or per key) and an AIMD concurrency limiter that
+adapts the number of in-flight requests to a quota it can only observe
+through throttling errors.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens (burst size)
+            clock: Monotonic clock, injectable for tests
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens accrued since the last update."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """
+        Take tokens if available.
+
+        Returns:
+            True if the tokens were taken
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def debit(self, tokens: float):
+        """
+        Take tokens unconditionally; the balance may go negative (and a
+        negative amount refunds tokens).
+
+        Args:
+            tokens: Tokens to take
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """
+        Seconds until ``tokens`` will be available.
+
+        Returns:
+            0 if they are available now
+        """
+        with self._lock:
+            self._refill()
+            missing = min(tokens, self.capacity) - self._tokens
+        return max(missing, 0) / self.rate if self.rate else math.inf
+
+
+class KeyedRateLimiter:
+    """One token bucket per key (e.g. per chat)."""
+
+    def __init__(self, per_minute: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize limiter.
+
+        Args:
+            per_minute: Sustained requests per minute per key
+            burst: Requests allowed back to back
+            clock: Monotonic clock, injectable for tests
+        """
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        """Whether a request for ``key`` may proceed now."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, self._clock)
+        return bucket.try_acquire()
+
+
+@dataclass
+class Permit:
+    """One admitted request of an AimdLimiter."""
+
+    tokens: float  # Tokens reserved in the per-minute bucket
+    epoch: int  # Limit decreases seen before the request started
+
+
+class AimdLimiter:
+    """
+    Adaptive concurrency limit with additive increase, multiplicative decrease.
+
+    Every successful request made while the limit was fully used raises it
+    by ``increase / limit`` (about ``increase`` per round of requests); a
+    throttled request cuts it by
+    ``decrease``. Only one cut is made per congestion event: throttles of
+    requests started before the last cut are ignored. An optional
+    tokens-per-minute bucket also holds requests back; it is charged with
+    an estimate on admission (by default the running average of observed
+    request sizes) and corrected with the observed size.
+    """
+
+    # Weight of the newest observation in the average request size
+    ESTIMATE_SMOOTHING = 0.2
+
+    def __init__(
+        self,
+        initial: float = 2,
+        minimum: float = 1,
+        maximum: float = 8,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        tokens_per_minute: float = 0,
+        initial_estimate: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Initialize limiter.
+
+        Args:
+            initial: Starting concurrency limit
+            minimum: Lowest limit (at least one request is always allowed)
+            maximum: Highest limit
+            increase: Additive increase per round of successful requests
+            decrease: Factor applied to the limit on throttling
+            tokens_per_minute: Token quota per minute (0 disables the bucket)
+            initial_estimate: Tokens assumed per request until sizes are observed
+            clock: Monotonic clock, injectable for tests
+            sleep: Sleep function, injectable for tests
+        """
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute, clock)
+            if tokens_per_minute > 0 else None
+        )
+        self.estimate = initial_estimate
+        self._sleep = sleep
+        self._clock = clock
+        self.in_flight = 0
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self, tokens: Optional[float] = None) -> Optional[Permit]:
+        """
+        Admit a request if a slot and its estimated tokens are available.
+
+        Args:
+            tokens: Estimated tokens of the request (None = observed average)
+
+        Returns:
+            Permit to pass to ``release``, or None if the request must wait
+        """
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return None
+            if tokens is None:
+                tokens = self.estimate
+            if self.tokens is not None:
+                tokens = min(tokens, self.tokens.capacity)
+                if not self.tokens.try_acquire(tokens):
+                    return None
+            self.in_flight += 1
+            return Permit(tokens=tokens if self.tokens is not None else 0, epoch=self._epoch)
+
+    def acquire(self, tokens: Optional[float] = None, timeout: Optional[float] = None) -> Optional[Permit]:
+        """
+        Wait for a slot and the estimated tokens.
+
+        Args:
+            tokens: Estimated tokens of the request (None = observed average)
+            timeout: Seconds to wait at most (None = no limit)
+
+        Returns:
+            Permit, or None if the timeout passed first
+        """
+        give_up = self._clock() + timeout if timeout is not None else math.inf
+        while True:
+            permit = self.try_acquire(tokens)
+            if permit is not None:
+                return permit
+
+            left = give_up - self._clock()
+            if left <= 0:
+                return None
+
+            with self._cond:
+                if self.in_flight >= int(self.limit):
+                    # Woken by release; the bound keeps a fake clock from stalling
+                    self._cond.wait(min(left, 1.0))
+                    continue
+                needed = self.estimate if tokens is None else tokens
+            wait = self.tokens.wait_time(needed) if self.tokens is not None else 0
+            self._sleep(min(max(wait, 0.01), left))
+
+    def release(self, permit: Permit, throttled: bool = False, used_tokens: Optional[float] = None):
+        """
+        Finish a request and adapt the limit.
+
+        Args:
+            permit: Permit returned by acquire
+            throttled: Whether the request was rejected for quota (HTTP 429)
+            used_tokens: Tokens the request actually used, if known
+        """
+        with self._cond:
+            if used_tokens is not None:
+                if self.tokens is not None:
+                    self.tokens.debit(used_tokens - permit.tokens)
+                if used_tokens > 0:
+                    self.estimate += self.ESTIMATE_SMOOTHING * (used_tokens - self.estimate)
+
+            self.in_flight -= 1
+            if throttled:
+                if permit.epoch == self._epoch:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._epoch += 1
+            elif self.in_flight + 1 >= int(self.limit):
+                # Grow only while the limit is what holds requests back
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
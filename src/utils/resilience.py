@@ -0,0 +1,370 @@
+"""
+Shared retry and circuit breaker policy for external services.
+
+Every outbound call goes through ``ResilientCaller.call``, which retries
+transient failures with jittered exponential backoff and tracks failures
+in a per-service circuit breaker (one per dependency and process).
+Breaker state is persisted under the state directory, so a dependency that
+was down in the previous run is probed with a single attempt instead of
+burning its full timeout again. Rate/quota rejections are left to the
+callers' throttling and never open a circuit.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from src.config import config
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.logger import logger
+from src.utils.state import load_json, save_json, state_path
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+def reset_timeout_for(name: str) -> float:
+    """
+    Open-circuit timeout of one dependency.
+
+    Args:
+        name: Dependency name
+
+    Returns:
+        Seconds from config.CIRCUIT_RESET_TIMEOUTS, else config.CIRCUIT_RESET_TIMEOUT
+    """
+    for entry in config.CIRCUIT_RESET_TIMEOUTS.split(","):
+        key, _, value = entry.partition("=")
+        if key.strip() == name:
+            try:
+                return float(value)
+            except ValueError:
+                logger.warning("Invalid circuit reset timeout %r for %s", value, name)
+    return float(config.CIRCUIT_RESET_TIMEOUT)
+
+
+@dataclass
+class RetryPolicy:
+    """Retry settings for one kind of call."""
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 10.0
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        """Build the default policy from configuration."""
+        return cls(
+            max_attempts=config.RETRY_MAX_ATTEMPTS,
+            base_delay=config.RETRY_BASE_DELAY,
+            max_delay=config.RETRY_MAX_DELAY,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before the next attempt ("full jitter" exponential backoff).
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+
+        Returns:
+            Seconds to sleep
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with state persisted between runs."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # All breakers share one state file
+    _file_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            name: Dependency name (state file key)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds an open circuit waits before a probe
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or reset_timeout_for(name)
+        self._lock = threading.Lock()
+        # A half-open probe is in flight; other calls are rejected meanwhile
+        self._probe_in_flight = False
+
+        saved = self._load_all().get(name, {})
+        self.state = saved.get('state', self.CLOSED)
+        self.failures = int(saved.get('failures', 0))
+        self.opened_at = float(saved.get('opened_at', 0.0))
+
+    @staticmethod
+    def _path() -> str:
+        """Return the shared breaker state file."""
+        return state_path("circuits.json")
+
+    @classmethod
+    def _load_all(cls) -> dict:
+        """Load the state of every breaker."""
+        return load_json(cls._path(), default={}) or {}
+
+    def _save(self):
+        """Persist this breaker's state."""
+        with self._file_lock:
+            states = self._load_all()
+            states[self.name] = {
+                'state': self.state,
+                'failures': self.failures,
+                'opened_at': self.opened_at,
+            }
+            save_json(self._path(), states)
+
+    def allow(self) -> Tuple[bool, bool]:
+        """
+        Check whether a call may go through, moving an expired open
+        circuit to half-open. A half-open circuit admits a single probe at
+        a time; its outcome must be recorded (or the probe abandoned).
+
+        Returns:
+            Tuple of (call may proceed, call is the half-open probe)
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.reset_timeout:
+                    return False, False
+                self.state = self.HALF_OPEN
+                logger.info("Circuit '%s' half-open, probing dependency", self.name)
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    return False, False
+                self._probe_in_flight = True
+                return True, True
+            return True, False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are rejected right now (open and not yet due for a probe)."""
+        return self.state == self.OPEN and time.time() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        """Close the circuit after a call the dependency answered."""
+        with self._lock:
+            changed = self.state != self.CLOSED or self.failures
+            if self.state != self.CLOSED:
+                logger.info("Circuit '%s' closed", self.name)
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+        if changed:
+            self._save()
+
+    def abandon_probe(self):
+        """Let another call probe after a probe that never reached the dependency."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        "Circuit '%s' opened after %s consecutive failures",
+                        self.name, self.failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.time()
+        self._save()
+
+
+# One breaker per (state file, dependency), shared by every caller in the process
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    The process-wide circuit breaker of a dependency.
+
+    Args:
+        name: Dependency name
+
+    Returns:
+        Breaker shared by every ResilientCaller of that dependency
+    """
+    key = (CircuitBreaker._path(), name)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(name)
+        return breaker
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """Extract an HTTP status code from a library exception, if any."""
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(exc, 'code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Default classification of retryable failures: connection problems,
+    timeouts, HTTP 429 and 5xx responses.
+
+    Args:
+        exc: Exception raised by the call
+
+    Returns:
+        True if retrying may succeed
+    """
+    if isinstance(exc, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return True
+
+    status = _status_code(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """
+    Whether a call was rejected for rate or quota limits (HTTP 429 /
+    RESOURCE_EXHAUSTED).
+
+    Args:
+        exc: Exception raised by the call
+
+    Returns:
+        True if the dependency asked the caller to slow down
+    """
+    return _status_code(exc) == 429 or "RESOURCE_EXHAUSTED" in str(exc)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Return a server-requested delay (Retry-After / retry_after), if any."""
+    response = getattr(exc, 'response', None)
+    if response is None:
+        return None
+
+    header = getattr(response, 'headers', {}).get('Retry-After')
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+
+    try:
+        return float(response.json()['parameters']['retry_after'])
+    except Exception:
+        return None
+
+
+class ResilientCaller:
+    """Applies a retry policy and circuit breaker to calls of one dependency."""
+
+    def __init__(
+        self,
+        name: str,
+        deadline: Optional[Deadline] = None,
+        policy: Optional[RetryPolicy] = None,
+        is_retryable: Callable[[BaseException], bool] = is_transient_error
+    ):
+        """
+        Initialize caller.
+
+        Args:
+            name: Dependency name, used for the circuit breaker and logs
+            deadline: Run deadline; no retry sleeps past it
+            policy: Retry policy (defaults to RetryPolicy.from_config())
+            is_retryable: Classifies exceptions as transient
+        """
+        self.name = name
+        self.deadline = deadline or Deadline()
+        self.policy = policy or RetryPolicy.from_config()
+        self.is_retryable = is_retryable
+        self.breaker = get_breaker(name)
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call ``func`` with retries and circuit breaking.
+
+        Returns:
+            Whatever ``func`` returns
+
+        Raises:
+            CircuitOpenError: If the dependency's circuit is open (or
+                              another call is probing it)
+            Exception: The last error once retries are exhausted, or any
+                       non-transient error immediately
+        """
+        allowed, probe = self.breaker.allow()
+        if not allowed:
+            raise CircuitOpenError(
+                f"{self.name} circuit is open; skipping call until it resets"
+            )
+
+        # A half-open probe gets a single attempt
+        max_attempts = 1 if probe else self.policy.max_attempts
+        resolved = False
+
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if not self.is_retryable(e):
+                        # The dependency answered (the request itself was bad);
+                        # a deadline hit before the call tells nothing
+                        if probe and not isinstance(e, DeadlineExceeded):
+                            self.breaker.record_success()
+                            resolved = True
+                        raise
+
+                    delay = max(self.policy.backoff(attempt), _retry_after(e) or 0.0)
+                    if attempt >= max_attempts or self.deadline.remaining() <= delay:
+                        # Throttling means the dependency is up; callers back off instead
+                        if not is_quota_error(e):
+                            self.breaker.record_failure()
+                            resolved = True
+                        elif probe:
+                            self.breaker.record_success()
+                            resolved = True
+                        raise
+
+                    logger.warning(
+                        "%s call failed (attempt %s/%s): %s; retrying in %.1fs",
+                        self.name, attempt, max_attempts, e, delay
+                    )
+                    time.sleep(delay)
+                    continue
+
+                self.breaker.record_success()
+                resolved = True
+                return result
+        finally:
+            if probe and not resolved:
+                self.breaker.abandon_probe()
@@ -0,0 +1,145 @@
+"""
+In-process job scheduler.
+
+Jobs are kept in a heap ordered by due time and run one at a time on the
+scheduler thread, so a background refresh never races a delivery that
+uses the same services.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from src.utils.logger import logger
+
+
+@dataclass(order=True)
+class ScheduledJob:
+    """A job waiting in the heap."""
+
+    due: float
+    seq: int
+    name: str = field(compare=False)
+    func: Callable[[], None] = field(compare=False)
+    # Given the finish time, returns the next due time (None = run once)
+    reschedule: Optional[Callable[[float], Optional[float]]] = field(compare=False, default=None)
+
+
+class Scheduler:
+    """Heap-based timer running jobs at wall-clock times."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        """
+        Initialize scheduler.
+
+        Args:
+            clock: Wall clock in epoch seconds, injectable for tests
+        """
+        self._clock = clock
+        self._heap: List[ScheduledJob] = []
+        self._seq = itertools.count()
+        self._wakeup = threading.Condition()
+        self._stopped = False
+
+    def schedule(
+        self,
+        name: str,
+        func: Callable[[], None],
+        due: float,
+        reschedule: Optional[Callable[[float], Optional[float]]] = None
+    ):
+        """
+        Add a job.
+
+        Args:
+            name: Job name for logs and health output
+            func: Job body; exceptions are logged and do not stop the scheduler
+            due: Epoch seconds of the first run
+            reschedule: Computes the next due time from the finish time
+        """
+        with self._wakeup:
+            heapq.heappush(self._heap, ScheduledJob(due, next(self._seq), name, func, reschedule))
+            self._wakeup.notify()
+
+    def every(self, name: str, func: Callable[[], None], interval: float, delay: Optional[float] = None):
+        """
+        Run a job repeatedly.
+
+        Args:
+            name: Job name
+            func: Job body
+            interval: Seconds between the end of one run and the next
+            delay: Seconds before the first run (defaults to ``interval``)
+        """
+        first = self._clock() + (interval if delay is None else delay)
+        self.schedule(name, func, first, lambda finished: finished + interval)
+
+    def move(self, name: str, due: float) -> bool:
+        """
+        Change the due time of a pending job.
+
+        Args:
+            name: Job name
+            due: New due time (epoch seconds)
+
+        Returns:
+            True if the job was pending
+        """
+        with self._wakeup:
+            for job in self._heap:
+                if job.name == name:
+                    job.due = due
+                    heapq.heapify(self._heap)
+                    self._wakeup.notify()
+                    return True
+            return False
+
+    def pending(self) -> List[Tuple[str, float]]:
+        """
+        Scheduled jobs.
+
+        Returns:
+            (name, due epoch seconds) pairs in due order
+        """
+        with self._wakeup:
+            return [(job.name, job.due) for job in sorted(self._heap)]
+
+    def stop(self):
+        """Make ``run_forever`` return after the current job."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+
+    def _next_due_job(self) -> Optional[ScheduledJob]:
+        """Block until a job is due (or the scheduler stops) and pop it."""
+        with self._wakeup:
+            while not self._stopped:
+                if not self._heap:
+                    self._wakeup.wait()
+                    continue
+
+                wait = self._heap[0].due - self._clock()
+                if wait <= 0:
+                    return heapq.heappop(self._heap)
+                self._wakeup.wait(wait)
+            return None
+
+    def run_forever(self):
+        """Run due jobs until ``stop`` is called."""
+        while True:
+            job = self._next_due_job()
+            if job is None:
+                return
+
+            try:
+                job.func()
+            except Exception as e:
+                logger.error("Scheduled job '%s' failed: %s", job.name, e, exc_info=True)
+
+            if job.reschedule:
+                next_due = job.reschedule(self._clock())
+                if next_due is not None:
+                    self.schedule(job.name, job.func, next_due, job.reschedule)
@@ -0,0 +1,96 @@
+"""
+Local state persistence helpers.
+
+Small JSON documents (usage totals, caches, checkpoints) live under
+``config.STATE_DIR`` so they survive between runs. Writes go through a
+temporary file and ``os.replace`` so a crash never leaves a torn file;
+read-modify-write updates shared with other processes (the daemon, a cron
+run, a backfill) hold ``file_lock`` around the whole update.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from src.config import config
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: updates are then only serialized within a process
+    fcntl = None
+
+
+def state_path(*parts: str) -> str:
+    """
+    Build a path inside the state directory, creating parent directories.
+
+    Args:
+        *parts: Path components relative to config.STATE_DIR
+
+    Returns:
+        Absolute path of the state file
+    """
+    path = os.path.abspath(os.path.join(config.STATE_DIR, *parts))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """
+    Load a JSON document, falling back to a default if missing or corrupt.
+
+    Args:
+        path: File path
+        default: Value returned when the file cannot be read
+
+    Returns:
+        Parsed JSON value or the default
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path: str, data: Any):
+    """
+    Atomically write a JSON document.
+
+    Args:
+        path: File path
+        data: JSON-serializable value
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive lock shared by every process using the state directory.
+
+    Args:
+        path: State file being updated (the lock is ``<path>.lock``)
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(f"{path}.lock", "a") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
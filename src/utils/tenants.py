@@ -0,0 +1,110 @@
+"""
+Delivery tenants.
+
+A tenant is one Telegram chat with its own daily delivery time and solution
+languages. By default the configured chat is the only tenant; more can be
+listed in TENANTS.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.config import config
+from src.utils.logger import logger
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """One chat receiving a daily problem."""
+
+    chat_id: str
+    delivery_time: time
+    languages: Tuple[str, ...] = ()  # Empty = config.SOLUTION_LANGUAGES
+
+    @property
+    def solution_languages(self) -> Optional[Tuple[str, ...]]:
+        """Languages to generate (None = the configured default)."""
+        return self.languages or None
+
+    def next_delivery(self, now: datetime) -> datetime:
+        """
+        Next delivery strictly after ``now``.
+
+        Args:
+            now: Current time (time zone aware)
+
+        Returns:
+            Time zone aware datetime of the next delivery
+        """
+        candidate = datetime.combine(now.date(), self.delivery_time, tzinfo=now.tzinfo)
+        if candidate <= now:
+            candidate = datetime.combine(
+                now.date() + timedelta(days=1), self.delivery_time, tzinfo=now.tzinfo
+            )
+        return candidate
+
+    def due_today(self, now: datetime) -> bool:
+        """Whether today's delivery time has already passed."""
+        return now.time() >= self.delivery_time
+
+
+def parse_time(value: str) -> time:
+    """
+    Parse a HH:MM delivery time.
+
+    Raises:
+        ValueError: If the value is not a valid time
+    """
+    return datetime.strptime(value.strip(), "%H:%M").time()
+
+
+def delivery_timezone() -> ZoneInfo:
+    """Time zone that delivery times are expressed in."""
+    return ZoneInfo(config.TIMEZONE)
+
+
+def delivery_date() -> date:
+    """
+    Today's date in the delivery time zone.
+
+    Journals, digests and reviews are keyed by this date, so they agree with
+    the daemon's schedule whatever the host's local time zone is.
+    """
+    return datetime.now(delivery_timezone()).date()
+
+
+def load_tenants(default_time: Optional[str] = None) -> List[Tenant]:
+    """
+    Load tenants from config.TENANTS (``chat_id@HH:MM/cpp+python`` entries,
+    comma separated; the time defaults to ``default_time`` and the
+    languages to config.SOLUTION_LANGUAGES).
+
+    Args:
+        default_time: HH:MM delivery time of tenants without one
+                      (defaults to config.DELIVERY_TIME)
+
+    Returns:
+        Tenants, or just the configured chat if none are listed
+    """
+    default_time = parse_time(default_time or config.DELIVERY_TIME)
+
+    tenants = []
+    for entry in config.TENANTS.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        entry, _, languages = entry.partition("/")
+        chat_id, _, at = entry.partition("@")
+        try:
+            tenants.append(Tenant(
+                chat_id.strip(),
+                parse_time(at) if at else default_time,
+                tuple(language.strip().lower() for language in languages.split("+") if language.strip())
+            ))
+        except ValueError:
+            logger.warning("Invalid tenant entry %r, skipping", entry)
+
+    return tenants or [Tenant(str(config.telegram_chat_id), default_time)]
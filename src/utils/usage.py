@@ -0,0 +1,178 @@
+"""
+Gemini token accounting.
+
+Tracks prompt/candidate/total tokens per call, persists daily totals under
+the state directory and answers budget questions for the degradation ladder
+in GeminiService. Daily totals are shared by every process using the state
+directory, so each update holds a file lock across its read and write.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.config import config
+from src.utils.logger import logger
+from src.utils.state import file_lock, load_json, save_json, state_path
+
+
+def _empty_totals() -> Dict[str, float]:
+    """Return a zeroed totals record."""
+    return {
+        'calls': 0,
+        'prompt_tokens': 0,
+        'candidates_tokens': 0,
+        'total_tokens': 0,
+    }
+
+
+class TokenUsageTracker:
+    """Accumulates Gemini token usage per run and per UTC day."""
+
+    def __init__(self):
+        """Initialize tracker with empty run totals."""
+        self._lock = threading.Lock()
+        self.run_totals = _empty_totals()
+
+    def start_run(self):
+        """Zero the run totals (a long-lived service serves many runs)."""
+        with self._lock:
+            self.run_totals = _empty_totals()
+
+    @staticmethod
+    def _today() -> str:
+        """Return the current UTC date used as the budget day."""
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _daily_path(self, day: Optional[str] = None) -> str:
+        """Return the state file holding totals for a day."""
+        return state_path("usage", f"{day or self._today()}.json")
+
+    def daily_totals(self, day: Optional[str] = None) -> Dict[str, float]:
+        """
+        Load persisted totals for a day.
+
+        Args:
+            day: Date string (YYYY-MM-DD), defaults to today (UTC)
+
+        Returns:
+            Totals dictionary (calls, prompt/candidates/total tokens)
+        """
+        totals = _empty_totals()
+        totals.update(load_json(self._daily_path(day), default={}) or {})
+        return totals
+
+    def record(self, usage_metadata, kind: str = "generate") -> Dict[str, int]:
+        """
+        Record the usage reported by one generate_content response.
+
+        Args:
+            usage_metadata: ``response.usage_metadata`` (may be None)
+            kind: Call label for logging (code, explanation, ...)
+
+        Returns:
+            Token counts captured for this call
+        """
+        prompt = int(getattr(usage_metadata, 'prompt_token_count', 0) or 0)
+        candidates = int(getattr(usage_metadata, 'candidates_token_count', 0) or 0)
+        total = int(getattr(usage_metadata, 'total_token_count', 0) or 0)
+        # total includes thinking tokens; never report less than prompt + output
+        total = max(total, prompt + candidates)
+
+        call = {
+            'prompt_tokens': prompt,
+            'candidates_tokens': candidates,
+            'total_tokens': total,
+        }
+
+        with self._lock:
+            self.run_totals['calls'] += 1
+            for key, value in call.items():
+                self.run_totals[key] += value
+
+            day = self._today()
+            path = self._daily_path(day)
+            # Another process (daemon, cron run, backfill) may update the same day
+            with file_lock(path):
+                daily = self.daily_totals(day)
+                daily['calls'] += 1
+                for key, value in call.items():
+                    daily[key] += value
+                save_json(path, daily)
+
+        logger.info(
+            "Gemini %s call used %s tokens (prompt %s, output %s)",
+            kind, total, prompt, candidates
+        )
+        return call
+
+    @staticmethod
+    def estimate_cost(totals: Dict[str, float]) -> float:
+        """
+        Estimate USD cost of a totals record.
+
+        Output pricing is applied to everything beyond the prompt, which
+        includes thinking tokens.
+
+        Args:
+            totals: Totals dictionary
+
+        Returns:
+            Estimated cost in USD
+        """
+        prompt = totals.get('prompt_tokens', 0)
+        output = max(totals.get('total_tokens', 0) - prompt, 0)
+        return (
+            prompt * config.GEMINI_INPUT_PRICE_PER_MTOK
+            + output * config.GEMINI_OUTPUT_PRICE_PER_MTOK
+        ) / 1_000_000
+
+    def remaining_tokens(self) -> Optional[int]:
+        """
+        Tokens left in today's budget.
+
+        Returns:
+            Remaining tokens, or None if no token budget is configured
+        """
+        if config.GEMINI_DAILY_TOKEN_BUDGET <= 0:
+            return None
+        used = self.daily_totals()['total_tokens']
+        return max(int(config.GEMINI_DAILY_TOKEN_BUDGET - used), 0)
+
+    def can_afford(self, estimated_tokens: int) -> bool:
+        """
+        Check whether a call of the given size fits in today's budgets.
+
+        Args:
+            estimated_tokens: Expected total tokens of the call(s)
+
+        Returns:
+            True if neither the token nor the cost budget would be exceeded
+        """
+        daily = self.daily_totals()
+
+        if config.GEMINI_DAILY_TOKEN_BUDGET > 0:
+            if daily['total_tokens'] + estimated_tokens > config.GEMINI_DAILY_TOKEN_BUDGET:
+                return False
+
+        if config.GEMINI_DAILY_COST_BUDGET > 0:
+            # Price the estimate pessimistically as output tokens
+            estimated_cost = estimated_tokens * config.GEMINI_OUTPUT_PRICE_PER_MTOK / 1_000_000
+            if self.estimate_cost(daily) + estimated_cost > config.GEMINI_DAILY_COST_BUDGET:
+                return False
+
+        return True
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Build the usage section of the run report.
+
+        Returns:
+            Run and day totals, each with an estimated cost
+        """
+        with self._lock:
+            run = dict(self.run_totals)
+        day = self.daily_totals()
+        run['cost_usd'] = round(self.estimate_cost(run), 6)
+        day['cost_usd'] = round(self.estimate_cost(day), 6)
+        return {'run': run, 'day': day}
@@ -0,0 +1,207 @@
+"""
+AimdLimiter against a simulated quota server.
+
+The fake server accepts up to ``quota`` concurrent requests and answers
+the rest with 429, the way the Gemini API reports RESOURCE_EXHAUSTED.
+"""
+
+import threading
+import time
+
+from src.utils.rate_limit import AimdLimiter
+
+
+class FakeQuotaServer:
+    """Accepts at most ``quota`` concurrent requests, throttles the rest."""
+
+    def __init__(self, quota: int):
+        self.quota = quota
+        self.active = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def begin(self) -> bool:
+        """Start a request; False means HTTP 429."""
+        with self._lock:
+            if self.active >= self.quota:
+                self.throttled += 1
+                return False
+            self.active += 1
+            return True
+
+    def end(self):
+        """Finish an accepted request."""
+        with self._lock:
+            self.active -= 1
+
+
+def run_round(limiter: AimdLimiter, server: FakeQuotaServer):
+    """
+    Send as many requests as the limiter admits, all at once, and finish them.
+
+    Returns:
+        Tuple of (requests sent, requests throttled, limit after the throttled
+        ones were released)
+    """
+    permits = []
+    while True:
+        permit = limiter.try_acquire()
+        if permit is None:
+            break
+        permits.append((permit, server.begin()))
+
+    throttled = [permit for permit, accepted in permits if not accepted]
+    for permit in throttled:
+        limiter.release(permit, throttled=True)
+    limit_after_cut = limiter.limit
+
+    for permit, accepted in permits:
+        if accepted:
+            server.end()
+            limiter.release(permit)
+    return len(permits), len(throttled), limit_after_cut
+
+
+def test_cuts_once_per_epoch_and_grows_back():
+    limiter = AimdLimiter(initial=2, maximum=16)
+    server = FakeQuotaServer(quota=5)
+
+    cuts = 0
+    limits = []
+    for _ in range(60):
+        before = limiter.limit
+        epoch = limiter._epoch
+        _, throttled, after_cut = run_round(limiter, server)
+        limits.append(limiter.limit)
+
+        if throttled:
+            cuts += 1
+            # Several 429s from one burst count as one congestion event
+            assert limiter._epoch == epoch + 1
+            assert after_cut == max(limiter.minimum, before * limiter.decrease)
+        else:
+            assert limiter._epoch == epoch
+
+    assert server.throttled > 0
+    assert cuts >= 2
+    # After every cut the limit climbs back up towards the quota
+    first_cut = next(i for i, limit in enumerate(limits) if i and limit < limits[i - 1])
+    assert max(limits[first_cut + 1:]) > limits[first_cut]
+    # The sawtooth probes at most one slot past the quota before being cut
+    assert limiter.minimum <= min(limits) and max(limits) < server.quota + 2
+
+
+def test_throttles_from_before_a_cut_are_ignored():
+    limiter = AimdLimiter(initial=4, maximum=8)
+    permits = [limiter.try_acquire() for _ in range(4)]
+
+    limiter.release(permits[0], throttled=True)
+    assert limiter.limit == 2
+    for permit in permits[1:]:
+        limiter.release(permit, throttled=True)
+    assert limiter.limit == 2
+
+
+def test_concurrent_clients_stay_within_quota():
+    limiter = AimdLimiter(initial=2, maximum=16)
+    server = FakeQuotaServer(quota=4)
+    clients, requests_per_client = 8, 25
+
+    def client():
+        for _ in range(requests_per_client):
+            permit = limiter.acquire(timeout=5)
+            assert permit is not None
+            accepted = server.begin()
+            if accepted:
+                time.sleep(0.001)
+                server.end()
+            limiter.release(permit, throttled=not accepted, used_tokens=100)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.in_flight == 0
+    # Only the probes past the quota are throttled; admitting all eight
+    # clients at once would get about half of the requests rejected
+    assert server.throttled < 0.15 * clients * requests_per_client
+    # The limit settles in the sawtooth around the quota
+    assert server.quota * limiter.decrease <= limiter.limit < server.quota + 2
+    assert abs(limiter.estimate - 100) < 1
+
+
+class FakeClock:
+    """Monotonic clock advanced only by the limiter's sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def token_limiter(clock: FakeClock, **kwargs) -> AimdLimiter:
+    """Limiter with plenty of slots and a 600 tokens-per-minute bucket."""
+    options = dict(initial=16, maximum=16, tokens_per_minute=600, initial_estimate=100)
+    options.update(kwargs)
+    return AimdLimiter(clock=clock, sleep=clock.sleep, **options)
+
+
+def test_token_bucket_holds_back_requests_with_free_slots():
+    clock = FakeClock()
+    limiter = token_limiter(clock)
+
+    permits = [limiter.try_acquire() for _ in range(6)]
+    assert all(permit is not None and permit.tokens == 100 for permit in permits)
+    assert limiter.try_acquire() is None
+    assert limiter.in_flight == 6
+
+    # 600 tokens per minute refill 100 tokens in 10 seconds
+    permit = limiter.acquire(timeout=60)
+    assert permit is not None
+    assert 10 <= clock.now < 10.1
+
+
+def test_token_bucket_acquire_times_out():
+    clock = FakeClock()
+    limiter = token_limiter(clock)
+    for _ in range(6):
+        limiter.try_acquire()
+
+    assert limiter.acquire(timeout=5) is None
+    assert limiter.in_flight == 6
+
+
+def test_token_bucket_is_corrected_with_observed_usage():
+    clock = FakeClock()
+    limiter = token_limiter(clock)
+
+    # A request that used 300 tokens charges the 200 it under-reserved
+    permit = limiter.try_acquire()
+    limiter.release(permit, used_tokens=300)
+    assert limiter.tokens.wait_time(300) == 0
+    assert limiter.tokens.wait_time(301) > 0
+    assert limiter.estimate == 100 + limiter.ESTIMATE_SMOOTHING * 200
+
+    # The next reservation uses the updated average
+    permit = limiter.try_acquire()
+    assert permit.tokens == limiter.estimate
+    assert limiter.tokens.wait_time(300) > 0
+
+    # Unused reserved tokens are refunded
+    limiter.release(permit, used_tokens=0)
+    assert limiter.tokens.wait_time(300) == 0
+
+
+def test_request_estimate_is_capped_at_the_bucket_capacity():
+    clock = FakeClock()
+    limiter = token_limiter(clock)
+
+    permit = limiter.try_acquire(tokens=10_000)
+    assert permit is not None and permit.tokens == 600
+    assert limiter.try_acquire(tokens=1) is None